@@ -98,3 +98,15 @@ func WorkerActivity(contentID, workerID string) string {
 func StreamActivity(contentID string) string {
 	return fmt.Sprintf("ace_proxy:stream:%s:activity", contentID)
 }
+
+// ─── Proton catalog keys (written by the Python sidecar) ──────────────────────
+
+// ProtonServerKey is a hash of one Gluetun server entry; serverID is "<vpn>:<hostname>".
+func ProtonServerKey(serverID string) string {
+	return fmt.Sprintf("proton:server:%s", serverID)
+}
+
+const ProtonServersIndex = "proton:servers:all"
+const ProtonCatalogVersion = "proton:catalog:version"
+const ProtonCatalogDigest = "proton:catalog:digest"
+const ProtonCatalogChanged = "proton:catalog_changed"
@@ -1,63 +1,598 @@
 """Minimal FastAPI sidecar for Proton VPN server updates.
 
-This is the only Python code kept after the Go migration. It exposes a single
-endpoint that triggers a ProtonServerUpdater.update() call.  All other
-management logic lives in the Go services.
+This is the only Python code kept after the Go migration. It refreshes the
+Gluetun server files through ProtonServerUpdater and answers lookups on the
+resulting catalog; endpoints and settings are listed in docs/CONFIG.md.  All
+other management logic lives in the Go services.
 """
 from __future__ import annotations
 
+import asyncio
+import hmac
+import importlib
+import json
 import logging
 import os
 import sys
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
 
 # Ensure the repo root is on the path so app.vpn.proton_updater is importable.
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from typing import Any, Dict, Optional
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
 
-from fastapi import FastAPI, HTTPException
+from fastapi import Depends, FastAPI, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, Response
 from pydantic import BaseModel
 
-from app.vpn.proton_updater import ProtonServerUpdater, ProtonFilterConfig
+from app.vpn import metrics
+from app.vpn.breaker import CircuitBreaker
+from app.vpn.phases import phase, recording
+from app.vpn.profiling import profile_refresh
+from app.vpn.proton_updater import ProtonAccount, ProtonServerUpdater, ProtonFilterConfig
+from app.vpn.records import record_dict
+from app.vpn.redis_publisher import CatalogRedisPublisher
 
 logger = logging.getLogger(__name__)
 
 app = FastAPI(title="Proton Sidecar", docs_url=None, redoc_url=None)
 
+
+def _env_int(name: str, default: int, minimum: int = 1) -> int:
+    try:
+        return max(minimum, int(os.getenv(name, str(default))))
+    except ValueError:
+        return default
+
+
+# Bounded pool for transform/serialization/file I/O so /health is never
+# starved by a large servers.json.
+_executor = ThreadPoolExecutor(
+    max_workers=_env_int("PROTON_EXECUTOR_WORKERS", 2),
+    thread_name_prefix="proton-io",
+)
+
+def _session_factory() -> Optional[Callable[[], Any]]:
+    """``PROTON_SESSION_FACTORY=module:callable`` swaps proton-core for e.g. the local stand-in."""
+    spec = os.getenv("PROTON_SESSION_FACTORY", "").strip()
+    if not spec:
+        return None
+    module_name, _, attr = spec.partition(":")
+    return getattr(importlib.import_module(module_name), attr or "session_types")
+
+
 _updater = ProtonServerUpdater(
-    storage_path=os.getenv("PROTON_STORAGE_PATH", "/data/proton")
+    storage_path=os.getenv("PROTON_STORAGE_PATH", "/data/proton"),
+    executor=_executor,
+    breaker=CircuitBreaker(
+        failure_threshold=_env_int("PROTON_BREAKER_FAILURES", 3),
+        base_delay=_env_int("PROTON_BREAKER_BASE_DELAY_S", 30),
+        max_delay=_env_int("PROTON_BREAKER_MAX_DELAY_S", 900),
+    ),
+    session_factory=_session_factory(),
 )
 
 
+_REDIS_PUBLISH = os.getenv("PROTON_REDIS_PUBLISH", "").lower() in ("1", "true", "yes")
+
+
+def _make_publisher() -> CatalogRedisPublisher:
+    return CatalogRedisPublisher(
+        host=os.getenv("REDIS_HOST", "localhost"),
+        port=_env_int("REDIS_PORT", 6379),
+        db=_env_int("REDIS_DB", 0, minimum=0),
+    )
+
+
+# Created during warm-up so importing this module never pulls in redis-py.
+_publisher: Optional[CatalogRedisPublisher] = None
+
+# Finished jobs kept for GET /refresh/{job_id}; oldest are evicted first.
+_MAX_JOBS = 100
+_SECRET_FIELDS = {"proton_password", "proton_totp_secret"}
+# Accounts logging in at the same time during a multi-account refresh.
+_ACCOUNT_CONCURRENCY = _env_int("PROTON_ACCOUNT_CONCURRENCY", 4)
+
+# Background schedule: cheap load-only refreshes often, full logicals fetches
+# rarely (0 disables either; the Go orchestrator still triggers full refreshes).
+_LOAD_REFRESH_INTERVAL_S = _env_int("PROTON_LOAD_REFRESH_INTERVAL_S", 300, minimum=0)
+_FULL_REFRESH_INTERVAL_S = _env_int("PROTON_FULL_REFRESH_INTERVAL_S", 0, minimum=0)
+
+
+class AccountRequest(BaseModel):
+    proton_username: str
+    proton_password: str
+    proton_totp_secret: Optional[str] = None
+
+
 class RefreshRequest(BaseModel):
     proton_username: Optional[str] = None
     proton_password: Optional[str] = None
     proton_totp_secret: Optional[str] = None
+    # Several accounts fetched concurrently into one merged catalog; overrides proton_username.
+    accounts: Optional[List[AccountRequest]] = None
     gluetun_json_mode: str = "update"
     filters: Optional[Dict[str, Any]] = None
+    # Extra named filter sets, each written to servers-proton-<name>.json.
+    profiles: Optional[Dict[str, Dict[str, Any]]] = None
+    # Per-country/per-feature shard files: none|country|feature|all.
+    shards: str = "none"
 
 
-@app.post("/refresh")
-async def refresh_servers(body: RefreshRequest = RefreshRequest()):
-    """Fetch Proton servers and update local Gluetun JSON files."""
-    try:
-        filters = None
-        if body.filters:
-            filters = ProtonFilterConfig(**body.filters)
+@dataclass
+class RefreshJob:
+    id: str
+    key: str
+    kind: str = "full"
+    status: str = "pending"
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    task: Optional[asyncio.Task] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "result": self.result,
+            "error": self.error,
+        }
+
+
+_jobs: "OrderedDict[str, RefreshJob]" = OrderedDict()
+_inflight: Dict[str, RefreshJob] = {}
+# Serializes refreshes with different keys so servers.json is never written concurrently.
+_write_lock = asyncio.Lock()
+# Last successful full request, reused by the scheduler; monotonic completion times per kind.
+_last_request: Optional[RefreshRequest] = None
+_last_completed: Dict[str, float] = {"full": 0.0, "loads": 0.0, "retransform": 0.0}
+# Result of the last successful refresh of any kind, served while refreshes cannot answer.
+_last_result: Optional[Dict[str, Any]] = None
+_scheduler_task: Optional[asyncio.Task] = None
+_warm_up_task: Optional[asyncio.Task] = None
+# Startup warm-up outcome per step, reported by GET /ready.
+_warm_up_steps: Dict[str, Dict[str, Any]] = {}
+_ready = False
+# cProfile cannot stack profilers on one thread, so profiled refreshes run one at a time.
+_profile_lock = asyncio.Lock()
+
+
+def _refresh_key(body: RefreshRequest) -> str:
+    """Coalescing key: everything that shapes the output, minus secrets."""
+    exclude: Dict[str, Any] = {name: True for name in _SECRET_FIELDS}
+    exclude["accounts"] = {"__all__": _SECRET_FIELDS}
+    return json.dumps(body.model_dump(exclude=exclude), sort_keys=True, default=str)
 
-        result = await _updater.update(
-            proton_username=body.proton_username,
-            proton_password=body.proton_password,
-            proton_totp_secret=body.proton_totp_secret,
-            gluetun_json_mode=body.gluetun_json_mode,
-            filters=filters,
+
+def _accounts(body: RefreshRequest) -> List[ProtonAccount]:
+    return [
+        ProtonAccount(
+            username=account.proton_username,
+            password=account.proton_password,
+            totp_secret=account.proton_totp_secret,
         )
-        return {"status": "ok", "result": result}
+        for account in body.accounts or []
+    ]
+
+
+def _filter_configs(body: RefreshRequest) -> Tuple[Optional[ProtonFilterConfig], Dict[str, ProtonFilterConfig]]:
+    filters = ProtonFilterConfig(**body.filters) if body.filters else None
+    profiles = {name: ProtonFilterConfig(**cfg) for name, cfg in (body.profiles or {}).items()}
+    return filters, profiles
+
+
+def _validate_request(body: RefreshRequest, kind: str) -> None:
+    """400 for a body the refresh would reject, before it can be coalesced or answered as stale."""
+    if kind == "loads":
+        return  # reuses the cached catalog's mode, filters and profiles
+    try:
+        filters, profiles = _filter_configs(body)
+        ProtonServerUpdater.validate_options(body.gluetun_json_mode, filters, profiles, body.shards)
+    except (TypeError, ValueError) as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
+
+async def _run_refresh(job: RefreshJob, body: RefreshRequest) -> Dict[str, Any]:
+    global _last_request, _last_result
+    result: Optional[Dict[str, Any]] = None
+    try:
+        filters, profiles = _filter_configs(body)
+
+        async with _write_lock:
+            job.status = "running"
+            job.started_at = time.time()
+            with recording(metrics.observe_phase):
+                if job.kind == "loads":
+                    result = await _updater.update_loads(
+                        proton_username=body.proton_username,
+                        proton_password=body.proton_password,
+                        proton_totp_secret=body.proton_totp_secret,
+                        accounts=_accounts(body),
+                        concurrency=_ACCOUNT_CONCURRENCY,
+                    )
+                elif job.kind == "retransform":
+                    result = await _updater.update(
+                        gluetun_json_mode=body.gluetun_json_mode,
+                        filters=filters,
+                        source="cache",
+                        profiles=profiles,
+                        shards=body.shards,
+                    )
+                    # Keep scheduled full refreshes on the newly chosen filters/mode.
+                    _last_request = (_last_request or RefreshRequest()).model_copy(
+                        update={
+                            "gluetun_json_mode": body.gluetun_json_mode,
+                            "filters": body.filters,
+                            "profiles": body.profiles,
+                            "shards": body.shards,
+                        }
+                    )
+                else:
+                    result = await _updater.update(
+                        proton_username=body.proton_username,
+                        proton_password=body.proton_password,
+                        proton_totp_secret=body.proton_totp_secret,
+                        gluetun_json_mode=body.gluetun_json_mode,
+                        filters=filters,
+                        profiles=profiles,
+                        shards=body.shards,
+                        accounts=_accounts(body),
+                        concurrency=_ACCOUNT_CONCURRENCY,
+                    )
+                    _last_request = body
+                # Still under the write lock, so Redis sees versions in order.
+                await _publish_catalog(result)
+        _last_completed[job.kind] = time.monotonic()
+        _last_result = result
+        job.status = "ok"
+        job.result = result
+        return result
     except Exception as exc:
         logger.error("Proton refresh failed: %s", exc)
+        job.status = "error"
+        job.error = str(exc)
+        raise
+    finally:
+        job.finished_at = time.time()
+        metrics.refresh_inflight.dec()
+        metrics.record_refresh(job.kind, job.finished_at - (job.started_at or job.created_at), result)
+        if _inflight.get(job.key) is job:
+            del _inflight[job.key]
+
+
+async def _publish_catalog(result: Dict[str, Any]) -> None:
+    """Mirror the latest catalog into Redis; a Redis outage never fails the refresh."""
+    if _publisher is None:
+        return
+    loop = asyncio.get_running_loop()
+    try:
+        with phase("redis_publish"):
+            result["redis"] = await loop.run_in_executor(
+                _executor, _publisher.publish, _updater.catalog_snapshots
+            )
+    except Exception as exc:
+        logger.warning("Publishing the Proton catalog to Redis failed: %s", exc)
+        result["redis"] = {"error": str(exc)}
+
+
+def _start_refresh(body: RefreshRequest, kind: str = "full") -> Tuple[RefreshJob, bool]:
+    """Return the in-flight job for this request, starting one if needed.
+
+    The second element is True when the caller joined an existing refresh.
+    """
+    key = f"{kind}:{_refresh_key(body)}"
+    job = _inflight.get(key)
+    if job is not None:
+        return job, True
+
+    job = RefreshJob(id=uuid.uuid4().hex, key=key, kind=kind)
+    metrics.refresh_inflight.inc()
+    job.task = asyncio.create_task(_run_refresh(job, body))
+    # Errors are reported through the job; keep asyncio from logging them as unretrieved.
+    job.task.add_done_callback(lambda t: t.cancelled() or t.exception())
+    _inflight[key] = job
+    _jobs[job.id] = job
+    while len(_jobs) > _MAX_JOBS:
+        _jobs.popitem(last=False)
+    return job, False
+
+
+def _freshness() -> Dict[str, Any]:
+    """Age of the served catalog; ``stale`` once API refreshes are failing."""
+    age = _updater.catalog_age
+    return {
+        "age_s": None if age is None else round(age, 1),
+        "stale": _updater.breaker.state != "closed",
+        "refreshing": bool(_inflight),
+    }
+
+
+def _stale_response(reason: str, job: Optional[RefreshJob] = None, coalesced: bool = False) -> Dict[str, Any]:
+    return {
+        "status": "stale",
+        "result": _last_result,
+        "stale": {"reason": reason, **_freshness(), "circuit": _updater.breaker.to_dict()},
+        "job_id": job.id if job is not None else None,
+        "coalesced": coalesced,
+    }
+
+
+async def _respond(body: RefreshRequest, kind: str, run_async: bool):
+    _validate_request(body, kind)
+    uses_api = kind != "retransform"
+    if uses_api:
+        retry_after = _updater.breaker.retry_after()
+        if retry_after > 0:
+            # Do not even queue a refresh the breaker would refuse.
+            if _last_result is not None and not run_async:
+                return _stale_response("circuit_open")
+            raise HTTPException(
+                status_code=503,
+                detail=_updater.breaker.to_dict(),
+                headers={"Retry-After": str(max(1, round(retry_after)))},
+            )
+
+    already_running = bool(_inflight)
+    try:
+        job, coalesced = _start_refresh(body, kind)
+    except Exception as exc:
+        raise HTTPException(status_code=500, detail=str(exc))
+
+    if uses_api and already_running and _last_result is not None and not run_async:
+        # Revalidate in the background; poll job_id for the fresh result.
+        return _stale_response("refresh_pending", job, coalesced)
+
+    if run_async:
+        return JSONResponse(
+            status_code=202,
+            content={"status": "accepted", "job_id": job.id, "coalesced": coalesced},
+        )
+
+    try:
+        # shield: a disconnecting client must not cancel a refresh others share.
+        result = await asyncio.shield(job.task)
+        return {"status": "ok", "result": result, "job_id": job.id, "coalesced": coalesced}
+    except Exception as exc:
         raise HTTPException(status_code=500, detail=str(exc))
 
 
+@app.post("/refresh")
+async def refresh_servers(
+    body: RefreshRequest = RefreshRequest(),
+    run_async: bool = Query(False, alias="async"),
+):
+    """Fetch Proton servers and update local Gluetun JSON files."""
+    return await _respond(body, "full", run_async)
+
+
+@app.post("/refresh/loads")
+async def refresh_loads(
+    body: RefreshRequest = RefreshRequest(),
+    run_async: bool = Query(False, alias="async"),
+):
+    """Patch server loads/status on the last full catalog without refetching logicals."""
+    return await _respond(body, "loads", run_async)
+
+
+@app.post("/retransform")
+async def retransform_servers(
+    body: RefreshRequest = RefreshRequest(),
+    run_async: bool = Query(False, alias="async"),
+):
+    """Re-apply filters/mode to the cached raw Proton payload; no network or login."""
+    return await _respond(body, "retransform", run_async)
+
+
+@app.get("/refresh/{job_id}")
+async def refresh_status(job_id: str):
+    """Report the state of a refresh job started via ``POST /refresh?async=1``."""
+    job = _jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="unknown refresh job")
+    return job.to_dict()
+
+
+@app.get("/servers/delta")
+async def servers_delta(since: Optional[int] = None):
+    """Servers added, removed or modified since catalog version ``since``.
+
+    ``full`` is true when ``since`` is unknown (omitted, too old, or from before
+    a restart); ``added`` then holds the whole catalog.
+    """
+    delta = _updater.catalog_snapshots.delta(since)
+    if delta is None:
+        raise HTTPException(status_code=503, detail="no catalog snapshot yet; run /refresh first")
+    delta["catalog"] = _freshness()
+    return delta
+
+
+@app.get("/servers")
+async def list_servers(
+    country: Optional[str] = None,
+    city: Optional[str] = None,
+    feature: Optional[List[str]] = Query(None),
+    vpn: Optional[str] = None,
+    max_load: Optional[int] = Query(None, ge=0, le=100),
+    limit: int = Query(50, ge=1, le=1000),
+):
+    """Least-loaded servers of the current catalog matching every given filter.
+
+    ``feature`` may be repeated or comma-separated (free, stream, secure_core,
+    tor, port_forward); all listed features are required.
+    """
+    features = [name.strip() for value in feature or [] for name in value.split(",") if name.strip()]
+    try:
+        version, servers = _updater.query_servers(
+            country=country, city=city, vpn=vpn, features=features, max_load=max_load, limit=limit
+        )
+    except RuntimeError as exc:
+        raise HTTPException(status_code=503, detail=str(exc))
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    return {
+        "version": version,
+        "catalog": _freshness(),
+        "count": len(servers),
+        "servers": [record_dict(entry) for entry in servers],
+    }
+
+
+async def _refresh_scheduler() -> None:
+    """Run due load-only and full refreshes, reusing the last full request's settings."""
+    while True:
+        now = time.monotonic()
+        kind = None
+        if _FULL_REFRESH_INTERVAL_S and now - _last_completed["full"] >= _FULL_REFRESH_INTERVAL_S:
+            kind = "full"
+        elif (
+            _LOAD_REFRESH_INTERVAL_S
+            and _updater.has_catalog
+            and now - max(_last_completed["full"], _last_completed["loads"]) >= _LOAD_REFRESH_INTERVAL_S
+        ):
+            kind = "loads"
+
+        if kind is not None:
+            job, _ = _start_refresh(_last_request or RefreshRequest(), kind)
+            await asyncio.wait([job.task])
+            if job.status != "ok":
+                # Do not retry a failing refresh in a tight loop.
+                _last_completed[kind] = time.monotonic()
+            continue
+
+        waits = []
+        if _FULL_REFRESH_INTERVAL_S:
+            waits.append(_last_completed["full"] + _FULL_REFRESH_INTERVAL_S - now)
+        if _LOAD_REFRESH_INTERVAL_S:
+            waits.append(max(_last_completed["full"], _last_completed["loads"]) + _LOAD_REFRESH_INTERVAL_S - now)
+        await asyncio.sleep(max(1.0, min(waits)))
+
+
+async def _warm_up_step(name: str, func: Callable[[], Awaitable[Any]]) -> None:
+    started = time.perf_counter()
+    try:
+        detail = await func()
+    except Exception as exc:
+        # Not fatal: the first refresh reports the same problem to its caller.
+        logger.warning("Proton sidecar warm-up step %s failed: %s", name, exc)
+        _warm_up_steps[name] = {"ok": False, "seconds": round(time.perf_counter() - started, 3), "error": str(exc)}
+        return
+    _warm_up_steps[name] = {"ok": True, "seconds": round(time.perf_counter() - started, 3)}
+    if detail is not None:
+        _warm_up_steps[name]["detail"] = detail
+
+
+async def _start_publisher() -> None:
+    global _publisher
+    _publisher = await asyncio.get_running_loop().run_in_executor(_executor, _make_publisher)
+
+
+async def _warm_up() -> None:
+    """Pay the first refresh's one-off costs at startup, before reporting ready."""
+    global _ready
+    loop = asyncio.get_running_loop()
+    with recording(metrics.observe_phase):
+        with phase("warm_up"):
+            await asyncio.gather(
+                _warm_up_step("proton_core", lambda: loop.run_in_executor(_executor, _updater.warm_imports)),
+                _warm_up_step("gpg", lambda: loop.run_in_executor(_executor, _updater.warm_gpg)),
+            )
+            # Under the write lock so a refresh that raced ahead is never replaced by the old file.
+            async with _write_lock:
+                await _warm_up_step("catalog", _updater.preload_catalog)
+            if _REDIS_PUBLISH:
+                await _warm_up_step("redis", _start_publisher)
+    _ready = True
+    logger.info("Proton sidecar ready: %s", {name: step["ok"] for name, step in _warm_up_steps.items()})
+
+
+@app.on_event("startup")
+async def _start_scheduler() -> None:
+    global _scheduler_task, _warm_up_task
+    _warm_up_task = asyncio.create_task(_warm_up())
+    if _LOAD_REFRESH_INTERVAL_S or _FULL_REFRESH_INTERVAL_S:
+        _scheduler_task = asyncio.create_task(_refresh_scheduler())
+
+
+@app.on_event("shutdown")
+async def _shutdown_executor() -> None:
+    for task in (_scheduler_task, _warm_up_task):
+        if task is not None:
+            task.cancel()
+    _executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _require_api_key(request: Request) -> None:
+    """Same credentials as the Go API (X-API-Key, Bearer token or ?key=).
+
+    Unlike the Go API, an unset API_KEY disables the endpoint instead of
+    leaving it open: profiling exposes source paths and costs a refresh.
+    """
+    expected = os.getenv("API_KEY", "")
+    if not expected:
+        raise HTTPException(status_code=403, detail="set API_KEY to enable debug endpoints")
+    provided = request.headers.get("X-API-Key", "")
+    if not provided:
+        auth = request.headers.get("Authorization", "")
+        if auth.startswith("Bearer "):
+            provided = auth[len("Bearer "):]
+    if not provided:
+        provided = request.query_params.get("key", "")
+    if not provided:
+        raise HTTPException(status_code=401, detail="unauthorized")
+    if not hmac.compare_digest(provided.encode("utf-8"), expected.encode("utf-8")):
+        raise HTTPException(status_code=403, detail="forbidden")
+
+
+@app.post("/debug/profile-refresh", dependencies=[Depends(_require_api_key)])
+async def profile_refresh_endpoint(
+    body: RefreshRequest = RefreshRequest(),
+    kind: str = Query("full", pattern="^(full|loads|retransform)$"),
+    top: int = Query(25, ge=1, le=500),
+    sort: str = Query("cumulative", pattern="^(cumulative|tottime)$"),
+):
+    """Run one refresh under cProfile and tracemalloc and report where it spent time.
+
+    Never joins an in-flight refresh, but still waits for the write lock.
+    tracemalloc slows allocation-heavy phases, so compare phases with each
+    other rather than with unprofiled refresh times.
+    """
+    if _profile_lock.locked():
+        raise HTTPException(status_code=409, detail="a profiled refresh is already running")
+
+    async with _profile_lock:
+        job = RefreshJob(id=uuid.uuid4().hex, key=f"profile:{kind}", kind=kind)
+        metrics.refresh_inflight.inc()
+        with profile_refresh(top=top, sort=sort) as profile:
+            try:
+                await _run_refresh(job, body)
+            except Exception:
+                pass  # reported through job.error
+    return {"job": job.to_dict(), "profile": profile.to_dict()}
+
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    body, content_type = metrics.render()
+    return Response(content=body, media_type=content_type)
+
+
 @app.get("/health")
 async def health():
     return {"status": "ok", "service": "proton-sidecar"}
+
+
+@app.get("/ready")
+async def ready():
+    """Readiness: 503 until the startup warm-up has finished; failed steps are listed, not fatal."""
+    body = {"status": "ready" if _ready else "warming_up", "steps": _warm_up_steps}
+    return JSONResponse(status_code=200 if _ready else 503, content=body)
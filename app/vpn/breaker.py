@@ -0,0 +1,104 @@
+"""Circuit breaker for Proton API logins and fetches.
+
+After ``failure_threshold`` consecutive failures the circuit opens and calls
+are refused with ``CircuitOpenError`` until a backoff delay passes; then one
+trial call is let through (half-open).  A trial success closes the circuit,
+a trial failure reopens it with the delay doubled up to ``max_delay``.  Each
+delay is jittered into ``[delay/2, delay]`` so sidecars that failed together
+do not all retry at the same moment.
+
+Not thread-safe: the updater only touches it from the event loop.
+"""
+from __future__ import annotations
+
+import random
+import time
+from typing import Any, Callable, Dict, Optional
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling the Proton API while the circuit is open."""
+
+    def __init__(self, retry_after: float, last_error: Optional[str] = None):
+        message = f"Proton API circuit is open after repeated failures; next attempt in {retry_after:.0f}s"
+        if last_error:
+            message += f" (last error: {last_error})"
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """Consecutive-failure breaker with jittered exponential backoff."""
+
+    def __init__(
+        self,
+        failure_threshold: int = 3,
+        base_delay: float = 30.0,
+        max_delay: float = 900.0,
+        clock: Callable[[], float] = time.monotonic,
+        rng: Callable[[], float] = random.random,
+    ):
+        self.failure_threshold = max(1, failure_threshold)
+        self.base_delay = max(0.0, base_delay)
+        self.max_delay = max(self.base_delay, max_delay)
+        self._clock = clock
+        self._rng = rng
+        self._failures = 0
+        self._opens = 0
+        self._open_until = 0.0
+        self._trial = False
+        self.last_error: Optional[str] = None
+
+    @property
+    def state(self) -> str:
+        if self._failures < self.failure_threshold:
+            return "closed"
+        if self._clock() < self._open_until:
+            return "open"
+        return "half_open"
+
+    def retry_after(self) -> float:
+        """Seconds until a call would be let through; 0 when one is allowed now."""
+        if self._failures < self.failure_threshold:
+            return 0.0
+        remaining = self._open_until - self._clock()
+        if remaining > 0:
+            return remaining
+        # Half-open: only one trial at a time.
+        return 1.0 if self._trial else 0.0
+
+    def before_call(self) -> None:
+        """Raise CircuitOpenError unless a call may proceed now."""
+        wait = self.retry_after()
+        if wait > 0:
+            raise CircuitOpenError(wait, self.last_error)
+        if self._failures >= self.failure_threshold:
+            self._trial = True
+
+    def release_trial(self) -> None:
+        """Give back a half-open trial whose call ended without a verdict (cancelled, or a local error)."""
+        self._trial = False
+
+    def record_success(self) -> None:
+        self._failures = 0
+        self._opens = 0
+        self._open_until = 0.0
+        self._trial = False
+        self.last_error = None
+
+    def record_failure(self, exc: BaseException) -> None:
+        self._failures += 1
+        self._trial = False
+        self.last_error = str(exc) or type(exc).__name__
+        if self._failures >= self.failure_threshold:
+            delay = min(self.max_delay, self.base_delay * 2 ** self._opens)
+            self._opens += 1
+            self._open_until = self._clock() + delay / 2 + self._rng() * delay / 2
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "consecutive_failures": self._failures,
+            "retry_after_s": round(self.retry_after(), 3),
+            "last_error": self.last_error,
+        }
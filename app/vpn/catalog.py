@@ -0,0 +1,121 @@
+"""Versioned snapshots of the transformed Proton catalog and deltas between them.
+
+Each successful refresh that changes the server list records a snapshot with a
+monotonic version.  Consumers that remember the last version they applied can
+ask for only the servers added, removed or modified since then instead of
+re-reading the whole catalog.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from app.vpn.records import record_dict
+
+ServerKey = Tuple[str, str]
+
+DEFAULT_SNAPSHOT_HISTORY = 16
+
+
+def server_key(entry: Any) -> ServerKey:
+    """``(vpn, hostname)`` of a Gluetun entry dict or ServerRecord."""
+    return str(entry.get("vpn") or ""), str(entry.get("hostname") or "")
+
+
+def _fingerprint(entry: Any) -> bytes:
+    encoded = json.dumps(record_dict(entry), sort_keys=True, separators=(",", ":")).encode("utf-8")
+    return hashlib.blake2b(encoded, digest_size=8).digest()
+
+
+@dataclass
+class CatalogSnapshot:
+    version: int
+    digest: str
+    created_at: float
+    fingerprints: Dict[ServerKey, bytes] = field(repr=False)
+
+
+class CatalogSnapshots:
+    """Bounded ring of catalog snapshots; thread-safe for one writer and many readers."""
+
+    def __init__(self, history: int = DEFAULT_SNAPSHOT_HISTORY):
+        self._ring: Deque[CatalogSnapshot] = deque(maxlen=max(1, history))
+        # Full entries are only kept for the latest snapshot; older ones need
+        # fingerprints alone to tell what changed.
+        self._servers: Dict[ServerKey, Any] = {}
+        # Seed from wall time so versions keep increasing across restarts.
+        self._next_version = int(time.time())
+        self._lock = threading.Lock()
+
+    @property
+    def latest(self) -> Optional[CatalogSnapshot]:
+        with self._lock:
+            return self._ring[-1] if self._ring else None
+
+    def record(self, servers: List[Any], digest: str) -> CatalogSnapshot:
+        """Add a snapshot for ``servers`` unless it is identical to the latest one.
+
+        Entries sharing a ``(vpn, hostname)`` key keep the first occurrence.
+        """
+        indexed: Dict[ServerKey, Any] = {}
+        for entry in servers:
+            indexed.setdefault(server_key(entry), entry)
+        fingerprints = {key: _fingerprint(entry) for key, entry in indexed.items()}
+
+        with self._lock:
+            if self._ring and self._ring[-1].fingerprints == fingerprints:
+                return self._ring[-1]
+            snapshot = CatalogSnapshot(
+                version=self._next_version,
+                digest=digest,
+                created_at=time.time(),
+                fingerprints=fingerprints,
+            )
+            self._next_version += 1
+            self._ring.append(snapshot)
+            self._servers = indexed
+            return snapshot
+
+    def delta(self, since: Optional[int]) -> Optional[Dict[str, Any]]:
+        """Changes between version ``since`` and the latest snapshot.
+
+        Returns None before the first snapshot.  When ``since`` is missing or
+        has already fallen out of the ring, ``full`` is True and every current
+        server is reported as added.
+        """
+        with self._lock:
+            if not self._ring:
+                return None
+            latest = self._ring[-1]
+            servers = self._servers
+            base = next((snap for snap in self._ring if snap.version == since), None)
+
+        result: Dict[str, Any] = {
+            "version": latest.version,
+            "digest": latest.digest,
+            "since": since,
+            "full": base is None,
+            "added": [],
+            "removed": [],
+            "modified": [],
+        }
+        if base is None:
+            result["added"] = [record_dict(entry) for entry in servers.values()]
+            return result
+        if base is latest:
+            return result
+
+        old, new = base.fingerprints, latest.fingerprints
+        for key, fingerprint in new.items():
+            previous = old.get(key)
+            if previous is None:
+                result["added"].append(record_dict(servers[key]))
+            elif previous != fingerprint:
+                result["modified"].append(record_dict(servers[key]))
+        result["removed"] = [{"vpn": vpn, "hostname": hostname} for vpn, hostname in old if (vpn, hostname) not in new]
+        return result
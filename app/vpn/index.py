@@ -0,0 +1,116 @@
+"""Secondary indexes over the in-memory Proton catalog.
+
+``ServerIndex`` keeps, for every country, city, feature flag and VPN type, the
+positions of matching servers ordered by load.  A query walks the shortest
+posting list among its constraints in load order and stops as soon as it has
+``limit`` results or passes ``max_load``, so answering never scans the whole
+catalog.  Indexes are immutable: the updater builds a new one whenever the
+catalog version changes and swaps it in.
+"""
+from __future__ import annotations
+
+from array import array
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from app.vpn.records import FEATURE_BITS, ServerRecord
+
+IndexKey = Tuple[str, str]
+
+FEATURES = tuple(FEATURE_BITS)
+DEFAULT_LIMIT = 50
+
+_EMPTY = array("I")
+
+
+def _keys(record: ServerRecord) -> Iterable[IndexKey]:
+    yield "country", record.country.casefold()
+    if record.city:
+        yield "city", record.city.casefold()
+    yield "vpn", record.vpn
+    for name, bit in FEATURE_BITS.items():
+        if record.flags & bit:
+            yield "feature", name
+
+
+class ServerIndex:
+    """Load-ordered posting lists keyed by (field, value) for one catalog version."""
+
+    def __init__(self, servers: Sequence[ServerRecord], version: int):
+        self.version = version
+        self._servers = list(servers)
+        # Stable sort: equal loads keep catalog order.
+        order = sorted(range(len(self._servers)), key=lambda position: self._servers[position].load)
+        self._by_load = array("I", order)
+        postings: Dict[IndexKey, array] = {}
+        for position in order:
+            for key in _keys(self._servers[position]):
+                posting = postings.get(key)
+                if posting is None:
+                    posting = postings[key] = array("I")
+                posting.append(position)
+        self._postings = postings
+
+    def __len__(self) -> int:
+        return len(self._servers)
+
+    def query(
+        self,
+        *,
+        country: Optional[str] = None,
+        city: Optional[str] = None,
+        vpn: Optional[str] = None,
+        features: Sequence[str] = (),
+        max_load: Optional[int] = None,
+        limit: int = DEFAULT_LIMIT,
+    ) -> List[ServerRecord]:
+        """Least-loaded servers matching every given constraint.
+
+        ``country`` and ``city`` match case-insensitively on the full names
+        written to servers.json.  Raises ValueError for an unknown feature.
+        """
+        unknown = [name for name in features if name not in FEATURE_BITS]
+        if unknown:
+            raise ValueError(f"Unknown feature(s): {', '.join(unknown)}; use one of: {', '.join(FEATURES)}")
+
+        constraints: List[IndexKey] = []
+        if country:
+            constraints.append(("country", country.casefold()))
+        if city:
+            constraints.append(("city", city.casefold()))
+        if vpn:
+            constraints.append(("vpn", vpn.lower()))
+        constraints.extend(("feature", name) for name in dict.fromkeys(features))
+
+        if constraints:
+            postings = [self._postings.get(key, _EMPTY) for key in constraints]
+            shortest = min(range(len(postings)), key=lambda i: len(postings[i]))
+            candidates = postings[shortest]
+            checks = [_check(key) for i, key in enumerate(constraints) if i != shortest]
+        else:
+            candidates, checks = self._by_load, []
+
+        results: List[ServerRecord] = []
+        if limit <= 0:
+            return results
+        servers = self._servers
+        for position in candidates:
+            record = servers[position]
+            if max_load is not None and record.load > max_load:
+                break
+            if all(check(record) for check in checks):
+                results.append(record)
+                if len(results) >= limit:
+                    break
+        return results
+
+
+def _check(key: IndexKey) -> Callable[[ServerRecord], bool]:
+    field, value = key
+    if field == "feature":
+        bit = FEATURE_BITS[value]
+        return lambda record: bool(record.flags & bit)
+    if field == "vpn":
+        return lambda record: record.vpn == value
+    if field == "city":
+        return lambda record: record.city.casefold() == value
+    return lambda record: record.country.casefold() == value
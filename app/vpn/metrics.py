@@ -0,0 +1,82 @@
+"""Prometheus metrics for Proton catalog refreshes.
+
+Phase timings arrive through ``observe_phase``, installed as a recorder with
+``app.vpn.phases.recording`` around each refresh.  Refresh outcomes are folded
+in with ``record_refresh``.  ``render`` returns the text exposition served on
+the sidecar's ``/metrics``.
+"""
+from __future__ import annotations
+
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+
+# Sub-millisecond gpg checks up to multi-minute SRP logins on a slow API.
+_PHASE_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+refresh_phase_seconds = Histogram(
+    "proton_refresh_phase_seconds",
+    "Wall time of each refresh phase; file is set for per-file serialize/write phases.",
+    ["phase", "file"],
+    buckets=_PHASE_BUCKETS,
+)
+refresh_duration_seconds = Histogram(
+    "proton_refresh_duration_seconds",
+    "Wall time of whole refreshes.",
+    ["kind"],
+    buckets=_PHASE_BUCKETS,
+)
+refreshes_total = Counter(
+    "proton_refreshes_total",
+    "Finished refreshes by kind and status.",
+    ["kind", "status"],
+)
+refresh_last_success = Gauge(
+    "proton_refresh_last_success_timestamp_seconds",
+    "Unix time of the last successful refresh.",
+    ["kind"],
+)
+refresh_inflight = Gauge(
+    "proton_refresh_inflight",
+    "Refreshes currently queued or running.",
+)
+payload_bytes = Gauge(
+    "proton_payload_bytes",
+    "Size of the last raw LogicalServers payload as compact JSON.",
+)
+catalog_servers = Gauge(
+    "proton_catalog_servers",
+    "Server counts reported by the last refresh; profile is empty for the main catalog.",
+    ["profile", "stat"],
+)
+
+
+def observe_phase(phase: str, target: str, seconds: float) -> None:
+    refresh_phase_seconds.labels(phase=phase, file=target).observe(seconds)
+
+
+def _record_stats(profile: str, stats: Optional[Dict[str, Any]]) -> None:
+    for stat, value in (stats or {}).items():
+        if isinstance(value, (int, float)):
+            catalog_servers.labels(profile=profile, stat=stat).set(value)
+
+
+def record_refresh(kind: str, seconds: float, result: Optional[Dict[str, Any]]) -> None:
+    """Fold one finished refresh in; ``result`` is None when it failed."""
+    refresh_duration_seconds.labels(kind=kind).observe(seconds)
+    refreshes_total.labels(kind=kind, status="ok" if result is not None else "error").inc()
+    if result is None:
+        return
+
+    refresh_last_success.labels(kind=kind).set(time.time())
+    if result.get("payload_bytes") is not None:
+        payload_bytes.set(result["payload_bytes"])
+    _record_stats("", result.get("stats"))
+    for name, profile in (result.get("profiles") or {}).items():
+        _record_stats(name, profile.get("stats"))
+
+
+def render() -> Tuple[bytes, str]:
+    """Current metrics in the Prometheus text format, with their content type."""
+    return generate_latest(), CONTENT_TYPE_LATEST
@@ -0,0 +1,47 @@
+"""Wall-clock timing of named refresh phases.
+
+ProtonServerUpdater wraps each step of a refresh (gpg check, login, fetch,
+transform, each file write, ...) in ``phase()``.  Timings go to whatever
+recorders the caller installed with ``recording()`` for the current context;
+with none installed a phase costs one context-variable lookup.
+
+Recorders are called as ``recorder(phase, target, seconds)`` where ``target``
+names the file for per-file phases and is ``""`` otherwise.  Blocking work the
+updater hands to its executor runs in a copy of the caller's context, so
+phases timed on worker threads reach the same recorders.
+"""
+from __future__ import annotations
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Iterator, Tuple
+
+PhaseRecorder = Callable[[str, str, float], None]
+
+_recorders: ContextVar[Tuple[PhaseRecorder, ...]] = ContextVar("proton_phase_recorders", default=())
+
+
+@contextmanager
+def phase(name: str, target: str = "") -> Iterator[None]:
+    recorders = _recorders.get()
+    if not recorders:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        for recorder in recorders:
+            recorder(name, target, elapsed)
+
+
+@contextmanager
+def recording(recorder: PhaseRecorder) -> Iterator[None]:
+    """Send phase timings in the current context (and tasks it spawns) to ``recorder``."""
+    token = _recorders.set(_recorders.get() + (recorder,))
+    try:
+        yield
+    finally:
+        _recorders.reset(token)
@@ -0,0 +1,147 @@
+"""On-demand profiling of a single Proton refresh.
+
+``profile_refresh()`` turns on cProfile for the event-loop thread, tracemalloc
+and a phase recorder for the duration of one refresh.  Blocking work the
+updater hands to its executor goes through ``in_profile()``, which gives each
+call its own profiler on the worker thread; their stats are merged into the
+report.  Nothing is collected unless a profile is active, so normal refreshes
+only pay one context-variable lookup per executor call.
+
+The event-loop profiler also sees any other request served while the refresh
+runs; on an otherwise idle sidecar that is noise, not a skew.
+"""
+from __future__ import annotations
+
+import cProfile
+import pstats
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import partial
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from app.vpn.phases import recording
+
+_SORT_KEYS = {"cumulative": 3, "tottime": 2}
+
+_active: ContextVar[Optional["RefreshProfile"]] = ContextVar("proton_refresh_profile", default=None)
+
+
+class RefreshProfile:
+    """Collected cProfile, allocation and phase data for one refresh."""
+
+    def __init__(self, top: int = 25, sort: str = "cumulative"):
+        if sort not in _SORT_KEYS:
+            raise ValueError("sort must be one of: cumulative|tottime")
+        self.top = max(1, top)
+        self.sort = sort
+        self.wall_s = 0.0
+        self._phases: Dict[Tuple[str, str], List[float]] = {}
+        self._workers: List[cProfile.Profile] = []
+        self._lock = threading.Lock()
+        self._report: Dict[str, Any] = {}
+
+    def record_phase(self, phase: str, target: str, seconds: float) -> None:
+        with self._lock:
+            self._phases.setdefault((phase, target), []).append(seconds)
+
+    def run_profiled(self, func: Callable[[], Any]) -> Any:
+        profiler = cProfile.Profile()
+        try:
+            return profiler.runcall(func)
+        finally:
+            with self._lock:
+                self._workers.append(profiler)
+
+    def _function_rows(self, main: cProfile.Profile) -> List[Dict[str, Any]]:
+        stats = pstats.Stats(main)
+        for profiler in self._workers:
+            stats.add(profiler)
+        column = _SORT_KEYS[self.sort]
+        ranked = sorted(stats.stats.items(), key=lambda item: item[1][column], reverse=True)
+        rows = []
+        for (filename, line, function), (primitive, calls, tottime, cumtime, _) in ranked[:self.top]:
+            rows.append({
+                "function": function,
+                "file": filename,
+                "line": line,
+                "calls": calls,
+                "primitive_calls": primitive,
+                "tottime_s": round(tottime, 6),
+                "cumtime_s": round(cumtime, 6),
+            })
+        return rows
+
+    def _allocation_rows(self, snapshot: tracemalloc.Snapshot) -> List[Dict[str, Any]]:
+        snapshot = snapshot.filter_traces((tracemalloc.Filter(False, tracemalloc.__file__),))
+        return [
+            {
+                "location": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+                "size_kb": round(stat.size / 1024, 1),
+                "blocks": stat.count,
+            }
+            for stat in snapshot.statistics("lineno")[:self.top]
+        ]
+
+    def _phase_rows(self) -> List[Dict[str, Any]]:
+        rows = [
+            {"phase": phase, "file": target, "count": len(samples), "total_s": round(sum(samples), 6)}
+            for (phase, target), samples in self._phases.items()
+        ]
+        rows.sort(key=lambda row: row["total_s"], reverse=True)
+        return rows
+
+    def _finish(self, main: cProfile.Profile, snapshot: tracemalloc.Snapshot, heap_peak: int) -> None:
+        self._report = {
+            "wall_s": round(self.wall_s, 6),
+            "phases": self._phase_rows(),
+            "functions": self._function_rows(main),
+            "allocations": self._allocation_rows(snapshot),
+            "heap_peak_mb": round(heap_peak / 1e6, 2),
+            "worker_calls_profiled": len(self._workers),
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        return dict(self._report)
+
+
+def in_profile(func: Callable[[], Any]) -> Callable[[], Any]:
+    """Wrap ``func`` so it is profiled on whatever thread runs it, if a profile is active."""
+    profile = _active.get()
+    if profile is None:
+        return func
+    return partial(profile.run_profiled, func)
+
+
+@contextmanager
+def profile_refresh(top: int = 25, sort: str = "cumulative") -> Iterator[RefreshProfile]:
+    """Profile everything run in this context until the block exits.
+
+    Only one profile may be active per thread: cProfile refuses to stack.
+    """
+    profile = RefreshProfile(top, sort)
+    main = cProfile.Profile()
+    owns_tracemalloc = not tracemalloc.is_tracing()
+    if owns_tracemalloc:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+
+    token = _active.set(profile)
+    started = time.perf_counter()
+    try:
+        with recording(profile.record_phase):
+            main.enable()
+            try:
+                yield profile
+            finally:
+                main.disable()
+    finally:
+        profile.wall_s = time.perf_counter() - started
+        _active.reset(token)
+        snapshot = tracemalloc.take_snapshot()
+        _, heap_peak = tracemalloc.get_traced_memory()
+        if owns_tracemalloc:
+            tracemalloc.stop()
+        profile._finish(main, snapshot, heap_peak)
@@ -1,6 +1,9 @@
 from __future__ import annotations
 
+import asyncio
 import base64
+import contextvars
+import gzip
 import hashlib
 import hmac
 import importlib
@@ -10,17 +13,49 @@ import os
 import re
 import shutil
 import struct
+import subprocess
 import tempfile
+import threading
 import time
-from dataclasses import dataclass
+from concurrent.futures import Executor
+from dataclasses import asdict, dataclass, field, replace
+from functools import partial
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from app.vpn.breaker import CircuitBreaker
+from app.vpn.catalog import CatalogSnapshots
+from app.vpn.index import DEFAULT_LIMIT, ServerIndex
+from app.vpn.phases import phase
+from app.vpn.profiling import in_profile
+from app.vpn.records import (
+    FLAG_FREE,
+    FLAG_PORT_FORWARD,
+    FLAG_SECURE_CORE,
+    FLAG_STREAM,
+    FLAG_TOR,
+    FEATURE_BITS,
+    ServerRecord,
+    record_dict,
+)
+from app.vpn.records import dumps as dump_records
+from app.vpn.servers_json import splice_member
 
 logger = logging.getLogger(__name__)
 
 APP_VERSION = "linux-vpn-cli@4.15.2"
 USER_AGENT = "ProtonVPN/4.15.2 (Linux)"
 LOGICALS_ENDPOINT = "/vpn/v1/logicals?SecureCoreFilter=all&WithIpV6=1"
+LOADS_ENDPOINT = "/vpn/v1/loads"
+SERVERS_PROTON_FILE = "servers-proton.json"
+PROFILE_FILE_PREFIX = "servers-proton-"
+SESSION_CACHE_FILE = ".proton-session.json"
+CATALOG_STATE_FILE = ".catalog-state.json"
+RAW_CACHE_FILE = ".logicals-cache.json.gz"
+SHARDS_DIR = "shards"
+SHARD_MANIFEST_FILE = "manifest.json"
+# HTTP statuses Proton answers with when a token or credential is refused.
+AUTH_HTTP_CODES = frozenset({401, 422})
 
 # ISO-3166-1 alpha-2 → full country name mapping (mirrors Gluetun official servers.json)
 _COUNTRY_CODES: Dict[str, str] = {
@@ -96,9 +131,24 @@ SECURE_CORE = 1 << 0
 TOR = 1 << 1
 P2P = 1 << 2
 STREAMING = 1 << 3
+# Not Proton feature bits: derived flags packed into the same classification mask.
+FREE = 1 << 8
+IPV6 = 1 << 9
 
 _FILTER_VALUES = {"include", "exclude", "only"}
 _JSON_MODE_VALUES = {"none", "replace", "update"}
+_SOURCE_VALUES = {"api", "cache"}
+_SHARD_VALUES = {"none", "country", "feature", "all"}
+DEFAULT_ACCOUNT_CONCURRENCY = 4
+_PROFILE_NAME_RE = re.compile(r"[a-z0-9][a-z0-9_-]{0,63}")
+
+
+class ProtonConfigError(RuntimeError):
+    """Credentials, 2FA or the local session setup (proton-core, gpg) are wrong; retrying will not help.
+
+    Raised instead of a plain RuntimeError so these failures do not count
+    against the circuit breaker, which only tracks the Proton API itself.
+    """
 
 
 @dataclass
@@ -121,11 +171,70 @@ class ProtonFilterConfig:
                 raise ValueError(f"Invalid filter '{key}': {value}. Allowed values: include|exclude|only")
 
 
+@dataclass
+class ProtonAccount:
+    """One set of Proton credentials for multi-account refreshes."""
+
+    username: str
+    password: str
+    totp_code: Optional[str] = None
+    totp_secret: Optional[str] = None
+
+
+@dataclass
+class _TransformedCatalog:
+    """Last full transform kept in memory so load-only refreshes can patch it.
+
+    ``payload`` is what was last written.  ``entries`` are the servers of the
+    full transform and ``owners`` the logical ID behind each; load-only
+    refreshes rebuild ``payload`` from them rather than from the previous
+    patch, so a logical that comes back up reappears.
+    """
+
+    payload: Dict[str, Any]
+    entries: List[ServerRecord]
+    owners: List[str]
+    mode: str
+    filters: ProtonFilterConfig
+    shards: str = "none"
+    # Profile name -> (payload, entries, owners), rebuilt alongside the main payload.
+    profiles: Dict[str, Tuple[Dict[str, Any], List[ServerRecord], List[str]]] = field(default_factory=dict)
+
+
 class ProtonServerUpdater:
     """Fetch Proton paid server data and write Gluetun-compatible servers JSON."""
 
-    def __init__(self, storage_path: Optional[str] = None):
+    def __init__(
+        self,
+        storage_path: Optional[str] = None,
+        executor: Optional[Executor] = None,
+        breaker: Optional[CircuitBreaker] = None,
+        session_factory: Optional[Callable[[], Tuple[Any, Tuple[Any, Any]]]] = None,
+    ):
         self._storage_path = self._resolve_storage_path(storage_path)
+        # Transform, serialization and file I/O run here so the caller's event
+        # loop stays responsive; None means the loop's default executor.
+        self._executor = executor
+        # Authenticated sessions by account key, reused across refreshes and
+        # persisted to SESSION_CACHE_FILE so restarts can skip the SRP handshake too.
+        self._sessions: Dict[str, Any] = {}
+        # SESSION_CACHE_FILE is read-modify-written from executor threads.
+        self._session_cache_lock = threading.Lock()
+        # Returns (Session class, (2FA-needed exception, auth-needed exception))
+        # like _import_proton_types; None means proton-core.  Lets a local
+        # stand-in (tools/proton_standin.py) replace the real API.
+        self._session_factory = session_factory
+        self._session_cache_hits = 0
+        self._session_cache_misses = 0
+        # Stops hammering a failing Proton API; cache retransforms bypass it.
+        self.breaker = breaker or CircuitBreaker()
+        # Versioned history of transformed catalogs, used for delta queries.
+        self.catalog_snapshots = CatalogSnapshots()
+        self._catalog: Optional[_TransformedCatalog] = None
+        # Query indexes over the cached catalog, rebuilt when its version changes.
+        self._index: Optional[ServerIndex] = None
+        # When the data behind the cached catalog was fetched from the API.
+        self._catalog_refreshed_at: Optional[float] = None
 
     @staticmethod
     def _resolve_storage_path(storage_path: Optional[str]) -> Path:
@@ -156,7 +265,7 @@ class ProtonServerUpdater:
             session_mod = importlib.import_module("proton.session")
             exceptions_mod = importlib.import_module("proton.session.exceptions")
         except Exception as exc:
-            raise RuntimeError(
+            raise ProtonConfigError(
                 "Missing proton-core dependency. Install it with: "
                 "pip install 'proton-core @ git+https://github.com/ProtonVPN/python-proton-core.git'"
             ) from exc
@@ -166,7 +275,7 @@ class ProtonServerUpdater:
         auth_exc = getattr(exceptions_mod, "ProtonAPIAuthenticationNeeded", Exception)
 
         if session_cls is None or two_fa_exc is None:
-            raise RuntimeError("proton-core is installed but expected Session/ProtonAPI2FANeeded symbols were not found")
+            raise ProtonConfigError("proton-core is installed but expected Session/ProtonAPI2FANeeded symbols were not found")
 
         return session_cls, (two_fa_exc, auth_exc)
 
@@ -178,12 +287,157 @@ class ProtonServerUpdater:
     def _ensure_gpg_available(self) -> None:
         """Verify that gnupg is available, raising an error with guidance if not."""
         if not self._check_gpg_available():
-            raise RuntimeError(
+            raise ProtonConfigError(
                 "The 'gpg' (GnuPG) binary was not found in the system PATH. "
                 "The Proton API integration requires gpg for secure authentication. "
                 "Please install gnupg (gpg) in the container/host environment."
             )
 
+    def _session_types(self) -> Tuple[Any, Tuple[Any, Any]]:
+        if self._session_factory is not None:
+            return self._session_factory()
+        # Only proton-core's SRP login needs gpg.
+        with phase("gpg_check"):
+            self._ensure_gpg_available()
+        return self._import_proton_types()
+
+    def warm_imports(self) -> None:
+        """Import the session implementation ahead of the first refresh; raises RuntimeError when missing."""
+        if self._session_factory is not None:
+            self._session_factory()
+        else:
+            self._import_proton_types()
+
+    def warm_gpg(self) -> None:
+        """Create GNUPGHOME and let gpg initialise its keyring before the first login does."""
+        if self._session_factory is not None:
+            return
+        self._ensure_gpg_available()
+        home = os.getenv("GNUPGHOME")
+        if home:
+            Path(home).mkdir(mode=0o700, parents=True, exist_ok=True)
+        try:
+            subprocess.run(["gpg", "--batch", "--list-keys"], check=True, capture_output=True, timeout=30)
+        except (OSError, subprocess.SubprocessError) as exc:
+            raise RuntimeError(f"gpg warm-up failed: {exc}") from exc
+
+    @staticmethod
+    def _session_cache_key(username: str) -> str:
+        """Stable, non-reversible key tying cached session state to one account."""
+        return hashlib.sha256(username.strip().lower().encode("utf-8")).hexdigest()
+
+    def _read_session_cache(self) -> Dict[str, Any]:
+        """Cached session entries by account key."""
+        path = self._storage_path / SESSION_CACHE_FILE
+        try:
+            raw = json.loads(path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return {}
+        except (OSError, json.JSONDecodeError):
+            logger.warning("Ignoring unreadable Proton session cache at %s", path)
+            return {}
+        if not isinstance(raw, dict):
+            return {}
+        if isinstance(raw.get("key"), str):
+            # Single-account layout written before multi-account refreshes.
+            return {raw["key"]: raw}
+        sessions = raw.get("sessions")
+        return sessions if isinstance(sessions, dict) else {}
+
+    def _write_session_cache(self, sessions: Dict[str, Any]) -> None:
+        path = self._storage_path / SESSION_CACHE_FILE
+        try:
+            if not sessions:
+                path.unlink(missing_ok=True)
+                return
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with phase("write", path.name), \
+                    tempfile.NamedTemporaryFile("w", encoding="utf-8", dir=str(path.parent), delete=False) as temp_file:
+                # Tokens grant account access: keep the file owner-only.
+                os.chmod(temp_file.name, 0o600)
+                json.dump({"sessions": sessions}, temp_file)
+                temp_name = temp_file.name
+            os.replace(temp_name, path)
+        except (OSError, TypeError, ValueError) as exc:
+            logger.warning("Failed to persist Proton session cache at %s: %s", path, exc)
+
+    def _load_session_state(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = self._read_session_cache().get(key)
+        state = entry.get("state") if isinstance(entry, dict) else None
+        return state if isinstance(state, dict) and state else None
+
+    def _save_session_state(self, key: str, session: Any) -> None:
+        try:
+            state = session.__getstate__()
+        except Exception as exc:
+            logger.debug("Proton session state is not serializable: %s", exc)
+            return
+        if not isinstance(state, dict) or not state:
+            return
+        # Concurrent account fetches save from different worker threads.
+        with self._session_cache_lock:
+            sessions = self._read_session_cache()
+            sessions[key] = {"saved_at": int(time.time()), "state": state}
+            self._write_session_cache(sessions)
+
+    def _drop_session_state(self, key: str) -> None:
+        with self._session_cache_lock:
+            sessions = self._read_session_cache()
+            if sessions.pop(key, None) is not None:
+                self._write_session_cache(sessions)
+
+    async def _restore_session(self, session_cls: Any, key: str) -> Tuple[Any, Optional[str]]:
+        """Return a previously authenticated session for ``key`` and where it came from."""
+        session = self._sessions.get(key)
+        if session is not None:
+            return session, "memory"
+
+        state = await self._run_blocking(self._load_session_state, key)
+        if state is None:
+            return None, None
+        try:
+            session = session_cls(appversion=APP_VERSION, user_agent=USER_AGENT)
+            session.__setstate__(state)
+        except Exception as exc:
+            logger.debug("Discarding Proton session cache that failed to restore: %s", exc)
+            return None, None
+        return session, "disk"
+
+    @staticmethod
+    def _is_auth_error(exc: BaseException, auth_exc: Any) -> bool:
+        """Whether ``exc`` means Proton refused the credentials or tokens, rather than a transport or server error."""
+        # _import_proton_types falls back to Exception when the symbol is missing.
+        if auth_exc is not Exception and isinstance(exc, auth_exc):
+            return True
+        return getattr(exc, "http_code", None) in AUTH_HTTP_CODES
+
+    async def _fetch_with_cached_session(self, session: Any, auth_exc: Any, endpoint: str) -> Optional[Dict[str, Any]]:
+        """Fetch ``endpoint`` on a restored session, refreshing its tokens once if they expired.
+
+        Returns None when Proton no longer accepts the cached session and a full
+        SRP login is required.  Transport and server errors are re-raised so
+        the refresh fails but the saved tokens are kept for the next attempt.
+        """
+        if not getattr(session, "authenticated", True):
+            return None
+        try:
+            with phase("api_fetch"):
+                return await session.async_api_request(endpoint)
+        except Exception as exc:
+            if not self._is_auth_error(exc, auth_exc):
+                raise
+
+        try:
+            with phase("session_refresh"):
+                await session.async_refresh()
+            with phase("api_fetch"):
+                return await session.async_api_request(endpoint)
+        except Exception as exc:
+            if not self._is_auth_error(exc, auth_exc):
+                raise
+            logger.debug("Cached Proton session could not be refreshed: %s", exc)
+            return None
+
     @staticmethod
     def _country_name(value: Any) -> str:
         """Convert a country code or name to a full English country name."""
@@ -231,28 +485,236 @@ class ProtonServerUpdater:
         code = struct.unpack(">I", digest[offset:offset + 4])[0] & 0x7FFFFFFF
         return str(code % (10 ** digits)).zfill(digits)
 
+    def _session_cache_info(self, source: Optional[str]) -> Dict[str, Any]:
+        return {
+            "hit": source is not None,
+            "source": source,
+            "hits": self._session_cache_hits,
+            "misses": self._session_cache_misses,
+        }
+
+    async def _fetch_guarded(
+        self,
+        endpoint: str,
+        credentials: List[Tuple[str, str, Optional[str]]],
+        concurrency: int = DEFAULT_ACCOUNT_CONCURRENCY,
+    ) -> Tuple[Dict[str, Any], Any]:
+        """Fetch ``endpoint`` for every account behind the circuit breaker.
+
+        Accounts log in and fetch concurrently, at most ``concurrency`` at a
+        time, so the wait tracks the slowest account.  Their payloads are merged
+        with ``_merge_logicals``.  Any account failing fails the whole fetch
+        (and counts once against the breaker): a partial catalog would drop
+        the servers only that account sees.  Only Proton API and transport
+        errors count; ProtonConfigError and ValueError propagate without
+        touching the breaker.  The session summary is a list when there is
+        more than one account.
+        """
+        self.breaker.before_call()
+        settled = False
+        try:
+            limit = asyncio.Semaphore(max(1, concurrency))
+
+            async def fetch_one(username: str, password: str, code: Optional[str]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+                async with limit:
+                    return await self._fetch_api(endpoint, username, password, code)
+
+            outcomes = await asyncio.gather(*(fetch_one(*account) for account in credentials), return_exceptions=True)
+            errors = [outcome for outcome in outcomes if isinstance(outcome, BaseException)]
+            if errors:
+                api_error = next((exc for exc in errors if self._is_api_failure(exc)), None)
+                if api_error is not None:
+                    self.breaker.record_failure(api_error)
+                    settled = True
+                raise errors[0]
+            self.breaker.record_success()
+            settled = True
+        finally:
+            if not settled:
+                # Cancelled or failed locally: neither outcome says anything about the API.
+                self.breaker.release_trial()
+
+        if len(outcomes) == 1:
+            return outcomes[0]
+        return self._merge_logicals([api_data for api_data, _ in outcomes]), [info for _, info in outcomes]
+
     @staticmethod
-    def _matches_filter(flag: bool, mode: str) -> bool:
-        if mode == "include":
-            return True
-        if mode == "only":
-            return flag
-        if mode == "exclude":
-            return not flag
-        return True
+    def _is_api_failure(exc: BaseException) -> bool:
+        return isinstance(exc, Exception) and not isinstance(exc, (ProtonConfigError, ValueError))
+
+    @staticmethod
+    def _merge_logicals(payloads: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """One LogicalServers payload from several accounts' responses.
+
+        A logical server seen by several accounts is kept once, from the first
+        account listed.  Entry-IP dedupe of what remains happens in the
+        transform as for a single account.
+        """
+        merged: List[Any] = []
+        seen: set = set()
+        for api_data in payloads:
+            logicals = api_data.get("LogicalServers")
+            if not isinstance(logicals, list):
+                raise ValueError("Unexpected Proton API payload: missing LogicalServers list")
+            for logical in logicals:
+                logical_id = logical.get("ID") if isinstance(logical, dict) else None
+                if logical_id:
+                    if logical_id in seen:
+                        continue
+                    seen.add(logical_id)
+                merged.append(logical)
+        return {**payloads[0], "LogicalServers": merged}
+
+    async def _fetch_api(
+        self,
+        endpoint: str,
+        username: str,
+        password: str,
+        code: Optional[str],
+    ) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """Fetch a Proton API endpoint, reusing a cached session when possible.
+
+        Returns the raw API payload and a summary of the session cache outcome.
+        """
+        Session, exception_types = self._session_types()
+        two_fa_exc, auth_exc = exception_types
+
+        masked_user = (username[:3] + "***") if len(username) > 3 else "***"
+        cache_key = self._session_cache_key(username)
+
+        with phase("session_restore"):
+            session, source = await self._restore_session(Session, cache_key)
+        if session is not None:
+            api_data = await self._fetch_with_cached_session(session, auth_exc, endpoint)
+            if api_data is not None:
+                self._sessions[cache_key] = session
+                self._session_cache_hits += 1
+                await self._run_blocking(self._save_session_state, cache_key, session)
+                return api_data, self._session_cache_info(source)
+            logger.info("Cached Proton session is no longer valid; re-authenticating user=%s", masked_user)
+            self._sessions.pop(cache_key, None)
+            await self._run_blocking(self._drop_session_state, cache_key)
+
+        self._session_cache_misses += 1
+        logger.debug(
+            "Proton refresh: authenticating as user=%s storage=%s",
+            masked_user,
+            self._storage_path,
+        )
+
+        try:
+            with phase("session_init"):
+                session = Session(appversion=APP_VERSION, user_agent=USER_AGENT)
+        except Exception as exc:
+            raise ProtonConfigError(
+                f"Failed to initialize Proton session (GPG/Keyring issue). "
+                f"Ensure gpg is working and the storage path '{self._storage_path}' is writable. "
+                f"Error: {exc}"
+            ) from exc
+
+        try:
+            try:
+                try:
+                    with phase("authenticate"):
+                        authenticated = await session.async_authenticate(username, password)
+                except Exception as exc:
+                    if self._is_auth_error(exc, auth_exc):
+                        raise ProtonConfigError(f"Proton authentication failed: {exc}") from exc
+                    raise
+                if not authenticated:
+                    raise ProtonConfigError("Proton authentication failed")
+
+                try:
+                    with phase("api_fetch"):
+                        api_data = await session.async_api_request(endpoint)
+                except two_fa_exc:
+                    if not code:
+                        raise ProtonConfigError("2FA is required. Provide proton_totp_code or proton_totp_secret")
+                    with phase("two_factor"):
+                        validated = await session.async_validate_2fa_code(code)
+                    if not validated:
+                        raise ProtonConfigError("2FA token rejected by Proton API")
+                    with phase("api_fetch"):
+                        api_data = await session.async_api_request(endpoint)
+            except OSError as exc:
+                raise ProtonConfigError(
+                    f"Proton refresh failed because gpg/gnupg is unavailable or misconfigured "
+                    f"in this runtime (user={masked_user}, storage={self._storage_path}). "
+                    f"Underlying error: {exc}"
+                ) from exc
+        except Exception:
+            try:
+                await session.async_logout()
+            except Exception:
+                pass
+            raise
+
+        # Keep the session logged in so the next refresh can skip SRP/2FA.
+        self._sessions[cache_key] = session
+        await self._run_blocking(self._save_session_state, cache_key, session)
+        return api_data, self._session_cache_info(None)
 
     def _transform_to_gluetun(
         self,
         api_data: Dict[str, Any],
         filters: ProtonFilterConfig,
+        owners: Optional[List[str]] = None,
     ) -> Tuple[Dict[str, Any], Dict[str, int]]:
+        """Build the Gluetun protonvpn payload from a LogicalServers response.
+
+        When ``owners`` is given, the logical server ID behind each output entry
+        is appended to it in step with ``servers`` (used by load-only refreshes).
+        """
+        outputs = self._transform_profiles(
+            api_data,
+            {"": filters},
+            owners={"": owners} if owners is not None else None,
+        )
+        return outputs[""]
+
+    @staticmethod
+    def _profile_masks(filters: ProtonFilterConfig) -> Tuple[int, int]:
+        """Translate a filter config into (required, forbidden) feature bits."""
+        required = forbidden = 0
+        for bit, mode in (
+            (SECURE_CORE, filters.secure_core),
+            (TOR, filters.tor),
+            (FREE, filters.free_tier),
+            (P2P, filters.p2p),
+        ):
+            if mode == "only":
+                required |= bit
+            elif mode == "exclude":
+                forbidden |= bit
+        return required, forbidden
+
+    def _transform_profiles(
+        self,
+        api_data: Dict[str, Any],
+        profiles: Dict[str, ProtonFilterConfig],
+        owners: Optional[Dict[str, List[str]]] = None,
+    ) -> Dict[str, Tuple[Dict[str, Any], Dict[str, int]]]:
+        """Transform once for many filter profiles.
+
+        Every physical server is classified a single time into a feature
+        bitmask and routed into each matching profile's output, so the cost
+        stays one walk over the payload however many profiles are requested.
+        Each profile gets exactly what a separate single-filter transform would
+        produce, including its own entry-IP dedupe.
+        """
         logicals = api_data.get("LogicalServers")
         if not isinstance(logicals, list):
             raise ValueError("Unexpected Proton API payload: missing LogicalServers list")
 
-        servers: List[Dict[str, Any]] = []
-        seen_ips: set[str] = set()
-        physical_total = 0
+        names = list(profiles)
+        masks = [self._profile_masks(profiles[name]) for name in names]
+        ipv6_modes = [profiles[name].ipv6 for name in names]
+        ipv6_required = [IPV6 if mode == "only" else 0 for mode in ipv6_modes]
+        outputs: List[List[ServerRecord]] = [[] for _ in names]
+        owner_lists = [owners.get(name) if owners else None for name in names]
+        seen_ips: List[set[str]] = [set() for _ in names]
+        physical_totals = [0] * len(names)
+        strings: Dict[str, str] = {}
 
         for logical in logicals:
             if not isinstance(logical, dict):
@@ -260,20 +722,17 @@ class ProtonServerUpdater:
 
             features = self._coerce_int(logical.get("Features"), 0)
             tier = self._coerce_int(logical.get("Tier"), 1)
+            logical_id = str(logical.get("ID") or "")
 
-            is_secure_core = bool(features & SECURE_CORE)
-            is_tor = bool(features & TOR)
-            is_p2p = bool(features & P2P)
-            is_streaming = bool(features & STREAMING)
-            is_free = tier == 0
+            logical_mask = features & (SECURE_CORE | TOR | P2P | STREAMING)
+            if tier == 0:
+                logical_mask |= FREE
 
-            if not self._matches_filter(is_secure_core, filters.secure_core):
-                continue
-            if not self._matches_filter(is_tor, filters.tor):
-                continue
-            if not self._matches_filter(is_free, filters.free_tier):
-                continue
-            if not self._matches_filter(is_p2p, filters.p2p):
+            matching = [
+                index for index, (required, forbidden) in enumerate(masks)
+                if logical_mask & required == required and not logical_mask & forbidden
+            ]
+            if not matching:
                 continue
 
             # Skip logical servers that are marked as down (Status=0)
@@ -284,6 +743,30 @@ class ProtonServerUpdater:
             if not isinstance(physical_nodes, list):
                 continue
 
+            is_secure_core = bool(logical_mask & SECURE_CORE)
+            country = self._country_name(
+                logical.get("ExitCountry")
+                or logical.get("EntryCountry")
+                or logical.get("Country")
+            )
+            # One shared object per distinct country/city across the whole catalog.
+            country = strings.setdefault(country, country)
+            city = str(logical.get("City") or "").strip()
+            city = strings.setdefault(city, city)
+            load = self._coerce_int(logical.get("Load"), 0)
+
+            flags = 0
+            if logical_mask & FREE:
+                flags |= FLAG_FREE
+            if logical_mask & STREAMING:
+                flags |= FLAG_STREAM
+            if is_secure_core:
+                flags |= FLAG_SECURE_CORE
+            if logical_mask & TOR:
+                flags |= FLAG_TOR
+            if logical_mask & P2P:
+                flags |= FLAG_PORT_FORWARD
+
             for physical in physical_nodes:
                 if not isinstance(physical, dict):
                     continue
@@ -297,131 +780,439 @@ class ProtonServerUpdater:
                 if self._coerce_int(physical.get("Status"), 1) == 0:
                     continue
 
-                physical_total += 1
-
-                # Match gluetun updater behavior: dedupe non-secure-core by entry IP.
-                if not is_secure_core and entry_ip in seen_ips:
-                    continue
-                if not is_secure_core:
-                    seen_ips.add(entry_ip)
-
                 entry_ipv6 = str(physical.get("EntryIPv6") or "").strip()
                 has_ipv6 = bool(entry_ipv6)
-                if filters.ipv6 == "only" and not has_ipv6:
-                    continue
-
-                country = self._country_name(
-                    logical.get("ExitCountry")
-                    or logical.get("EntryCountry")
-                    or logical.get("Country")
-                )
-                city = str(logical.get("City") or "").strip()
+                physical_mask = logical_mask | IPV6 if has_ipv6 else logical_mask
                 server_name = str(logical.get("Name") or domain).strip()
-                load = self._coerce_int(logical.get("Load"), 0)
-
-                ips: List[str] = [entry_ip]
-                if has_ipv6 and filters.ipv6 in {"include", "only"}:
-                    ips.append(entry_ipv6)
-
-                common: Dict[str, Any] = {
-                    "country": country,
-                    "city": city,
-                    "server_name": server_name,
-                    "hostname": domain,
-                    "ips": ips,
-                    "load": load,
-                }
-
-                if is_free:
-                    common["free"] = True
-                if is_streaming:
-                    common["stream"] = True
-                if is_secure_core:
-                    common["secure_core"] = True
-                if is_tor:
-                    common["tor"] = True
-                if is_p2p:
-                    common["port_forward"] = True
-
-                openvpn_entry = {
-                    "vpn": "openvpn",
-                    "tcp": True,
-                    "udp": True,
-                    **common,
-                }
-                servers.append(openvpn_entry)
-
                 wg_pubkey = str(physical.get("X25519PublicKey") or "").strip()
-                if wg_pubkey:
-                    wireguard_entry = {
-                        "vpn": "wireguard",
-                        "wgpubkey": wg_pubkey,
-                        **common,
-                    }
-                    servers.append(wireguard_entry)
-
-        payload = {
-            "version": 1,
-            "protonvpn": {
-                "version": 4,
-                "timestamp": int(time.time()),
-                "servers": servers,
-            },
-        }
-
-        stats = {
-            "logical_total": len(logicals),
-            "physical_total": physical_total,
-            "output_servers": len(servers),
-        }
-        return payload, stats
+                # Entries are shared between profiles; built lazily per IP variant.
+                variants: Dict[bool, List[ServerRecord]] = {}
+
+                for index in matching:
+                    physical_totals[index] += 1
+
+                    # Match gluetun updater behavior: dedupe non-secure-core by entry IP.
+                    if not is_secure_core:
+                        if entry_ip in seen_ips[index]:
+                            continue
+                        seen_ips[index].add(entry_ip)
+
+                    if physical_mask & ipv6_required[index] != ipv6_required[index]:
+                        continue
+
+                    with_ipv6 = has_ipv6 and ipv6_modes[index] in {"include", "only"}
+                    entries = variants.get(with_ipv6)
+                    if entries is None:
+                        ips = [entry_ip, entry_ipv6] if with_ipv6 else [entry_ip]
+                        entries = [ServerRecord("openvpn", country, city, server_name, domain, ips, load, flags)]
+                        if wg_pubkey:
+                            entries.append(ServerRecord(
+                                "wireguard", country, city, server_name, domain, ips, load, flags, wg_pubkey
+                            ))
+                        variants[with_ipv6] = entries
+
+                    outputs[index].extend(entries)
+                    if owner_lists[index] is not None:
+                        owner_lists[index].extend([logical_id] * len(entries))
+
+        timestamp = int(time.time())
+        results: Dict[str, Tuple[Dict[str, Any], Dict[str, int]]] = {}
+        for index, name in enumerate(names):
+            payload = {
+                "version": 1,
+                "protonvpn": {
+                    "version": 4,
+                    "timestamp": timestamp,
+                    "servers": outputs[index],
+                },
+            }
+            stats = {
+                "logical_total": len(logicals),
+                "physical_total": physical_totals[index],
+                "output_servers": len(outputs[index]),
+            }
+            results[name] = (payload, stats)
+        return results
 
     @staticmethod
-    def _atomic_write_json(path: Path, payload: Dict[str, Any]) -> None:
+    def _atomic_write_json(path: Path, payload: Dict[str, Any], label: Optional[str] = None) -> None:
+        """Write ``payload`` as indented JSON via a temp file and rename.
+
+        ``label`` replaces the file name in phase timings (keeps metric labels bounded).
+        """
         path.parent.mkdir(parents=True, exist_ok=True)
-        data = json.dumps(payload, indent=2)
+        label = label or path.name
+        with phase("serialize", label):
+            data = dump_records(payload)
 
-        with tempfile.NamedTemporaryFile("w", encoding="utf-8", dir=str(path.parent), delete=False) as temp_file:
-            temp_file.write(data)
-            temp_name = temp_file.name
+        with phase("write", label):
+            with tempfile.NamedTemporaryFile("w", encoding="utf-8", dir=str(path.parent), delete=False) as temp_file:
+                temp_file.write(data)
+                temp_name = temp_file.name
 
-        os.replace(temp_name, path)
+            os.replace(temp_name, path)
 
     @staticmethod
-    def _load_existing_servers_json(path: Path) -> Dict[str, Any]:
+    def _splice_proton(path: Path, proton: Dict[str, Any]) -> None:
+        with phase("write", path.name):
+            splice_member(path, "protonvpn", proton, defaults={"version": 1}, encode=dump_records)
+
+    async def _run_blocking(self, func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        # Carry context variables (phase recorders, profiling) over to the worker thread.
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(self._executor, context.run, in_profile(partial(func, *args, **kwargs)))
+
+    @staticmethod
+    def _canonical_entries(servers: List[ServerRecord]) -> List[str]:
+        """Canonical JSON per entry, without volatile ``load``, in ``servers`` order."""
+        return [
+            json.dumps(
+                {k: v for k, v in record_dict(entry).items() if k != "load"}, sort_keys=True, separators=(",", ":")
+            )
+            for entry in servers
+        ]
+
+    @staticmethod
+    def _digest_entries(encoded: Iterable[str]) -> str:
+        hasher = hashlib.sha256()
+        for item in sorted(encoded):
+            hasher.update(item.encode("utf-8"))
+            hasher.update(b"\n")
+        return hasher.hexdigest()
+
+    @classmethod
+    def _catalog_digest(cls, servers: List[ServerRecord]) -> str:
+        """Order-independent digest of the server list, ignoring volatile ``load``."""
+        return cls._digest_entries(cls._canonical_entries(servers))
+
+    def _load_catalog_state(self) -> Dict[str, Any]:
         try:
-            raw = json.loads(path.read_text(encoding="utf-8"))
-            if isinstance(raw, dict):
-                return raw
-        except FileNotFoundError:
-            pass
-        except json.JSONDecodeError:
-            logger.warning("Failed to parse existing servers file at %s; creating fresh structure", path)
-        return {"version": 1}
+            raw = json.loads((self._storage_path / CATALOG_STATE_FILE).read_text(encoding="utf-8"))
+        except (OSError, json.JSONDecodeError):
+            return {}
+        return raw if isinstance(raw, dict) else {}
 
-    async def update(
+    @staticmethod
+    def _file_is_current(entry: Any, path: Path, digest: str, mode: str) -> bool:
+        """True when ``path`` still holds what we last wrote for this digest and mode."""
+        if not isinstance(entry, dict) or entry.get("digest") != digest or entry.get("mode") != mode:
+            return False
+        try:
+            stat = path.stat()
+        except OSError:
+            return False
+        # Any outside rewrite (e.g. the Go refresher) changes mtime/size.
+        return entry.get("mtime_ns") == stat.st_mtime_ns and entry.get("size") == stat.st_size
+
+    def _write_if_stale(
         self,
-        *,
-        proton_username: Optional[str] = None,
-        proton_password: Optional[str] = None,
-        proton_totp_code: Optional[str] = None,
-        proton_totp_secret: Optional[str] = None,
-        filters: Optional[ProtonFilterConfig] = None,
-        gluetun_json_mode: str = "update",
+        state: Dict[str, Any],
+        path: Path,
+        digest: str,
+        tag: str,
+        write: Callable[[], None],
+        key: Optional[str] = None,
+    ) -> bool:
+        """Run ``write`` unless ``path`` already holds this digest; records the result in ``state``.
+
+        ``key`` names the file in ``state``; it defaults to the file name.
+        """
+        key = key or path.name
+        if self._file_is_current(state.get(key), path, digest, tag):
+            return False
+        write()
+        stat = path.stat()
+        state[key] = {
+            "digest": digest,
+            "mode": tag,
+            "mtime_ns": stat.st_mtime_ns,
+            "size": stat.st_size,
+        }
+        return True
+
+    def _write_outputs(
+        self,
+        proton_payload: Dict[str, Any],
+        mode: str,
+        profile_payloads: Optional[Dict[str, Dict[str, Any]]] = None,
+        shards: str = "none",
     ) -> Dict[str, Any]:
+        """Write catalog files whose content changed.
+
+        Returns the file paths, catalog digest, whether anything was written,
+        the same per extra profile (``servers-proton-<profile>.json``), the
+        profiles whose files were removed as no longer requested and a summary
+        of the shard files.
         """
-        Fetch Proton servers and update local cache files.
+        self._storage_path.mkdir(parents=True, exist_ok=True)
+        proton_file = self._storage_path / SERVERS_PROTON_FILE
+        merged_file = self._storage_path / "servers.json"
+
+        with phase("digest"):
+            canonical = self._canonical_entries(proton_payload["protonvpn"]["servers"])
+            digest = self._digest_entries(canonical)
+        state = self._load_catalog_state()
+        state_dirty = self._write_if_stale(
+            state, proton_file, digest, "proton",
+            partial(self._atomic_write_json, proton_file, proton_payload),
+        )
+        changed = state_dirty
+
+        if mode == "replace":
+            write = partial(self._atomic_write_json, merged_file, proton_payload)
+        else:
+            # Other providers' sections are copied byte-for-byte, not re-parsed.
+            write = partial(self._splice_proton, merged_file, proton_payload["protonvpn"])
+        if mode != "none" and self._write_if_stale(state, merged_file, digest, mode, write):
+            state_dirty = changed = True
+
+        profiles: Dict[str, Dict[str, Any]] = {}
+        for name, payload in (profile_payloads or {}).items():
+            profile_file = self._storage_path / f"{PROFILE_FILE_PREFIX}{name}.json"
+            with phase("digest"):
+                profile_digest = self._catalog_digest(payload["protonvpn"]["servers"])
+            written = self._write_if_stale(
+                state, profile_file, profile_digest, "proton",
+                partial(self._atomic_write_json, profile_file, payload),
+            )
+            state_dirty = state_dirty or written
+            profiles[name] = {"file": str(profile_file), "digest": profile_digest, "changed": written}
 
-        - Always writes servers-proton.json.
-        - Writes servers.json when mode is update or replace.
+        removed: List[str] = []
+        for key in [key for key in state if key.startswith(PROFILE_FILE_PREFIX) and key.endswith(".json")]:
+            name = key[len(PROFILE_FILE_PREFIX):-len(".json")]
+            if name in profiles:
+                continue
+            try:
+                (self._storage_path / key).unlink()
+            except FileNotFoundError:
+                pass
+            del state[key]
+            state_dirty = True
+            removed.append(name)
+
+        shard_summary, shards_dirty = self._write_shards(state, proton_payload, canonical, digest, shards)
+        state_dirty = state_dirty or shards_dirty
+
+        if state_dirty:
+            self._atomic_write_json(self._storage_path / CATALOG_STATE_FILE, state)
+        return {
+            "proton_file": proton_file,
+            "merged_file": merged_file,
+            "digest": digest,
+            "changed": changed,
+            "profiles": profiles,
+            "profiles_removed": removed,
+            "shards": shard_summary,
+        }
+
+    @staticmethod
+    def _shard_slug(value: str) -> str:
+        return re.sub(r"[^a-z0-9]+", "-", value.casefold()).strip("-") or "unknown"
+
+    def _write_shards(
+        self,
+        state: Dict[str, Any],
+        proton_payload: Dict[str, Any],
+        canonical: List[str],
+        digest: str,
+        shards: str,
+    ) -> Tuple[Optional[Dict[str, Any]], bool]:
+        """Write per-country and/or per-feature shard files plus their manifest.
+
+        Each shard is a complete Gluetun document holding a subset of the
+        servers, so a reader pinned to one country can load it instead of the
+        full catalog.  Shards whose digest is unchanged are not rewritten and
+        shards that no longer apply are removed.  Returns a summary (None when
+        sharding is off) and whether ``state`` changed.
         """
-        mode = str(gluetun_json_mode or "").strip().lower()
-        if mode not in _JSON_MODE_VALUES:
-            raise ValueError("gluetun_json_mode must be one of: none|replace|update")
+        servers = proton_payload["protonvpn"]["servers"]
+        groups: Dict[Tuple[str, str], List[int]] = {}
+        if shards in ("country", "all"):
+            for position, entry in enumerate(servers):
+                groups.setdefault(("countries", entry.country), []).append(position)
+        if shards in ("feature", "all"):
+            for position, entry in enumerate(servers):
+                for name, bit in FEATURE_BITS.items():
+                    if entry.flags & bit:
+                        groups.setdefault(("features", name), []).append(position)
+
+        shard_dir = self._storage_path / SHARDS_DIR
+        manifest_key = f"{SHARDS_DIR}/{SHARD_MANIFEST_FILE}"
+        manifest: Dict[str, Any] = {"digest": digest, "countries": {}, "features": {}}
+        current = {manifest_key} if shards != "none" else set()
+        dirty = False
+        written = 0
+        for (kind, value), positions in groups.items():
+            prefix = "country" if kind == "countries" else "feature"
+            key = f"{SHARDS_DIR}/{prefix}-{self._shard_slug(value)}.json"
+            path = self._storage_path / key
+            current.add(key)
+            with phase("digest"):
+                shard_digest = self._digest_entries(canonical[position] for position in positions)
+            payload = {
+                **proton_payload,
+                "protonvpn": {**proton_payload["protonvpn"], "servers": [servers[position] for position in positions]},
+            }
+            if self._write_if_stale(
+                state, path, shard_digest, "shard",
+                partial(self._atomic_write_json, path, payload, SHARDS_DIR), key=key,
+            ):
+                dirty = True
+                written += 1
+            manifest[kind][value] = {
+                "file": key,
+                "digest": shard_digest,
+                "servers": len(positions),
+                "size": state[key]["size"],
+            }
 
-        applied_filters = filters or ProtonFilterConfig()
-        applied_filters.validate()
+        removed = 0
+        for key in [key for key in state if key.startswith(f"{SHARDS_DIR}/") and key not in current]:
+            try:
+                (self._storage_path / key).unlink()
+            except FileNotFoundError:
+                pass
+            del state[key]
+            dirty = True
+            removed += 1
+
+        if shards == "none":
+            return None, dirty
+
+        # Written last so a reader never finds a manifest pointing at old shards.
+        manifest_path = shard_dir / SHARD_MANIFEST_FILE
+        manifest_digest = hashlib.sha256(json.dumps(manifest, sort_keys=True).encode("utf-8")).hexdigest()
+        if self._write_if_stale(
+            state, manifest_path, manifest_digest, "manifest",
+            partial(self._atomic_write_json, manifest_path, manifest, SHARDS_DIR), key=manifest_key,
+        ):
+            dirty = True
+        summary = {
+            "manifest": str(manifest_path),
+            "mode": shards,
+            "countries": len(manifest["countries"]),
+            "features": len(manifest["features"]),
+            "written": written,
+            "removed": removed,
+        }
+        return summary, dirty
+
+    def _save_raw_payload(self, api_data: Dict[str, Any]) -> Optional[int]:
+        """Persist the raw LogicalServers response so filters can be re-applied offline.
+
+        Returns the size of the compact JSON encoding, or None if it could not be cached.
+        """
+        path = self._storage_path / RAW_CACHE_FILE
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with phase("serialize", path.name):
+                encoded = json.dumps(api_data, separators=(",", ":")).encode("utf-8")
+            with phase("write", path.name):
+                with tempfile.NamedTemporaryFile("wb", dir=str(path.parent), delete=False) as temp_file:
+                    with gzip.GzipFile(fileobj=temp_file, mode="wb", compresslevel=5, mtime=0) as gz:
+                        gz.write(encoded)
+                    temp_name = temp_file.name
+                os.replace(temp_name, path)
+        except (OSError, TypeError, ValueError) as exc:
+            logger.warning("Failed to cache raw Proton payload at %s: %s", path, exc)
+            return None
+        return len(encoded)
+
+    def _load_raw_payload(self) -> Tuple[Dict[str, Any], int, int]:
+        """Return the cached raw payload, when it was fetched (epoch seconds) and its JSON size."""
+        path = self._storage_path / RAW_CACHE_FILE
+        try:
+            with phase("read", path.name), gzip.open(path, "rb") as gz:
+                encoded = gz.read()
+            api_data = json.loads(encoded)
+            fetched_at = int(path.stat().st_mtime)
+        except FileNotFoundError:
+            raise RuntimeError("No cached Proton API payload; run a refresh from the API first") from None
+        except (OSError, EOFError, json.JSONDecodeError) as exc:
+            raise RuntimeError(f"Cached Proton API payload at {path} is unreadable: {exc}") from exc
+        if not isinstance(api_data, dict):
+            raise RuntimeError(f"Cached Proton API payload at {path} is not an object")
+        return api_data, fetched_at, len(encoded)
+
+    @staticmethod
+    def _apply_loads(
+        catalog: _TransformedCatalog,
+        api_data: Dict[str, Any],
+    ) -> Tuple[_TransformedCatalog, Dict[str, int], Dict[str, Dict[str, int]]]:
+        """Patch ``load`` and drop servers whose logical is down, without re-transforming.
+
+        Every call starts from the full transform's entries, so servers dropped
+        by an earlier call come back once reported up.  Logicals already down
+        at the full refresh stay out until the next one.  Profile payloads are
+        rebuilt the same way; returns the new catalog, its stats and
+        per-profile stats.
+        """
+        reported = api_data.get("LogicalServers")
+        if not isinstance(reported, list):
+            raise ValueError("Unexpected Proton API payload: missing LogicalServers list")
 
+        loads: Dict[str, Tuple[int, int]] = {}
+        for item in reported:
+            if isinstance(item, dict) and item.get("ID"):
+                loads[str(item["ID"])] = (
+                    ProtonServerUpdater._coerce_int(item.get("Load"), 0),
+                    ProtonServerUpdater._coerce_int(item.get("Status"), 1),
+                )
+
+        timestamp = int(time.time())
+        payload, stats = ProtonServerUpdater._patch_loads(
+            catalog.payload, catalog.entries, catalog.owners, loads, timestamp
+        )
+        stats = {"logicals_reported": len(loads), **stats}
+        profiles: Dict[str, Tuple[Dict[str, Any], List[ServerRecord], List[str]]] = {}
+        profile_stats: Dict[str, Dict[str, int]] = {}
+        for name, (profile_payload, entries, owners) in catalog.profiles.items():
+            profile_payload, profile_stats[name] = ProtonServerUpdater._patch_loads(
+                profile_payload, entries, owners, loads, timestamp
+            )
+            profiles[name] = (profile_payload, entries, owners)
+        return replace(catalog, payload=payload, profiles=profiles), stats, profile_stats
+
+    @staticmethod
+    def _patch_loads(
+        payload: Dict[str, Any],
+        entries: List[ServerRecord],
+        owners: List[str],
+        loads: Dict[str, Tuple[int, int]],
+        timestamp: int,
+    ) -> Tuple[Dict[str, Any], Dict[str, int]]:
+        """Rebuild ``payload``'s servers from full-transform ``entries`` (from ``owners``) and ``loads``."""
+        servers: List[ServerRecord] = []
+        patched = dropped = 0
+        for entry, owner in zip(entries, owners):
+            info = loads.get(owner)
+            if info is not None:
+                load, status = info
+                if status == 0:
+                    dropped += 1
+                    continue
+                if entry.load != load:
+                    # Copy rather than mutate: the previous snapshot may still be read.
+                    entry = entry.with_load(load)
+                    patched += 1
+            servers.append(entry)
+
+        patched_payload = {
+            **payload,
+            "protonvpn": {**payload["protonvpn"], "timestamp": timestamp, "servers": servers},
+        }
+        stats = {"patched": patched, "dropped": dropped, "output_servers": len(servers)}
+        return patched_payload, stats
+
+    def _resolve_credentials(
+        self,
+        proton_username: Optional[str],
+        proton_password: Optional[str],
+        proton_totp_code: Optional[str],
+        proton_totp_secret: Optional[str],
+    ) -> Tuple[str, str, Optional[str]]:
         username = (
             str(proton_username or "").strip()
             or str(os.getenv("PROTON_USERNAME", "")).strip()
@@ -442,81 +1233,316 @@ class ProtonServerUpdater:
             secret = proton_totp_secret or os.getenv("PROTON_TOTP_SECRET") or self._read_secret("proton_totp_secret")
             if secret:
                 code = self._generate_totp_from_secret(secret)
+        return username, password, code
 
-        self._ensure_gpg_available()
-        Session, exception_types = self._import_proton_types()
-        two_fa_exc = exception_types[0]
-
-        masked_user = (username[:3] + "***") if len(username) > 3 else "***"
-        logger.debug(
-            "Proton refresh: authenticating as user=%s storage=%s",
-            masked_user,
-            self._storage_path,
+    def _resolve_accounts(
+        self,
+        accounts: Optional[Sequence[ProtonAccount]],
+        proton_username: Optional[str],
+        proton_password: Optional[str],
+        proton_totp_code: Optional[str],
+        proton_totp_secret: Optional[str],
+    ) -> List[Tuple[str, str, Optional[str]]]:
+        """Credentials for each account; the single-account arguments/env apply when ``accounts`` is empty."""
+        if not accounts:
+            return [self._resolve_credentials(proton_username, proton_password, proton_totp_code, proton_totp_secret)]
+
+        resolved: List[Tuple[str, str, Optional[str]]] = []
+        keys: set = set()
+        for account in accounts:
+            username = str(account.username or "").strip()
+            password = str(account.password or "").strip()
+            if not username or not password:
+                raise ValueError("Every Proton account needs a username and password")
+            key = self._session_cache_key(username)
+            if key in keys:
+                raise ValueError("Duplicate Proton account in accounts list")
+            keys.add(key)
+            code = self._normalize_token(account.totp_code)
+            if not code and account.totp_secret:
+                code = self._generate_totp_from_secret(account.totp_secret)
+            resolved.append((username, password, code))
+        return resolved
+
+    async def _commit_catalog(
+        self,
+        catalog: _TransformedCatalog,
+        profile_stats: Optional[Dict[str, Dict[str, int]]] = None,
+    ) -> Dict[str, Any]:
+        """Write the catalog and profile files, record a snapshot and make it the cached catalog."""
+        profile_stats = profile_stats or {}
+        outputs = await self._run_blocking(
+            self._write_outputs,
+            catalog.payload,
+            catalog.mode,
+            {name: payload for name, (payload, _, _) in catalog.profiles.items()},
+            catalog.shards,
         )
+        with phase("snapshot"):
+            snapshot = await self._run_blocking(
+                self.catalog_snapshots.record, catalog.payload["protonvpn"]["servers"], outputs["digest"]
+            )
+        self._catalog = catalog
+        if self._index is None or self._index.version != snapshot.version:
+            with phase("index"):
+                self._index = await self._run_blocking(
+                    ServerIndex, catalog.payload["protonvpn"]["servers"], snapshot.version
+                )
+        result = {
+            "storage_path": str(self._storage_path),
+            "servers_proton_file": str(outputs["proton_file"]),
+            "servers_file": str(outputs["merged_file"]),
+            "gluetun_json_mode": catalog.mode,
+            "filters": asdict(catalog.filters),
+            "changed": outputs["changed"],
+            "digest": outputs["digest"],
+            "catalog_version": snapshot.version,
+        }
+        if outputs["shards"] is not None:
+            result["shards"] = outputs["shards"]
+        if outputs["profiles_removed"]:
+            result["profiles_removed"] = outputs["profiles_removed"]
+        if catalog.profiles:
+            result["profiles"] = {
+                name: {**outputs["profiles"][name], "stats": profile_stats.get(name, {})}
+                for name in catalog.profiles
+            }
+        return result
 
+    def _read_served_catalog(self) -> Optional[Tuple[List[ServerRecord], float]]:
+        """Servers and write time of an existing servers-proton.json, or None when unusable."""
+        path = self._storage_path / SERVERS_PROTON_FILE
         try:
-            session = Session(appversion=APP_VERSION, user_agent=USER_AGENT)
-        except Exception as exc:
-            raise RuntimeError(
-                f"Failed to initialize Proton session (GPG/Keyring issue). "
-                f"Ensure gpg is working and the storage path '{self._storage_path}' is writable. "
-                f"Error: {exc}"
-            ) from exc
+            with phase("read", path.name):
+                raw = json.loads(path.read_text(encoding="utf-8"))
+            section = raw["protonvpn"]
+            written_at = float(section.get("timestamp") or path.stat().st_mtime)
+            servers = [ServerRecord.from_dict(entry) for entry in section["servers"]]
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, TypeError, KeyError, AttributeError) as exc:
+            logger.warning("Ignoring unreadable %s at startup: %s", path, exc)
+            return None
+        return servers, written_at
 
-        try:
-            try:
-                authenticated = await session.async_authenticate(username, password)
-                if not authenticated:
-                    raise RuntimeError("Proton authentication failed")
+    async def preload_catalog(self) -> Optional[Dict[str, Any]]:
+        """Index the servers-proton.json left by an earlier run so lookups answer before any refresh.
 
-                try:
-                    api_data = await session.async_api_request(LOGICALS_ENDPOINT)
-                except two_fa_exc:
-                    if not code:
-                        raise RuntimeError("2FA is required. Provide proton_totp_code or proton_totp_secret")
-                    validated = await session.async_validate_2fa_code(code)
-                    if not validated:
-                        raise RuntimeError("2FA token rejected by Proton API")
-                    api_data = await session.async_api_request(LOGICALS_ENDPOINT)
-            except OSError as exc:
-                raise RuntimeError(
-                    f"Proton refresh failed because gpg/gnupg is unavailable or misconfigured "
-                    f"in this runtime (user={masked_user}, storage={self._storage_path}). "
-                    f"Underlying error: {exc}"
-                ) from exc
+        Only the query index and a snapshot are restored; load-only refreshes
+        still need a full refresh first, as the file does not say which
+        logical server each entry came from.  Does nothing once a refresh
+        has produced a catalog.
+        """
+        if self._index is not None:
+            return None
+        loaded = await self._run_blocking(self._read_served_catalog)
+        if loaded is None or self._index is not None:
+            return None
+        servers, written_at = loaded
+        with phase("digest"):
+            digest = await self._run_blocking(self._catalog_digest, servers)
+        with phase("snapshot"):
+            snapshot = await self._run_blocking(self.catalog_snapshots.record, servers, digest)
+        with phase("index"):
+            self._index = await self._run_blocking(ServerIndex, servers, snapshot.version)
+        self._catalog_refreshed_at = written_at
+        return {"servers": len(servers), "catalog_version": snapshot.version, "digest": digest}
+
+    @property
+    def has_catalog(self) -> bool:
+        return self._catalog is not None
+
+    @property
+    def catalog_age(self) -> Optional[float]:
+        """Seconds since the cached catalog's data was fetched; None without one."""
+        if self._catalog_refreshed_at is None:
+            return None
+        return max(0.0, time.time() - self._catalog_refreshed_at)
 
-            proton_payload, stats = self._transform_to_gluetun(api_data, applied_filters)
-
-            self._storage_path.mkdir(parents=True, exist_ok=True)
-            proton_file = self._storage_path / "servers-proton.json"
-            self._atomic_write_json(proton_file, proton_payload)
-
-            merged_file = self._storage_path / "servers.json"
-            if mode == "replace":
-                self._atomic_write_json(merged_file, proton_payload)
-            elif mode == "update":
-                existing = self._load_existing_servers_json(merged_file)
-                existing.setdefault("version", 1)
-                existing["protonvpn"] = proton_payload["protonvpn"]
-                self._atomic_write_json(merged_file, existing)
-
-            return {
-                "storage_path": str(self._storage_path),
-                "servers_proton_file": str(proton_file),
-                "servers_file": str(merged_file),
-                "gluetun_json_mode": mode,
-                "filters": {
-                    "ipv6": applied_filters.ipv6,
-                    "secure_core": applied_filters.secure_core,
-                    "tor": applied_filters.tor,
-                    "free_tier": applied_filters.free_tier,
-                    "p2p": applied_filters.p2p,
-                },
-                "stats": stats,
-                "totp_used": bool(code),
-            }
-        finally:
-            try:
-                await session.async_logout()
-            except Exception:
-                pass
+    def query_servers(
+        self,
+        *,
+        country: Optional[str] = None,
+        city: Optional[str] = None,
+        vpn: Optional[str] = None,
+        features: Sequence[str] = (),
+        max_load: Optional[int] = None,
+        limit: int = DEFAULT_LIMIT,
+    ) -> Tuple[int, List[ServerRecord]]:
+        """Least-loaded servers of the cached catalog matching the given constraints.
+
+        ``country`` may be an ISO-2 code or a full name.  Returns the catalog
+        version answered from and the matching records.
+        """
+        index = self._index
+        if index is None:
+            raise RuntimeError("No cached Proton catalog; run a full refresh first")
+        servers = index.query(
+            country=self._country_name(country) if country else None,
+            city=city,
+            vpn=vpn,
+            features=features,
+            max_load=max_load,
+            limit=limit,
+        )
+        return index.version, servers
+
+    async def update_loads(
+        self,
+        *,
+        proton_username: Optional[str] = None,
+        proton_password: Optional[str] = None,
+        proton_totp_code: Optional[str] = None,
+        proton_totp_secret: Optional[str] = None,
+        accounts: Optional[Sequence[ProtonAccount]] = None,
+        concurrency: int = DEFAULT_ACCOUNT_CONCURRENCY,
+    ) -> Dict[str, Any]:
+        """
+        Refresh only server loads and up/down status on the last full catalog.
+
+        Fetches the small loads endpoint instead of the full logicals list and
+        rebuilds the cached transform from it, including the profiles of that
+        update() so their servers-proton-<name>.json files follow too.  Servers
+        dropped as down return as soon as Proton reports them up again.
+        Requires a prior full update() in this process.  Because the catalog
+        digest ignores load, files are only rewritten when a server was dropped.
+        """
+        catalog = self._catalog
+        if catalog is None:
+            raise RuntimeError("No cached Proton catalog; run a full refresh first")
+
+        credentials = self._resolve_accounts(
+            accounts, proton_username, proton_password, proton_totp_code, proton_totp_secret
+        )
+        api_data, session_cache = await self._fetch_guarded(LOADS_ENDPOINT, credentials, concurrency)
+
+        with phase("transform"):
+            patched, stats, profile_stats = await self._run_blocking(self._apply_loads, catalog, api_data)
+        result = await self._commit_catalog(patched, profile_stats)
+        self._catalog_refreshed_at = time.time()
+        result.update({
+            "refresh": "loads",
+            "accounts": len(credentials),
+            "stats": stats,
+            "session_cache": session_cache,
+        })
+        return result
+
+    @staticmethod
+    def validate_options(
+        gluetun_json_mode: str = "update",
+        filters: Optional[ProtonFilterConfig] = None,
+        profiles: Optional[Dict[str, ProtonFilterConfig]] = None,
+        shards: str = "none",
+    ) -> Tuple[str, ProtonFilterConfig, Dict[str, ProtonFilterConfig], str]:
+        """Check update()'s output options; returns them normalized or raises ValueError."""
+        mode = str(gluetun_json_mode or "").strip().lower()
+        if mode not in _JSON_MODE_VALUES:
+            raise ValueError("gluetun_json_mode must be one of: none|replace|update")
+
+        applied_filters = filters or ProtonFilterConfig()
+        applied_filters.validate()
+
+        shard_mode = str(shards or "").strip().lower()
+        if shard_mode not in _SHARD_VALUES:
+            raise ValueError("shards must be one of: none|country|feature|all")
+
+        profiles = profiles or {}
+        for name, profile_filters in profiles.items():
+            if not _PROFILE_NAME_RE.fullmatch(name):
+                raise ValueError(f"Invalid profile name '{name}': use lowercase letters, digits, '-' or '_'")
+            profile_filters.validate()
+        return mode, applied_filters, profiles, shard_mode
+
+    async def update(
+        self,
+        *,
+        proton_username: Optional[str] = None,
+        proton_password: Optional[str] = None,
+        proton_totp_code: Optional[str] = None,
+        proton_totp_secret: Optional[str] = None,
+        filters: Optional[ProtonFilterConfig] = None,
+        gluetun_json_mode: str = "update",
+        source: str = "api",
+        profiles: Optional[Dict[str, ProtonFilterConfig]] = None,
+        shards: str = "none",
+        accounts: Optional[Sequence[ProtonAccount]] = None,
+        concurrency: int = DEFAULT_ACCOUNT_CONCURRENCY,
+    ) -> Dict[str, Any]:
+        """
+        Fetch Proton servers and update local cache files.
+
+        ``source="cache"`` re-transforms the last raw API payload saved under
+        the storage path instead of fetching, so no credentials, network or gpg
+        are needed (e.g. to apply new filters or ride out an API outage).
+
+        ``profiles`` maps extra names to filter configs; each is written to
+        ``servers-proton-<name>.json`` from the same single transform pass;
+        files of profiles no longer listed are removed.
+
+        ``shards`` (none|country|feature|all) also writes one Gluetun document
+        per country and/or feature flag under ``shards/`` with a
+        ``shards/manifest.json`` listing their digests, in the same pass.
+
+        ``accounts`` fetches with several Proton accounts at once (at most
+        ``concurrency`` logging in together) and merges their servers into one
+        catalog, transformed and written once; the first account listed wins
+        for logical servers several accounts see.
+
+        - Always writes servers-proton.json.
+        - Writes servers.json when mode is update or replace.
+        - Skips rewriting a file when the catalog digest (servers minus load and
+          timestamp) matches what was last written there; ``changed`` in the
+          result is False when nothing was written.
+        - Reuses the session cached under the storage path; full SRP login only
+          runs when that session is missing or cannot be refreshed.
+        """
+        mode, applied_filters, profiles, shard_mode = self.validate_options(
+            gluetun_json_mode, filters, profiles, shards
+        )
+
+        source = str(source or "").strip().lower()
+        if source not in _SOURCE_VALUES:
+            raise ValueError("source must be one of: api|cache")
+
+        credentials: List[Tuple[str, str, Optional[str]]] = []
+        session_cache: Any = None
+        if source == "cache":
+            api_data, fetched_at, payload_bytes = await self._run_blocking(self._load_raw_payload)
+        else:
+            credentials = self._resolve_accounts(
+                accounts, proton_username, proton_password, proton_totp_code, proton_totp_secret
+            )
+            api_data, session_cache = await self._fetch_guarded(LOGICALS_ENDPOINT, credentials, concurrency)
+            fetched_at = int(time.time())
+            payload_bytes = await self._run_blocking(self._save_raw_payload, api_data)
+
+        # "" cannot collide with a validated profile name.
+        owners: Dict[str, List[str]] = {name: [] for name in ["", *profiles]}
+        with phase("transform"):
+            outputs = await self._run_blocking(
+                self._transform_profiles, api_data, {"": applied_filters, **profiles}, owners
+            )
+        proton_payload, stats = outputs.pop("")
+        catalog = _TransformedCatalog(
+            proton_payload,
+            proton_payload["protonvpn"]["servers"],
+            owners.pop(""),
+            mode,
+            applied_filters,
+            shard_mode,
+            {name: (payload, payload["protonvpn"]["servers"], owners[name]) for name, (payload, _) in outputs.items()},
+        )
+        result = await self._commit_catalog(catalog, {name: stats for name, (_, stats) in outputs.items()})
+        self._catalog_refreshed_at = float(fetched_at)
+        result.update({
+            "refresh": "full",
+            "source": source,
+            "payload_fetched_at": fetched_at,
+            "payload_bytes": payload_bytes,
+            "stats": stats,
+            "accounts": len(credentials),
+            "totp_used": any(code for _, _, code in credentials),
+            "session_cache": session_cache,
+        })
+        return result
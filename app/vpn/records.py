@@ -0,0 +1,205 @@
+"""Compact in-memory form of Gluetun protonvpn server entries.
+
+A large catalog holds hundreds of thousands of entries.  Keeping each as a
+dict costs a hash table per entry; ``ServerRecord`` uses ``__slots__`` and
+packs the boolean feature keys into one small int, while the openvpn and
+wireguard entries of a physical server share the same string and ``ips``
+objects.  Records are expanded to Gluetun JSON only when serialized
+(``dumps``) or handed to code that needs a mapping (``record_dict``).
+"""
+from __future__ import annotations
+
+import json
+import sys
+from json.encoder import encode_basestring_ascii as _quote
+from typing import Any, Dict, List, Optional, Tuple
+
+# Flag bits, in the order Gluetun entries list the matching keys.
+FLAG_FREE = 1 << 0
+FLAG_STREAM = 1 << 1
+FLAG_SECURE_CORE = 1 << 2
+FLAG_TOR = 1 << 3
+FLAG_PORT_FORWARD = 1 << 4
+
+_FLAG_KEYS: Tuple[Tuple[int, str], ...] = (
+    (FLAG_FREE, "free"),
+    (FLAG_STREAM, "stream"),
+    (FLAG_SECURE_CORE, "secure_core"),
+    (FLAG_TOR, "tor"),
+    (FLAG_PORT_FORWARD, "port_forward"),
+)
+FEATURE_BITS = {key: bit for bit, key in _FLAG_KEYS}
+
+
+class ServerRecord:
+    """One Gluetun server entry (a physical server over one VPN protocol)."""
+
+    __slots__ = ("vpn", "country", "city", "server_name", "hostname", "ips", "load", "flags", "wgpubkey")
+
+    def __init__(
+        self,
+        vpn: str,
+        country: str,
+        city: str,
+        server_name: str,
+        hostname: str,
+        ips: List[str],
+        load: int,
+        flags: int = 0,
+        wgpubkey: Optional[str] = None,
+    ):
+        self.vpn = vpn
+        self.country = country
+        self.city = city
+        self.server_name = server_name
+        self.hostname = hostname
+        self.ips = ips
+        self.load = load
+        self.flags = flags
+        self.wgpubkey = wgpubkey
+
+    @classmethod
+    def from_dict(cls, entry: Dict[str, Any]) -> "ServerRecord":
+        """Inverse of ``to_dict``, for entries read back from a Gluetun file."""
+        flags = 0
+        for bit, key in _FLAG_KEYS:
+            if entry.get(key):
+                flags |= bit
+        vpn = str(entry.get("vpn") or "")
+        return cls(
+            vpn,
+            sys.intern(str(entry.get("country") or "")),
+            sys.intern(str(entry.get("city") or "")),
+            str(entry.get("server_name") or ""),
+            str(entry.get("hostname") or ""),
+            [str(ip) for ip in entry.get("ips") or []],
+            int(entry.get("load") or 0),
+            flags,
+            entry.get("wgpubkey") if vpn == "wireguard" else None,
+        )
+
+    def with_load(self, load: int) -> "ServerRecord":
+        """Copy with a new load; records may be shared by catalog snapshots, so never mutate."""
+        return ServerRecord(
+            self.vpn, self.country, self.city, self.server_name, self.hostname,
+            self.ips, load, self.flags, self.wgpubkey,
+        )
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Read a field by its Gluetun JSON key, like ``dict.get``."""
+        bit = FEATURE_BITS.get(key)
+        if bit is not None:
+            return True if self.flags & bit else default
+        if key in ("tcp", "udp"):
+            return True if self.vpn == "openvpn" else default
+        if key == "wgpubkey" and self.vpn != "wireguard":
+            return default
+        if key in ServerRecord.__slots__:
+            return getattr(self, key)
+        return default
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Gluetun JSON shape, with keys in the order Gluetun writes them."""
+        if self.vpn == "openvpn":
+            data: Dict[str, Any] = {"vpn": "openvpn", "tcp": True, "udp": True}
+        else:
+            data = {"vpn": self.vpn, "wgpubkey": self.wgpubkey}
+        data["country"] = self.country
+        data["city"] = self.city
+        data["server_name"] = self.server_name
+        data["hostname"] = self.hostname
+        data["ips"] = self.ips
+        data["load"] = self.load
+        if self.flags:
+            for bit, key in _FLAG_KEYS:
+                if self.flags & bit:
+                    data[key] = True
+        return data
+
+    def _encode(self, pad: str, step: str) -> str:
+        """JSON text identical to ``json.dumps(self.to_dict(), indent=...)`` nested at ``pad``."""
+        inner = pad + step
+        sep = "," + inner
+        if self.vpn == "openvpn":
+            head = f'"vpn": "openvpn"{sep}"tcp": true{sep}"udp": true'
+        else:
+            wgpubkey = "null" if self.wgpubkey is None else _quote(self.wgpubkey)
+            head = f'"vpn": {_quote(self.vpn)}{sep}"wgpubkey": {wgpubkey}'
+        if self.ips:
+            ip_pad = inner + step
+            ips = "[" + ip_pad + ("," + ip_pad).join(map(_quote, self.ips)) + inner + "]"
+        else:
+            ips = "[]"
+        text = (
+            f"{{{inner}{head}{sep}"
+            f'"country": {_quote(self.country)}{sep}'
+            f'"city": {_quote(self.city)}{sep}'
+            f'"server_name": {_quote(self.server_name)}{sep}'
+            f'"hostname": {_quote(self.hostname)}{sep}'
+            f'"ips": {ips}{sep}'
+            f'"load": {int.__repr__(self.load)}'
+        )
+        if self.flags:
+            text += "".join(f'{sep}"{key}": true' for bit, key in _FLAG_KEYS if self.flags & bit)
+        return text + pad + "}"
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, ServerRecord):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in ServerRecord.__slots__)
+
+    __hash__ = None  # type: ignore[assignment]
+
+    def __repr__(self) -> str:
+        return f"ServerRecord({self.vpn!r}, {self.hostname!r}, load={self.load})"
+
+
+def record_dict(entry: Any) -> Dict[str, Any]:
+    """Return ``entry`` as a Gluetun dict whether it is a record or already a dict."""
+    return entry.to_dict() if isinstance(entry, ServerRecord) else entry
+
+
+def _encode_value(value: Any, pad: str, step: str, out: List[str]) -> None:
+    if isinstance(value, ServerRecord):
+        out.append(value._encode(pad, step))
+        return
+    inner = pad + step
+    if isinstance(value, dict) and value:
+        out.append("{")
+        sep = inner
+        for key, item in value.items():
+            if not isinstance(key, str):
+                key = json.dumps(key)
+            out.append(sep + _quote(key) + ": ")
+            _encode_value(item, inner, step, out)
+            sep = "," + inner
+        out.append(pad + "}")
+    elif isinstance(value, (list, tuple)) and value:
+        out.append("[")
+        sep = inner
+        for item in value:
+            out.append(sep)
+            _encode_value(item, inner, step, out)
+            sep = "," + inner
+        out.append(pad + "]")
+    else:
+        out.append(json.dumps(value))
+
+
+def dumps(value: Any, indent: int = 2) -> str:
+    """``json.dumps(value, indent=indent)`` that also encodes records, without building dicts.
+
+    Only the few containers around the server list go through this Python
+    walk; each record is rendered by one string build, which is both faster
+    and far lighter than the stdlib's indenting encoder.
+    """
+    out: List[str] = []
+    _encode_value(value, "\n", " " * indent, out)
+    return "".join(out)
+
+
+def json_default(value: Any) -> Any:
+    """``json.dumps(default=...)`` hook that expands records as they are written."""
+    if isinstance(value, ServerRecord):
+        return value.to_dict()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
@@ -0,0 +1,110 @@
+"""Publish the Proton catalog into Redis for the Go control plane.
+
+After a refresh the sidecar mirrors the catalog as one hash per server,
+a set of server ids and the catalog version/digest, then announces the new
+version on a pub/sub channel, so consumers can react without polling files.
+Everything for one version goes out in a single MULTI/EXEC pipeline.
+
+Only servers that changed since the version already in Redis are written;
+when that version is unknown (first run, restart, fell out of the snapshot
+ring) the whole catalog is rewritten and stale servers are removed.
+
+Key names mirror app/orchestrator/internal/rediskeys/keys.go.
+redis-py is imported lazily: the sidecar runs without it unless publishing
+is enabled.
+"""
+from __future__ import annotations
+
+import json
+from typing import Any, Dict, Iterable, Optional
+
+from app.vpn.catalog import CatalogSnapshots, server_key
+
+PROTON_SERVERS_INDEX = "proton:servers:all"
+PROTON_CATALOG_VERSION = "proton:catalog:version"
+PROTON_CATALOG_DIGEST = "proton:catalog:digest"
+PROTON_CATALOG_CHANGED = "proton:catalog_changed"
+
+
+def server_id(entry: Dict[str, Any]) -> str:
+    vpn, hostname = server_key(entry)
+    return f"{vpn}:{hostname}"
+
+
+def proton_server_key(sid: str) -> str:
+    return f"proton:server:{sid}"
+
+
+def _hash_fields(entry: Dict[str, Any]) -> Dict[str, str]:
+    # Strings as-is; everything else (ips, load, flags) JSON-encoded.
+    return {key: value if isinstance(value, str) else json.dumps(value) for key, value in entry.items()}
+
+
+class CatalogRedisPublisher:
+    """Mirrors catalog versions from CatalogSnapshots into Redis."""
+
+    def __init__(self, host: str = "localhost", port: int = 6379, db: int = 0, client: Any = None):
+        if client is None:
+            try:
+                import redis
+            except ImportError as exc:
+                raise RuntimeError("Redis publishing needs redis-py: pip install redis") from exc
+            client = redis.Redis(host=host, port=port, db=db, decode_responses=True, socket_timeout=10)
+        self._rdb = client
+
+    def publish(self, snapshots: CatalogSnapshots) -> Optional[Dict[str, Any]]:
+        """Bring Redis up to the latest snapshot; returns what was written, or None with no snapshot yet."""
+        raw_version = self._rdb.get(PROTON_CATALOG_VERSION)
+        since = int(raw_version) if raw_version and str(raw_version).isdigit() else None
+        delta = snapshots.delta(since)
+        if delta is None:
+            return None
+
+        summary = {
+            "version": delta["version"],
+            "full": delta["full"],
+            "written": len(delta["added"]) + len(delta["modified"]),
+            "removed": len(delta["removed"]),
+        }
+        if not delta["full"] and delta["version"] == since:
+            return summary
+
+        removed_ids = [server_id(entry) for entry in delta["removed"]]
+        if delta["full"]:
+            # Whatever Redis holds from an unknown version and is not in the catalog now.
+            current = {server_id(entry) for entry in delta["added"]}
+            removed_ids = [sid for sid in self._rdb.smembers(PROTON_SERVERS_INDEX) if sid not in current]
+            summary["removed"] = len(removed_ids)
+
+        pipe = self._rdb.pipeline(transaction=True)
+        if delta["full"]:
+            pipe.delete(PROTON_SERVERS_INDEX)
+        self._queue_removals(pipe, removed_ids)
+        self._queue_writes(pipe, delta["added"], index=True)
+        self._queue_writes(pipe, delta["modified"], index=False)
+        pipe.set(PROTON_CATALOG_VERSION, delta["version"])
+        pipe.set(PROTON_CATALOG_DIGEST, delta["digest"])
+        pipe.publish(PROTON_CATALOG_CHANGED, f"catalog_updated:{delta['version']}")
+        pipe.execute()
+        return summary
+
+    @staticmethod
+    def _queue_removals(pipe: Any, ids: Iterable[str]) -> None:
+        ids = list(ids)
+        if not ids:
+            return
+        pipe.delete(*(proton_server_key(sid) for sid in ids))
+        pipe.srem(PROTON_SERVERS_INDEX, *ids)
+
+    @staticmethod
+    def _queue_writes(pipe: Any, entries: Iterable[Dict[str, Any]], index: bool) -> None:
+        ids = []
+        for entry in entries:
+            sid = server_id(entry)
+            key = proton_server_key(sid)
+            # Replace, not merge: a flag dropped from the entry must disappear from the hash.
+            pipe.delete(key)
+            pipe.hset(key, mapping=_hash_fields(entry))
+            ids.append(sid)
+        if index and ids:
+            pipe.sadd(PROTON_SERVERS_INDEX, *ids)
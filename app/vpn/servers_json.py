@@ -0,0 +1,203 @@
+"""Streaming splice of a single provider section into a Gluetun servers.json.
+
+Gluetun's servers.json holds one top-level member per provider and can run to
+tens of megabytes.  Replacing the ``protonvpn`` member used to mean parsing the
+whole document and re-serializing every provider.  ``splice_member`` instead
+memory-maps the existing file, locates the byte range of each top-level member
+and copies the untouched ones straight into the new file, so cost scales with
+the section being written rather than with the whole catalog.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import mmap
+import os
+import re
+import tempfile
+from pathlib import Path
+from typing import Any, BinaryIO, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_COPY_BLOCK = 1 << 20
+
+_WS = re.compile(rb"[ \t\r\n]*")
+# Body of a JSON string after its opening quote, up to and including the closing
+# quote.  Patterns are written in "unrolled loop" form so the regex engine
+# consumes long runs with a single character-class scan.
+_STRING_TAIL = re.compile(rb'[^"\\]*(?:\\.[^"\\]*)*"', re.S)
+# Run of strings and non-bracket bytes; stops on the next structural bracket.
+_NESTED_RUN = re.compile(rb'[^"{}\[\]]*(?:"[^"\\]*(?:\\.[^"\\]*)*"[^"{}\[\]]*)*', re.S)
+_SCALAR = re.compile(rb"[^,}\]\s]+")
+
+# (decoded key, start offset of the key's opening quote, end offset of the value)
+Member = Tuple[str, int, int]
+
+
+def _skip_ws(buf: Any, pos: int) -> int:
+    return _WS.match(buf, pos).end()
+
+
+def _string_end(buf: Any, pos: int) -> int:
+    match = _STRING_TAIL.match(buf, pos + 1)
+    if match is None:
+        raise ValueError(f"unterminated string at offset {pos}")
+    return match.end()
+
+
+def _value_end(buf: Any, pos: int) -> int:
+    first = buf[pos:pos + 1]
+    if first == b'"':
+        return _string_end(buf, pos)
+    if first not in (b"{", b"["):
+        match = _SCALAR.match(buf, pos)
+        if match is None:
+            raise ValueError(f"expected a value at offset {pos}")
+        return match.end()
+
+    depth = 0
+    size = len(buf)
+    while pos < size:
+        byte = buf[pos]
+        if byte in (0x7B, 0x5B):  # { [
+            depth += 1
+        elif byte in (0x7D, 0x5D):  # } ]
+            depth -= 1
+            if depth == 0:
+                return pos + 1
+        pos = _NESTED_RUN.match(buf, pos + 1).end()
+    raise ValueError("unbalanced brackets in servers JSON")
+
+
+def scan_members(buf: Any) -> List[Member]:
+    """Return the top-level members of the JSON object held in ``buf``.
+
+    Raises ValueError when ``buf`` is not a well-formed top-level object.
+    Nested values are only bracket-matched, never decoded.
+    """
+    pos = _skip_ws(buf, 0)
+    if buf[pos:pos + 1] != b"{":
+        raise ValueError("servers JSON is not an object")
+    pos = _skip_ws(buf, pos + 1)
+
+    members: List[Member] = []
+    if buf[pos:pos + 1] == b"}":
+        return members
+
+    while True:
+        if buf[pos:pos + 1] != b'"':
+            raise ValueError(f"expected a member name at offset {pos}")
+        key_end = _string_end(buf, pos)
+        key = json.loads(bytes(buf[pos:key_end]))
+        colon = _skip_ws(buf, key_end)
+        if buf[colon:colon + 1] != b":":
+            raise ValueError(f"expected ':' at offset {colon}")
+        value_start = _skip_ws(buf, colon + 1)
+        value_end = _value_end(buf, value_start)
+        members.append((key, pos, value_end))
+
+        pos = _skip_ws(buf, value_end)
+        sep = buf[pos:pos + 1]
+        if sep == b"}":
+            break
+        if sep != b",":
+            raise ValueError(f"expected ',' or '}}' at offset {pos}")
+        pos = _skip_ws(buf, pos + 1)
+
+    if _skip_ws(buf, pos + 1) != len(buf):
+        raise ValueError("trailing data after servers JSON object")
+    return members
+
+
+def _dumps_indented(value: Any) -> str:
+    return json.dumps(value, indent=2)
+
+
+def _encode_member(key: str, value: Any, encode: Callable[[Any], str] = _dumps_indented) -> bytes:
+    # JSON escapes newlines inside strings, so every literal newline is layout
+    # and can be re-indented one level for nesting under the root.
+    text = encode(value).replace("\n", "\n  ")
+    return f"{json.dumps(key)}: {text}".encode("utf-8")
+
+
+def _copy_range(buf: Any, start: int, end: int, out: BinaryIO) -> None:
+    while start < end:
+        stop = min(end, start + _COPY_BLOCK)
+        out.write(buf[start:stop])
+        start = stop
+
+
+def _write_members(
+    out: BinaryIO,
+    buf: Any,
+    members: List[Member],
+    key: str,
+    value: Any,
+    defaults: Dict[str, Any],
+    encode: Callable[[Any], str],
+) -> None:
+    present = {name for name, _, _ in members}
+    parts: List[Tuple[Optional[bytes], int, int]] = []
+    for name, default in defaults.items():
+        if name not in present and name != key:
+            parts.append((_encode_member(name, default), 0, 0))
+
+    replaced = False
+    for name, start, end in members:
+        if name == key:
+            if not replaced:
+                parts.append((_encode_member(key, value, encode), 0, 0))
+                replaced = True
+            continue
+        parts.append((None, start, end))
+    if not replaced:
+        parts.append((_encode_member(key, value, encode), 0, 0))
+
+    out.write(b"{\n")
+    for index, (encoded, start, end) in enumerate(parts):
+        out.write(b"  " if index == 0 else b",\n  ")
+        if encoded is not None:
+            out.write(encoded)
+        else:
+            _copy_range(buf, start, end, out)
+    out.write(b"\n}")
+
+
+def splice_member(
+    path: Path,
+    key: str,
+    value: Any,
+    defaults: Optional[Dict[str, Any]] = None,
+    encode: Callable[[Any], str] = _dumps_indented,
+) -> None:
+    """Atomically replace (or add) top-level member ``key`` of the JSON file at ``path``.
+
+    Other members are copied byte-for-byte.  Members in ``defaults`` are added
+    when missing.  A missing, empty or unparsable file is replaced by a fresh
+    object holding only ``defaults`` and ``key``.  ``encode`` renders ``value``
+    as 2-space indented JSON text (``json.dumps`` by default).
+    """
+    defaults = defaults or {}
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    with tempfile.NamedTemporaryFile("wb", dir=str(path.parent), delete=False) as temp_file:
+        temp_name = temp_file.name
+        try:
+            with path.open("rb") as existing:
+                with mmap.mmap(existing.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+                    members = scan_members(buf)
+                    _write_members(temp_file, buf, members, key, value, defaults, encode)
+        except (FileNotFoundError, ValueError) as exc:
+            # ValueError also covers mmap of an empty file.
+            if not isinstance(exc, FileNotFoundError):
+                logger.warning("Failed to parse existing servers file at %s; creating fresh structure", path)
+            temp_file.seek(0)
+            temp_file.truncate()
+            _write_members(temp_file, b"", [], key, value, defaults, encode)
+        except BaseException:
+            temp_file.close()
+            os.unlink(temp_name)
+            raise
+
+    os.replace(temp_name, path)
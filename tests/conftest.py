@@ -0,0 +1,49 @@
+"""Shared fixtures: the Proton API stand-in from tools/ and an updater wired to it."""
+import asyncio
+import os
+import sys
+from collections import OrderedDict
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, "tools")]
+
+import proton_standin  # noqa: E402
+from app.vpn.breaker import CircuitBreaker  # noqa: E402
+from app.vpn.proton_updater import ProtonServerUpdater  # noqa: E402
+
+
+@pytest.fixture
+def standin():
+    """The stand-in serving a small catalog without latency, errors or 2FA."""
+    proton_standin.reset(logicals=300, auth_ms=0, api_ms=0, jitter=0, error_rate=0, require_2fa=False)
+    return proton_standin
+
+
+@pytest.fixture
+def updater(standin, tmp_path):
+    return ProtonServerUpdater(storage_path=str(tmp_path), session_factory=standin.session_types)
+
+
+@pytest.fixture
+def service(standin, tmp_path, monkeypatch):
+    """app.proton_service with fresh refresh state and an updater on the stand-in.
+
+    httpx's ASGITransport sends no lifespan events, so neither the warm-up
+    nor the scheduler runs.
+    """
+    from app import proton_service
+
+    monkeypatch.setattr(proton_service, "_updater", ProtonServerUpdater(
+        storage_path=str(tmp_path),
+        executor=proton_service._executor,
+        breaker=CircuitBreaker(),
+        session_factory=standin.session_types,
+    ))
+    monkeypatch.setattr(proton_service, "_jobs", OrderedDict())
+    monkeypatch.setattr(proton_service, "_inflight", {})
+    monkeypatch.setattr(proton_service, "_write_lock", asyncio.Lock())
+    monkeypatch.setattr(proton_service, "_last_request", None)
+    monkeypatch.setattr(proton_service, "_last_result", None)
+    return proton_service
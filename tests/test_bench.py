@@ -0,0 +1,66 @@
+"""Synthetic payload generator and the updater benchmark's reporting."""
+import argparse
+import json
+
+import pytest
+
+import proton_bench
+from proton_synth import P2P, SECURE_CORE, SECURE_CORE_ENTRIES, generate_logicals
+
+
+def physicals(payload):
+    return [server for logical in payload["LogicalServers"] for server in logical["Servers"]]
+
+
+def test_generator_is_seeded():
+    assert generate_logicals(200, seed=7) == generate_logicals(200, seed=7)
+    assert generate_logicals(200, seed=7) != generate_logicals(200, seed=8)
+
+
+def test_generator_counts_and_ratios():
+    payload = generate_logicals(500, seed=1, physicals=(2, 3), ipv6_ratio=0.0, dup_ratio=0.0, down_ratio=0.0)
+    logicals = payload["LogicalServers"]
+    assert len(logicals) == 500
+    assert all(2 <= len(logical["Servers"]) <= 3 for logical in logicals)
+    assert all(logical["Status"] == 1 for logical in logicals)
+    assert not any("EntryIPv6" in server for server in physicals(payload))
+    ips = [server["EntryIP"] for server in physicals(payload)]
+    assert len(set(ips)) == len(ips)
+
+    payload = generate_logicals(500, seed=1, ipv6_ratio=1.0, dup_ratio=0.5)
+    assert all("EntryIPv6" in server for server in physicals(payload))
+    ips = [server["EntryIP"] for server in physicals(payload)]
+    assert len(set(ips)) < len(ips)
+
+
+def test_generator_feature_mix():
+    payload = generate_logicals(300, seed=1, feature_mix={P2P: 1.0}, free_ratio=0.0)
+    assert all(logical["Features"] == P2P for logical in payload["LogicalServers"])
+    assert all(logical["Tier"] == 2 for logical in payload["LogicalServers"])
+
+    payload = generate_logicals(300, seed=1, feature_mix={SECURE_CORE: 1.0})
+    for logical in payload["LogicalServers"]:
+        assert logical["EntryCountry"] in SECURE_CORE_ENTRIES
+        assert logical["Name"].startswith(f"{logical['EntryCountry']}-{logical['ExitCountry']}#")
+
+
+def test_run_writes_results_json(tmp_path, capsys):
+    output = tmp_path / "bench.json"
+    proton_bench.run(argparse.Namespace(
+        targets="transform,write,merge", scales="1", base_logicals=200, other_ratio=1,
+        seed=1, repeat=1, output=str(output), compare=None, threshold=0.1,
+    ))
+    report = json.loads(output.read_text())
+    rows = {row["target"]: row for row in report["results"]}
+    assert set(rows) == {"transform", "write", "merge"}
+    for row in rows.values():
+        assert row["scale"] == 1 and row["logicals"] == 200
+        assert row["wall_s"] > 0 and row["peak_rss_mb"] > 0
+        assert {"heap_peak_mb", "alloc_blocks", "wall_runs"} <= set(row)
+
+
+@pytest.mark.parametrize("slowdown, regressions", [(1.05, 0), (1.2, 1)])
+def test_compare_flags_wall_time_regressions(slowdown, regressions, capsys):
+    baseline = {"results": [{"target": "transform", "scale": 1, "wall_s": 1.0, "peak_rss_mb": 100, "heap_peak_mb": 10}]}
+    results = [dict(baseline["results"][0], wall_s=slowdown)]
+    assert proton_bench.compare(results, baseline, threshold=0.1) == regressions
@@ -0,0 +1,124 @@
+"""Circuit breaker around Proton API refreshes, driven through the stand-in."""
+import asyncio
+import contextlib
+
+import pytest
+
+from app.vpn.breaker import CircuitBreaker, CircuitOpenError
+from app.vpn.proton_updater import ProtonConfigError, ProtonServerUpdater
+
+CREDENTIALS = {"proton_username": "user", "proton_password": "pw", "gluetun_json_mode": "none"}
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+@pytest.fixture
+def breaker(clock):
+    # rng=1.0 puts every delay at the top of its jitter range.
+    return CircuitBreaker(failure_threshold=3, base_delay=10, max_delay=40, clock=clock, rng=lambda: 1.0)
+
+
+@pytest.fixture
+def guarded(standin, breaker, tmp_path):
+    return ProtonServerUpdater(storage_path=str(tmp_path), breaker=breaker, session_factory=standin.session_types)
+
+
+def refresh(updater):
+    return asyncio.run(updater.update(**CREDENTIALS))
+
+
+def open_circuit(updater, standin):
+    standin.CONFIG.error_rate = 1.0
+    for _ in range(updater.breaker.failure_threshold):
+        with pytest.raises(standin.StandinAPIError):
+            refresh(updater)
+    standin.CONFIG.error_rate = 0.0
+
+
+def test_opens_after_threshold_failures(standin, guarded):
+    standin.CONFIG.error_rate = 1.0
+    for _ in range(3):
+        assert guarded.breaker.state == "closed"
+        with pytest.raises(standin.StandinAPIError):
+            refresh(guarded)
+    assert guarded.breaker.state == "open"
+
+    logins = standin.CALLS["auth"]
+    with pytest.raises(CircuitOpenError):
+        refresh(guarded)
+    assert standin.CALLS["auth"] == logins
+
+
+def test_backoff_doubles_with_jitter(clock):
+    draws = iter([0.0, 1.0, 0.5, 1.0])
+    breaker = CircuitBreaker(failure_threshold=1, base_delay=10, max_delay=40, clock=clock, rng=lambda: next(draws))
+    # Each delay lands in [delay/2, delay]: 10 -> 20 -> 40 -> capped at 40.
+    for expected in (5.0, 20.0, 30.0, 40.0):
+        breaker.record_failure(RuntimeError("down"))
+        assert breaker.retry_after() == pytest.approx(expected)
+        clock.now += expected
+        assert breaker.state == "half_open"
+        breaker.before_call()
+
+
+def test_cancelled_trial_is_released(standin, guarded, clock):
+    open_circuit(guarded, standin)
+    clock.now += 10
+    standin.CONFIG.auth_ms = 200
+
+    async def cancel_midway():
+        task = asyncio.create_task(guarded.update(**CREDENTIALS))
+        await asyncio.sleep(0.05)
+        assert guarded.breaker.retry_after() > 0  # the trial is taken
+        task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await task
+
+    asyncio.run(cancel_midway())
+    assert guarded.breaker.state == "half_open"
+    assert guarded.breaker.retry_after() == 0
+
+
+def test_config_error_is_not_counted(standin, guarded, clock):
+    open_circuit(guarded, standin)
+    clock.now += 10
+    standin.CONFIG.require_2fa = True
+
+    with pytest.raises(ProtonConfigError, match="2FA is required"):
+        refresh(guarded)
+    assert guarded.breaker.state == "half_open"
+    assert guarded.breaker.retry_after() == 0
+    assert guarded.breaker.to_dict()["consecutive_failures"] == 3
+
+
+def test_successful_trial_closes(standin, guarded, clock):
+    open_circuit(guarded, standin)
+    clock.now += 10
+
+    result = refresh(guarded)
+    assert result["stats"]["output_servers"] > 0
+    assert guarded.breaker.to_dict() == {
+        "state": "closed", "consecutive_failures": 0, "retry_after_s": 0.0, "last_error": None,
+    }
+
+
+def test_failed_trial_reopens_with_longer_delay(standin, guarded, clock):
+    open_circuit(guarded, standin)
+    clock.now += 10
+    standin.CONFIG.error_rate = 1.0
+
+    with pytest.raises(standin.StandinAPIError):
+        refresh(guarded)
+    assert guarded.breaker.state == "open"
+    assert guarded.breaker.retry_after() == pytest.approx(20.0)
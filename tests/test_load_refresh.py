@@ -0,0 +1,74 @@
+"""Load-only refreshes patch the last full catalog and follow servers going down and up."""
+import asyncio
+import json
+
+from app.vpn.proton_updater import P2P, ProtonFilterConfig
+
+CREDENTIALS = {"proton_username": "user", "proton_password": "pw"}
+PROFILES = {"p2p": ProtonFilterConfig(p2p="only")}
+
+
+def hostnames(path):
+    return {entry["hostname"] for entry in json.loads(path.read_text())["protonvpn"]["servers"]}
+
+
+def full_refresh(updater):
+    return asyncio.run(updater.update(gluetun_json_mode="none", profiles=PROFILES, **CREDENTIALS))
+
+
+def load_refresh(updater):
+    return asyncio.run(updater.update_loads(**CREDENTIALS))
+
+
+def served_p2p_logical(standin, tmp_path):
+    """An up P2P logical whose servers made it into both output files."""
+    main, profile = hostnames(tmp_path / "servers-proton.json"), hostnames(tmp_path / "servers-proton-p2p.json")
+    for logical in standin._logicals_payload()["LogicalServers"]:
+        if logical["Features"] & P2P and logical["Status"] == 1 and logical["Domain"] in main & profile:
+            return logical
+    raise AssertionError("no P2P logical in the stand-in catalog")
+
+
+def test_load_refresh_patches_loads(standin, updater, monkeypatch):
+    full_refresh(updater)
+    served = []
+    original = standin._loads_payload
+    monkeypatch.setattr(standin, "_loads_payload", lambda: served.append(original()) or served[-1])
+
+    result = load_refresh(updater)
+
+    reported = {item["ID"]: item["Load"] for item in served[0]["LogicalServers"]}
+    expected = {
+        logical["Domain"]: reported[logical["ID"]] for logical in standin._logicals_payload()["LogicalServers"]
+    }
+    _, servers = updater.query_servers(limit=10000)
+    assert result["refresh"] == "loads"
+    assert result["stats"]["patched"] > 0
+    assert servers and all(entry.load == expected[entry.hostname] for entry in servers)
+
+
+def test_down_server_is_dropped_and_comes_back(standin, updater, tmp_path):
+    full = full_refresh(updater)
+    logical = served_p2p_logical(standin, tmp_path)
+    files = (tmp_path / "servers-proton.json", tmp_path / "servers-proton-p2p.json")
+
+    standin.set_status(logical["ID"], 0)
+    down = load_refresh(updater)
+    assert down["changed"] and down["profiles"]["p2p"]["changed"]
+    assert down["stats"]["dropped"] > 0 and down["profiles"]["p2p"]["stats"]["dropped"] > 0
+    assert all(logical["Domain"] not in hostnames(path) for path in files)
+
+    standin.set_status(logical["ID"], 1)
+    up = load_refresh(updater)
+    assert all(logical["Domain"] in hostnames(path) for path in files)
+    assert up["stats"]["output_servers"] == full["stats"]["output_servers"]
+    assert up["profiles"]["p2p"]["stats"]["output_servers"] == full["profiles"]["p2p"]["stats"]["output_servers"]
+    assert up["digest"] == full["digest"]
+
+
+def test_unchanged_loads_refresh_does_not_rewrite(standin, updater):
+    full_refresh(updater)
+    load_refresh(updater)
+    result = load_refresh(updater)
+    assert not result["changed"]
+    assert not result["profiles"]["p2p"]["changed"]
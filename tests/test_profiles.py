@@ -0,0 +1,32 @@
+"""Filter profiles written beside servers-proton.json."""
+import asyncio
+import json
+
+from app.vpn.proton_updater import CATALOG_STATE_FILE, ProtonFilterConfig
+
+CREDENTIALS = {"proton_username": "user", "proton_password": "pw", "gluetun_json_mode": "none"}
+
+
+def refresh(updater, *names):
+    profiles = {name: ProtonFilterConfig(**{name: "only"}) for name in names}
+    return asyncio.run(updater.update(profiles=profiles, **CREDENTIALS))
+
+
+def test_profiles_no_longer_requested_are_removed(updater, tmp_path):
+    first = refresh(updater, "p2p", "tor")
+    assert set(first["profiles"]) == {"p2p", "tor"}
+    assert "profiles_removed" not in first
+    unmanaged = tmp_path / "servers-proton-manual.json"
+    unmanaged.write_text("{}")
+
+    second = refresh(updater, "p2p")
+    assert second["profiles_removed"] == ["tor"]
+    assert (tmp_path / "servers-proton-p2p.json").exists()
+    assert not (tmp_path / "servers-proton-tor.json").exists()
+    assert unmanaged.exists()
+    state = json.loads((tmp_path / CATALOG_STATE_FILE).read_text())
+    assert "servers-proton-tor.json" not in state and "servers-proton-p2p.json" in state
+
+    third = refresh(updater)
+    assert third["profiles_removed"] == ["p2p"]
+    assert sorted(path.name for path in tmp_path.glob("servers-proton-*.json")) == ["servers-proton-manual.json"]
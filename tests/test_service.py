@@ -0,0 +1,66 @@
+"""The sidecar's HTTP API over httpx's ASGITransport, with the stand-in behind it."""
+import asyncio
+import time
+
+import httpx
+import pytest
+
+CREDENTIALS = {"proton_username": "user", "proton_password": "pw", "gluetun_json_mode": "none"}
+
+
+def call(service, method, url, **kwargs):
+    async def send():
+        transport = httpx.ASGITransport(app=service.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://sidecar") as client:
+            return await client.request(method, url, **kwargs)
+
+    return asyncio.run(send())
+
+
+@pytest.mark.parametrize("body", [
+    {"filters": {"ipv6": "bogus"}},
+    {"filters": {"colour": "only"}},
+    {"profiles": {"Bad Name": {}}},
+    {"profiles": {"p2p": {"p2p": "sometimes"}}},
+    {"shards": "planet"},
+])
+@pytest.mark.parametrize("why", ["circuit_open", "refresh_pending"])
+def test_invalid_request_is_rejected_before_stale_answer(service, body, why):
+    assert call(service, "POST", "/refresh", json=CREDENTIALS).status_code == 200
+    if why == "circuit_open":
+        for _ in range(service._updater.breaker.failure_threshold):
+            service._updater.breaker.record_failure(RuntimeError("down"))
+    else:
+        service._inflight["other"] = object()
+
+    response = call(service, "POST", "/refresh", json={**CREDENTIALS, **body})
+    assert response.status_code == 400
+
+    response = call(service, "POST", "/refresh", json=CREDENTIALS)
+    assert response.status_code == 200
+    assert response.json()["status"] == "stale"
+    assert response.json()["stale"]["reason"] == why
+
+
+def test_health_stays_responsive_during_refresh(service, standin):
+    # Twice today's catalog, generated up front so only the refresh itself runs concurrently.
+    standin.CONFIG.logicals = 24000
+    standin._logicals_payload()
+
+    async def probe():
+        transport = httpx.ASGITransport(app=service.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://sidecar", timeout=60) as client:
+            refresh = asyncio.create_task(client.post("/refresh", json={**CREDENTIALS, "gluetun_json_mode": "update"}))
+            latencies = []
+            while not refresh.done():
+                started = time.perf_counter()
+                assert (await client.get("/health")).status_code == 200
+                latencies.append(time.perf_counter() - started)
+                await asyncio.sleep(0.01)
+            return await refresh, sorted(latencies)
+
+    response, latencies = asyncio.run(probe())
+    assert response.status_code == 200
+    assert len(latencies) >= 20
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    assert p99 < 0.25
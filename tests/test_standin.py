@@ -0,0 +1,66 @@
+"""Session factory and the Proton API stand-in: login, 2FA, token refresh and coalescing."""
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from app.vpn.proton_updater import ProtonConfigError, ProtonServerUpdater
+
+CREDENTIALS = {"proton_username": "user", "proton_password": "pw", "gluetun_json_mode": "none"}
+TOTP_SECRET = "JBSWY3DPEHPK3PXP"
+
+
+def refresh(updater, **kwargs):
+    return asyncio.run(updater.update(**{**CREDENTIALS, **kwargs}))
+
+
+def test_session_factory_skips_gpg(standin, updater, monkeypatch):
+    monkeypatch.setattr(ProtonServerUpdater, "_check_gpg_available", staticmethod(lambda: False))
+    result = refresh(updater)
+    assert result["stats"]["output_servers"] > 0
+    assert standin.CALLS["auth"] == 1 and standin.CALLS["api"] == 1
+
+
+def test_two_factor_login(standin, updater):
+    standin.CONFIG.require_2fa = True
+    with pytest.raises(ProtonConfigError, match="2FA is required"):
+        refresh(updater)
+
+    result = refresh(updater, proton_totp_secret=TOTP_SECRET)
+    assert result["totp_used"]
+    assert standin.CALLS["2fa"] == 1
+
+
+def test_cached_session_is_reused_from_memory_and_disk(standin, updater, tmp_path):
+    refresh(updater)
+    assert refresh(updater)["session_cache"]["source"] == "memory"
+
+    restarted = ProtonServerUpdater(storage_path=str(tmp_path), session_factory=standin.session_types)
+    assert refresh(restarted)["session_cache"]["source"] == "disk"
+    assert standin.CALLS["auth"] == 1
+
+
+def test_expired_tokens_are_refreshed_without_login(standin, updater):
+    standin.CONFIG.token_ttl_s = 0.2
+    refresh(updater)
+    time.sleep(0.3)
+    result = refresh(updater)
+    assert result["session_cache"]["hit"]
+    assert standin.CALLS["auth"] == 1 and standin.CALLS["refresh"] == 1
+
+
+def test_concurrent_refreshes_share_one_fetch(standin, service):
+    standin.CONFIG.api_ms = 100
+
+    async def burst():
+        transport = httpx.ASGITransport(app=service.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://sidecar") as client:
+            return await asyncio.gather(*(client.post("/refresh", json=CREDENTIALS) for _ in range(8)))
+
+    responses = asyncio.run(burst())
+    assert all(response.status_code == 200 for response in responses)
+    bodies = [response.json() for response in responses]
+    assert len({body["job_id"] for body in bodies}) == 1
+    assert sum(body["coalesced"] for body in bodies) == 7
+    assert standin.CALLS["auth"] == 1 and standin.CALLS["api"] == 1
@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+"""
+Proton updater benchmark suite.
+
+Generates a seeded synthetic LogicalServers payload (tools/proton_synth.py)
+and times the ProtonServerUpdater hot paths at several multiples of today's
+catalog size:
+
+    transform   _transform_to_gluetun over the raw payload
+    write       _atomic_write_json of the transformed protonvpn payload
+    merge       update-mode splice into a multi-provider servers.json
+    merge_full  pre-splice merge (json.loads + json.dumps of the whole file)
+
+Each (target, scale) case runs in a fresh process so peak RSS is not
+polluted by earlier cases.  Wall time is the best of --repeat runs; heap
+peak and surviving allocation blocks come from a separate tracemalloc run.
+The 100x scale needs tens of GB of RAM for the merge targets; pass a
+smaller --scales list on laptops.
+
+Usage:
+    python tools/proton_bench.py [options]
+
+Options:
+    --targets        Comma list of targets     (default: transform,write,merge)
+    --scales         Comma list of multipliers (default: 1,10,100)
+    --base-logicals  Logical servers at 1x     (default: 12000)
+    --other-ratio    Other-provider servers per Proton server in servers.json (default: 4)
+    --seed           Generator seed            (default: 1)
+    --repeat         Timed runs per case       (default: 3)
+    --output FILE    Write results as JSON
+    --compare FILE   Compare against an earlier --output file; exit 1 on regression
+    --threshold      Allowed slowdown before a case counts as a regression (default: 0.10)
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "tools"))
+
+from app.vpn.proton_updater import ProtonFilterConfig, ProtonServerUpdater  # noqa: E402
+from app.vpn.records import dumps as dump_records, json_default  # noqa: E402
+from app.vpn.servers_json import splice_member  # noqa: E402
+from proton_synth import BASE_LOGICALS, generate_logicals  # noqa: E402
+
+TARGETS = ("transform", "write", "merge", "merge_full")
+OTHER_PROVIDERS = ("mullvad", "nordvpn", "surfshark", "private internet access", "expressvpn")
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Memory probes
+# ──────────────────────────────────────────────────────────────────────────────
+def _rss_mb():
+    """Current resident set size; falls back to the peak where /proc is missing."""
+    try:
+        with open("/proc/self/statm") as fh:
+            return int(fh.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1e6
+    except (OSError, ValueError, IndexError):
+        return _peak_rss_mb()
+
+
+def _peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes.
+    return peak / 1e6 if sys.platform == "darwin" else peak * 1024 / 1e6
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Synthetic servers.json
+# ──────────────────────────────────────────────────────────────────────────────
+def _server(provider, i):
+    return {
+        "vpn": "wireguard" if i % 2 else "openvpn",
+        "country": "Switzerland",
+        "city": "Zurich",
+        "hostname": f"{provider.replace(' ', '-')}-{i}.example.net",
+        "ips": [f"10.{(i >> 16) & 255}.{(i >> 8) & 255}.{i & 255}"],
+        "wgpubkey": "x" * 44,
+    }
+
+
+def build_servers_json(other_servers):
+    per_provider = max(1, other_servers // len(OTHER_PROVIDERS))
+    doc = {"version": 1}
+    for provider in OTHER_PROVIDERS:
+        doc[provider] = {
+            "version": 1,
+            "timestamp": 0,
+            "servers": [_server(provider, i) for i in range(per_provider)],
+        }
+    doc["protonvpn"] = {"version": 4, "timestamp": 0, "servers": []}
+    return json.dumps(doc, indent=2)
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Targets
+# ──────────────────────────────────────────────────────────────────────────────
+def merge_full(path, proton):
+    """Pre-splice behaviour: json.loads the whole file, swap one key, json.dumps it back."""
+    existing = json.loads(path.read_text(encoding="utf-8"))
+    existing.setdefault("version", 1)
+    existing["protonvpn"] = proton
+    data = json.dumps(existing, indent=2, default=json_default)
+    with tempfile.NamedTemporaryFile("w", encoding="utf-8", dir=str(path.parent), delete=False) as temp_file:
+        temp_file.write(data)
+        temp_name = temp_file.name
+    os.replace(temp_name, path)
+
+
+def merge_splice(path, proton):
+    splice_member(path, "protonvpn", proton, defaults={"version": 1}, encode=dump_records)
+
+
+def _prepare(target, case, workdir):
+    """Return (func, setup) for one case; ``setup`` runs untimed before every call."""
+    updater = ProtonServerUpdater(storage_path=str(workdir))
+    filters = ProtonFilterConfig()
+    api_data = generate_logicals(case["logicals"], seed=case["seed"])
+    case["physicals"] = sum(len(logical["Servers"]) for logical in api_data["LogicalServers"])
+
+    if target == "transform":
+        return (lambda: updater._transform_to_gluetun(api_data, filters)), None
+
+    payload, _ = updater._transform_to_gluetun(api_data, filters)
+    del api_data
+    case["output_servers"] = len(payload["protonvpn"]["servers"])
+
+    if target == "write":
+        path = workdir / "servers-proton.json"
+        return (lambda: updater._atomic_write_json(path, payload)), None
+
+    path = workdir / "servers.json"
+    seed = build_servers_json(case["output_servers"] * case["other_ratio"])
+    case["servers_json_mb"] = round(len(seed) / 1e6, 1)
+    merge = merge_splice if target == "merge" else merge_full
+    proton = payload["protonvpn"]
+    return (lambda: merge(path, proton)), (lambda: path.write_text(seed, encoding="utf-8"))
+
+
+def run_case(target, case):
+    """Child-process entry point: time one target at one scale."""
+    workdir = Path(tempfile.mkdtemp(prefix="proton-bench-"))
+    try:
+        func, setup = _prepare(target, case, workdir)
+        rss_base = _rss_mb()
+
+        samples = []
+        for _ in range(case["repeat"]):
+            if setup:
+                setup()
+            started = time.perf_counter()
+            func()
+            samples.append(time.perf_counter() - started)
+        peak_rss = _peak_rss_mb()
+
+        # Separate run: tracemalloc hooks every allocation and would skew wall time.
+        if setup:
+            setup()
+        blocks = sys.getallocatedblocks()
+        tracemalloc.start()
+        kept = func()
+        _, heap_peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        blocks = sys.getallocatedblocks() - blocks
+        del kept
+
+        return dict(
+            case,
+            target=target,
+            wall_s=round(min(samples), 4),
+            wall_runs=[round(s, 4) for s in samples],
+            rss_base_mb=round(rss_base, 1),
+            peak_rss_mb=round(peak_rss, 1),
+            heap_peak_mb=round(heap_peak / 1e6, 1),
+            alloc_blocks=blocks,
+        )
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Reporting
+# ──────────────────────────────────────────────────────────────────────────────
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=ROOT, capture_output=True, text=True, timeout=5,
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def compare(results, baseline, threshold):
+    """Print per-case ratios against ``baseline``; return the number of regressions."""
+    previous = {(r["target"], r["scale"]): r for r in baseline.get("results", [])}
+    print(f"\n  Compared with {baseline.get('commit') or 'baseline'} (threshold {threshold:.0%})\n")
+    print(f"  {'TARGET':<11}  {'SCALE':>5}  {'WALL':>7}  {'PEAK_RSS':>8}  {'HEAP':>7}")
+    print("  " + "─" * 46)
+    regressions = 0
+    for row in results:
+        old = previous.get((row["target"], row["scale"]))
+        if old is None:
+            continue
+        wall = row["wall_s"] / max(old["wall_s"], 1e-9)
+        rss = row["peak_rss_mb"] / max(old["peak_rss_mb"], 1e-9)
+        heap = row["heap_peak_mb"] / max(old["heap_peak_mb"], 1e-9)
+        flag = "  REGRESSION" if wall > 1 + threshold else ""
+        regressions += bool(flag)
+        print(f"  {row['target']:<11}  {row['scale']:>4}x  {wall:>6.2f}x  {rss:>7.2f}x  {heap:>6.2f}x{flag}")
+    print()
+    return regressions
+
+
+def run(args):
+    targets = [t.strip() for t in args.targets.split(",") if t.strip()]
+    unknown = sorted(set(targets) - set(TARGETS))
+    if unknown:
+        sys.exit(f"unknown targets: {', '.join(unknown)} (choose from {', '.join(TARGETS)})")
+    scales = [int(s) for s in args.scales.split(",") if s.strip()]
+
+    print(f"\n  Base    : {args.base_logicals:,} logicals, seed {args.seed}, "
+          f"best of {args.repeat}\n")
+    print(f"  {'TARGET':<11}  {'SCALE':>5}  {'LOGICALS':>9}  {'WALL_S':>8}  "
+          f"{'PEAK_RSS_MB':>11}  {'HEAP_MB':>8}  {'BLOCKS':>9}")
+    print("  " + "─" * 72)
+
+    # spawn: every case starts from a clean interpreter, so ru_maxrss is its own.
+    context = multiprocessing.get_context("spawn")
+    results = []
+    for scale in scales:
+        for target in targets:
+            case = dict(
+                scale=scale,
+                logicals=args.base_logicals * scale,
+                seed=args.seed,
+                repeat=args.repeat,
+                other_ratio=args.other_ratio,
+            )
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+                row = pool.submit(run_case, target, case).result()
+            results.append(row)
+            print(f"  {target:<11}  {scale:>4}x  {row['logicals']:>9,}  {row['wall_s']:>8.3f}  "
+                  f"{row['peak_rss_mb']:>11.1f}  {row['heap_peak_mb']:>8.1f}  {row['alloc_blocks']:>9,}")
+    print()
+
+    report = {
+        "commit": _git_commit(),
+        "created_at": int(time.time()),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "args": vars(args),
+        "results": results,
+    }
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2), encoding="utf-8")
+        print(f"  Results written to {args.output}\n")
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text(encoding="utf-8"))
+        if compare(results, baseline, args.threshold):
+            sys.exit(1)
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(
+        description="Benchmark ProtonServerUpdater transform, write and merge paths",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    ap.add_argument("--targets",       default="transform,write,merge", help="Comma list of targets")
+    ap.add_argument("--scales",        default="1,10,100",              help="Comma list of multipliers")
+    ap.add_argument("--base-logicals", type=int, default=BASE_LOGICALS, help="Logical servers at 1x")
+    ap.add_argument("--other-ratio",   type=int, default=4,             help="Other-provider servers per Proton server")
+    ap.add_argument("--seed",          type=int, default=1,             help="Generator seed")
+    ap.add_argument("--repeat",        type=int, default=3,             help="Timed runs per case")
+    ap.add_argument("--output",        default=None,                    help="Write results JSON here")
+    ap.add_argument("--compare",       default=None,                    help="Baseline results JSON")
+    ap.add_argument("--threshold",     type=float, default=0.10,        help="Allowed wall-time slowdown")
+    run(ap.parse_args())
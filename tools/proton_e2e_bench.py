@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+"""
+End-to-end load test for the Proton sidecar against the local API stand-in.
+
+Starts ``app.proton_service`` under uvicorn with PROTON_SESSION_FACTORY
+pointing at tools/proton_standin.py, waits for /ready, then runs concurrent
+clients for --duration seconds:
+
+    refresh   POST /refresh in a loop (coalescing, write lock, breaker)
+    health    GET /health in a loop (event-loop responsiveness during refreshes)
+
+and reports request counts, status breakdown and latency percentiles per
+endpoint, plus how many refreshes actually ran (from /metrics) against how
+many were requested.  --keys spreads refresh clients over distinct filter
+sets, which cannot coalesce and queue on the write lock instead.
+
+Usage:
+    python tools/proton_e2e_bench.py [options]
+
+Options:
+    --refresh-clients  Concurrent /refresh clients       (default: 8)
+    --health-clients   Concurrent /health clients        (default: 4)
+    --duration         Seconds of load                   (default: 20)
+    --keys             Distinct refresh bodies           (default: 1)
+    --logicals         Logical servers served            (default: 12000)
+    --auth-ms          Stand-in login latency            (default: 300)
+    --api-ms           Stand-in fetch latency            (default: 150)
+    --error-rate       Share of stand-in calls failing   (default: 0)
+    --require-2fa      Make every login ask for a 2FA code
+    --port             Sidecar port                      (default: 19099)
+    --output FILE      Write results as JSON
+    --compare FILE     Compare against an earlier --output file; exit 1 on regression
+    --threshold        Allowed p99 slowdown before a regression (default: 0.20)
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+try:
+    import httpx
+except ImportError:
+    sys.exit("httpx is required: pip install httpx")
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TOOLS = os.path.join(ROOT, "tools")
+
+_METRIC_RE = re.compile(r'^proton_refreshes_total\{kind="(\w+)",status="(\w+)"\} ([0-9.e+]+)$', re.M)
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Sidecar process
+# ──────────────────────────────────────────────────────────────────────────────
+def start_sidecar(args, storage):
+    env = dict(
+        os.environ,
+        PYTHONPATH=os.pathsep.join([ROOT, TOOLS, os.environ.get("PYTHONPATH", "")]),
+        PROTON_STORAGE_PATH=storage,
+        PROTON_SESSION_FACTORY="proton_standin:session_types",
+        PROTON_USERNAME="bench",
+        PROTON_PASSWORD="bench",
+        PROTON_TOTP_SECRET="JBSWY3DPEHPK3PXP" if args.require_2fa else "",
+        PROTON_LOAD_REFRESH_INTERVAL_S="0",
+        PROTON_FULL_REFRESH_INTERVAL_S="0",
+        PROTON_STANDIN_LOGICALS=str(args.logicals),
+        PROTON_STANDIN_AUTH_MS=str(args.auth_ms),
+        PROTON_STANDIN_API_MS=str(args.api_ms),
+        PROTON_STANDIN_ERROR_RATE=str(args.error_rate),
+        PROTON_STANDIN_REQUIRE_2FA="1" if args.require_2fa else "0",
+    )
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.proton_service:app",
+         "--host", "127.0.0.1", "--port", str(args.port), "--no-access-log", "--log-level", "warning"],
+        cwd=ROOT, env=env,
+    )
+
+
+async def wait_ready(client, proc, timeout=60.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            sys.exit(f"sidecar exited with code {proc.returncode}")
+        try:
+            if (await client.get("/ready")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.2)
+    sys.exit("sidecar did not become ready")
+
+
+async def refreshes_run(client):
+    """Finished refreshes by (kind, status) from the sidecar's /metrics."""
+    text = (await client.get("/metrics")).text
+    return {f"{kind}:{status}": int(float(value)) for kind, status, value in _METRIC_RE.findall(text)}
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Load
+# ──────────────────────────────────────────────────────────────────────────────
+def _refresh_body(key):
+    # Distinct filter sets get distinct coalescing keys.
+    modes = ("include", "exclude", "only")
+    return {"filters": {"tor": modes[key % 3], "p2p": modes[(key // 3) % 3]}} if key else {}
+
+
+async def client_loop(client, endpoint, deadline, samples, key=0):
+    while time.monotonic() < deadline:
+        started = time.perf_counter()
+        try:
+            if endpoint == "refresh":
+                response = await client.post("/refresh", json=_refresh_body(key))
+                status = response.json().get("status", response.status_code) if response.status_code == 200 \
+                    else response.status_code
+            else:
+                response = await client.get("/health")
+                status = response.status_code
+        except httpx.HTTPError as exc:
+            status = type(exc).__name__
+        samples.append((time.perf_counter() - started, str(status)))
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, round(fraction * len(sorted_values) + 0.5) - 1))
+    return sorted_values[rank]
+
+
+def summarize(endpoint, samples, duration):
+    latencies = sorted(seconds for seconds, _ in samples)
+    statuses = {}
+    for _, status in samples:
+        statuses[status] = statuses.get(status, 0) + 1
+    return {
+        "endpoint": endpoint,
+        "requests": len(samples),
+        "rps": round(len(samples) / duration, 2),
+        "statuses": statuses,
+        **{f"p{int(q * 100)}_ms": round(percentile(latencies, q) * 1000, 2) for q in (0.5, 0.9, 0.99)},
+        "max_ms": round(latencies[-1] * 1000, 2) if latencies else 0.0,
+    }
+
+
+async def run_load(args):
+    storage = tempfile.mkdtemp(prefix="proton-e2e-")
+    proc = start_sidecar(args, storage)
+    limits = httpx.Limits(max_connections=args.refresh_clients + args.health_clients + 4)
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{args.port}", timeout=300, limits=limits) as client:
+            await wait_ready(client, proc)
+            # One refresh first so later callers have a last good result to be served.
+            started = time.perf_counter()
+            first = await client.post("/refresh", json={})
+            cold_s = time.perf_counter() - started
+            if first.status_code != 200:
+                print(f"  warning: first refresh returned {first.status_code}: {first.text[:200]}")
+            before = await refreshes_run(client)
+
+            deadline = time.monotonic() + args.duration
+            refresh_samples, health_samples = [], []
+            await asyncio.gather(
+                *(client_loop(client, "refresh", deadline, refresh_samples, i % args.keys)
+                  for i in range(args.refresh_clients)),
+                *(client_loop(client, "health", deadline, health_samples) for _ in range(args.health_clients)),
+            )
+            after = await refreshes_run(client)
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+        shutil.rmtree(storage, ignore_errors=True)
+
+    ran = {key: after.get(key, 0) - before.get(key, 0) for key in after if after.get(key, 0) != before.get(key, 0)}
+    return cold_s, [
+        summarize("refresh", refresh_samples, args.duration),
+        summarize("health", health_samples, args.duration),
+    ], ran
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Reporting
+# ──────────────────────────────────────────────────────────────────────────────
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=ROOT, capture_output=True, text=True, timeout=5,
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def compare(results, baseline, threshold):
+    """Print per-endpoint ratios against ``baseline``; return the number of regressions."""
+    previous = {r["endpoint"]: r for r in baseline.get("results", [])}
+    print(f"\n  Compared with {baseline.get('commit') or 'baseline'} (threshold {threshold:.0%})\n")
+    print(f"  {'ENDPOINT':<9}  {'P50':>7}  {'P99':>7}  {'RPS':>7}")
+    print("  " + "─" * 36)
+    regressions = 0
+    for row in results:
+        old = previous.get(row["endpoint"])
+        if old is None:
+            continue
+        p50 = row["p50_ms"] / max(old["p50_ms"], 1e-9)
+        p99 = row["p99_ms"] / max(old["p99_ms"], 1e-9)
+        rps = row["rps"] / max(old["rps"], 1e-9)
+        flag = "  REGRESSION" if p99 > 1 + threshold else ""
+        regressions += bool(flag)
+        print(f"  {row['endpoint']:<9}  {p50:>6.2f}x  {p99:>6.2f}x  {rps:>6.2f}x{flag}")
+    print()
+    return regressions
+
+
+def run(args):
+    args.keys = max(1, args.keys)
+    print(f"\n  Stand-in: {args.logicals:,} logicals, login {args.auth_ms:.0f} ms, fetch {args.api_ms:.0f} ms, "
+          f"errors {args.error_rate:.0%}{', 2FA' if args.require_2fa else ''}")
+    print(f"  Load    : {args.refresh_clients} refresh + {args.health_clients} health clients, "
+          f"{args.keys} refresh key(s), {args.duration:.0f}s\n")
+
+    cold_s, results, ran = asyncio.run(run_load(args))
+
+    print(f"  First refresh (cold login): {cold_s * 1000:.0f} ms\n")
+    print(f"  {'ENDPOINT':<9}  {'REQS':>6}  {'RPS':>7}  {'P50_MS':>8}  {'P90_MS':>8}  {'P99_MS':>8}  {'MAX_MS':>8}  STATUSES")
+    print("  " + "─" * 86)
+    for row in results:
+        statuses = ", ".join(f"{k}={v}" for k, v in sorted(row["statuses"].items()))
+        print(f"  {row['endpoint']:<9}  {row['requests']:>6}  {row['rps']:>7.1f}  {row['p50_ms']:>8.1f}  "
+              f"{row['p90_ms']:>8.1f}  {row['p99_ms']:>8.1f}  {row['max_ms']:>8.1f}  {statuses}")
+    requested = results[0]["requests"]
+    executed = sum(ran.values())
+    print(f"\n  Refreshes run: {executed} for {requested} requests "
+          f"({', '.join(f'{k}={v}' for k, v in sorted(ran.items())) or 'none'})\n")
+
+    report = {
+        "commit": _git_commit(),
+        "created_at": int(time.time()),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "args": vars(args),
+        "cold_refresh_s": round(cold_s, 4),
+        "refreshes_run": ran,
+        "results": results,
+    }
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2), encoding="utf-8")
+        print(f"  Results written to {args.output}\n")
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text(encoding="utf-8"))
+        if compare(results, baseline, args.threshold):
+            sys.exit(1)
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(
+        description="Load-test the Proton sidecar against the local API stand-in",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    ap.add_argument("--refresh-clients", type=int, default=8,      help="Concurrent /refresh clients")
+    ap.add_argument("--health-clients",  type=int, default=4,      help="Concurrent /health clients")
+    ap.add_argument("--duration",        type=float, default=20.0, help="Seconds of load")
+    ap.add_argument("--keys",            type=int, default=1,      help="Distinct refresh bodies")
+    ap.add_argument("--logicals",        type=int, default=12000,  help="Logical servers served")
+    ap.add_argument("--auth-ms",         type=float, default=300,  help="Stand-in login latency")
+    ap.add_argument("--api-ms",          type=float, default=150,  help="Stand-in fetch latency")
+    ap.add_argument("--error-rate",      type=float, default=0.0,  help="Share of stand-in calls failing")
+    ap.add_argument("--require-2fa",     action="store_true",      help="Ask for a 2FA code on every login")
+    ap.add_argument("--port",            type=int, default=19099,  help="Sidecar port")
+    ap.add_argument("--output",          default=None,             help="Write results JSON here")
+    ap.add_argument("--compare",         default=None,             help="Baseline results JSON")
+    ap.add_argument("--threshold",       type=float, default=0.20, help="Allowed p99 slowdown")
+    run(ap.parse_args())
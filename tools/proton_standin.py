@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the Proton API session used by ProtonServerUpdater.
+
+Fakes proton-core's ``Session`` closely enough for the updater's login,
+2FA, token-refresh and fetch flows, serving seeded synthetic payloads from
+tools/proton_synth.py with configurable latency and injected failures, so
+refresh latency, coalescing and the circuit breaker can be exercised
+offline.  No network, credentials or gpg are involved: any username and
+password log in, and any 6-digit 2FA code is accepted.
+
+Plug it in with the ``session_factory`` argument of ProtonServerUpdater, or
+for a running sidecar:
+
+    PYTHONPATH=tools PROTON_SESSION_FACTORY=proton_standin:session_types \\
+        python -m uvicorn app.proton_service:app --port 9099
+
+Configuration is read from the environment when a session is created
+(``StandinConfig.from_env``) or set directly on ``CONFIG``:
+
+    PROTON_STANDIN_LOGICALS        Logical servers served         (default: 12000)
+    PROTON_STANDIN_SEED            Payload generator seed         (default: 1)
+    PROTON_STANDIN_AUTH_MS         Login latency                  (default: 300)
+    PROTON_STANDIN_API_MS          Fetch latency                  (default: 150)
+    PROTON_STANDIN_JITTER          Latency jitter as a fraction   (default: 0.2)
+    PROTON_STANDIN_ERROR_RATE      Share of calls that fail       (default: 0)
+    PROTON_STANDIN_REQUIRE_2FA     Ask for a 2FA code on login    (default: 0)
+    PROTON_STANDIN_TOKEN_TTL_S     Seconds before tokens expire   (default: 3600)
+"""
+
+import asyncio
+import os
+import random
+import sys
+import time
+from dataclasses import dataclass, replace
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from proton_synth import BASE_LOGICALS, generate_logicals  # noqa: E402
+
+
+class StandinAPIError(Exception):
+    """Injected failure, raised like a Proton API or network error."""
+
+
+class Standin2FANeeded(Exception):
+    pass
+
+
+class StandinAuthenticationNeeded(Exception):
+    pass
+
+
+@dataclass
+class StandinConfig:
+    logicals: int = BASE_LOGICALS
+    seed: int = 1
+    auth_ms: float = 300.0
+    api_ms: float = 150.0
+    jitter: float = 0.2
+    error_rate: float = 0.0
+    require_2fa: bool = False
+    token_ttl_s: float = 3600.0
+
+    @classmethod
+    def from_env(cls):
+        def number(name, default, cast=float):
+            try:
+                return cast(os.getenv(name, default))
+            except ValueError:
+                return cast(default)
+
+        return cls(
+            logicals=number("PROTON_STANDIN_LOGICALS", BASE_LOGICALS, int),
+            seed=number("PROTON_STANDIN_SEED", 1, int),
+            auth_ms=number("PROTON_STANDIN_AUTH_MS", 300),
+            api_ms=number("PROTON_STANDIN_API_MS", 150),
+            jitter=number("PROTON_STANDIN_JITTER", 0.2),
+            error_rate=number("PROTON_STANDIN_ERROR_RATE", 0),
+            require_2fa=os.getenv("PROTON_STANDIN_REQUIRE_2FA", "").lower() in ("1", "true", "yes"),
+            token_ttl_s=number("PROTON_STANDIN_TOKEN_TTL_S", 3600),
+        )
+
+
+CONFIG = StandinConfig.from_env()
+# Calls served, by kind; handy for asserting coalescing from a test or benchmark.
+CALLS = {"auth": 0, "2fa": 0, "api": 0, "refresh": 0, "errors": 0}
+
+_payloads = {}
+_rng = random.Random()
+
+
+def _logicals_payload():
+    key = (CONFIG.logicals, CONFIG.seed)
+    payload = _payloads.get(key)
+    if payload is None:
+        payload = _payloads[key] = generate_logicals(CONFIG.logicals, seed=CONFIG.seed)
+    return payload
+
+
+def set_status(logical_id, status):
+    """Mark a served logical up (1) or down (0); both endpoints report it from then on."""
+    for logical in _logicals_payload()["LogicalServers"]:
+        if logical["ID"] == logical_id:
+            logical["Status"] = status
+            return
+    raise KeyError(logical_id)
+
+
+def reset(**overrides):
+    """Reload CONFIG from the environment plus ``overrides``, regenerate payloads and zero CALLS."""
+    vars(CONFIG).update(vars(replace(StandinConfig.from_env(), **overrides)))
+    _payloads.clear()
+    _rng.seed(CONFIG.seed)
+    for kind in CALLS:
+        CALLS[kind] = 0
+
+
+def _loads_payload():
+    # Loads drift between calls like the live endpoint.
+    return {
+        "Code": 1000,
+        "LogicalServers": [
+            {"ID": logical["ID"], "Load": _rng.randint(0, 100), "Status": logical["Status"]}
+            for logical in _logicals_payload()["LogicalServers"]
+        ],
+    }
+
+
+async def _delay(ms):
+    if ms > 0:
+        await asyncio.sleep(ms / 1000 * (1 + CONFIG.jitter * _rng.uniform(-1, 1)))
+
+
+def _maybe_fail(what):
+    if CONFIG.error_rate and _rng.random() < CONFIG.error_rate:
+        CALLS["errors"] += 1
+        raise StandinAPIError(f"injected {what} failure")
+
+
+class StandinSession:
+    """Async subset of proton.session.Session used by the updater."""
+
+    def __init__(self, appversion=None, user_agent=None):
+        self.appversion = appversion
+        self.user_agent = user_agent
+        self.UID = None
+        self.AccessToken = None
+        self._expires_at = 0.0
+        self._needs_2fa = False
+
+    @property
+    def authenticated(self):
+        return self.UID is not None
+
+    def _issue_token(self):
+        self.AccessToken = f"standin-{_rng.getrandbits(64):016x}"
+        self._expires_at = time.time() + CONFIG.token_ttl_s
+
+    async def async_authenticate(self, username, password):
+        CALLS["auth"] += 1
+        await _delay(CONFIG.auth_ms)
+        _maybe_fail("login")
+        if not username or not password:
+            return False
+        self.UID = f"uid-{abs(hash(username)) % 10**8:08d}"
+        self._issue_token()
+        self._needs_2fa = CONFIG.require_2fa
+        return True
+
+    async def async_validate_2fa_code(self, code):
+        CALLS["2fa"] += 1
+        await _delay(CONFIG.auth_ms / 3)
+        if not (isinstance(code, str) and len(code) == 6 and code.isdigit()):
+            return False
+        self._needs_2fa = False
+        return True
+
+    async def async_api_request(self, endpoint):
+        CALLS["api"] += 1
+        if self._needs_2fa:
+            raise Standin2FANeeded()
+        if not self.authenticated or time.time() >= self._expires_at:
+            raise StandinAuthenticationNeeded()
+        await _delay(CONFIG.api_ms)
+        _maybe_fail("fetch")
+        if endpoint.startswith("/vpn/v1/loads"):
+            return _loads_payload()
+        if endpoint.startswith("/vpn/v1/logicals"):
+            return _logicals_payload()
+        raise StandinAPIError(f"stand-in does not serve {endpoint}")
+
+    async def async_refresh(self):
+        CALLS["refresh"] += 1
+        await _delay(CONFIG.api_ms / 2)
+        if not self.authenticated:
+            raise StandinAuthenticationNeeded()
+        self._issue_token()
+
+    async def async_logout(self):
+        self.UID = None
+        self.AccessToken = None
+
+    def __getstate__(self):
+        if not self.authenticated:
+            return {}
+        return {"UID": self.UID, "AccessToken": self.AccessToken, "expires_at": self._expires_at}
+
+    def __setstate__(self, state):
+        self.UID = state.get("UID")
+        self.AccessToken = state.get("AccessToken")
+        self._expires_at = float(state.get("expires_at") or 0)
+        self._needs_2fa = False
+
+
+def session_types():
+    """Session factory for ProtonServerUpdater, shaped like its _import_proton_types()."""
+    return StandinSession, (Standin2FANeeded, StandinAuthenticationNeeded)
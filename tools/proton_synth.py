@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Seeded generator for synthetic Proton /vpn/v1/logicals payloads.
+
+Produces LogicalServers lists shaped like the real API response (logical
+servers with nested physical Servers) so ProtonServerUpdater can be exercised
+offline at any scale.  The same seed and parameters always give the same
+payload.
+
+Usage:
+    python tools/proton_synth.py [options] > logicals.json
+
+Options:
+    --logicals     Number of logical servers       (default: 12000)
+    --seed         RNG seed                        (default: 1)
+    --ipv6-ratio   Share of physicals with IPv6    (default: 0.3)
+    --dup-ratio    Share of physicals reusing an earlier EntryIP (default: 0.1)
+"""
+
+import argparse
+import json
+import random
+import string
+import sys
+
+# Proton Features bits (mirrors app/vpn/proton_updater.py)
+SECURE_CORE = 1 << 0
+TOR         = 1 << 1
+P2P         = 1 << 2
+STREAMING   = 1 << 3
+
+BASE_LOGICALS = 12000               # roughly today's Proton catalog
+
+DEFAULT_FEATURE_MIX = {
+    SECURE_CORE: 0.06,
+    TOR:         0.01,
+    P2P:         0.45,
+    STREAMING:   0.55,
+}
+
+COUNTRIES = (
+    ("CH", "Zurich"), ("CH", "Geneva"), ("DE", "Frankfurt"), ("DE", "Berlin"),
+    ("NL", "Amsterdam"), ("US", "New York"), ("US", "Los Angeles"), ("US", "Chicago"),
+    ("GB", "London"), ("FR", "Paris"), ("SE", "Stockholm"), ("JP", "Tokyo"),
+    ("SG", "Singapore"), ("CA", "Toronto"), ("AU", "Sydney"), ("ES", "Madrid"),
+    ("IT", "Milan"), ("BR", "Sao Paulo"), ("IS", "Reykjavik"), ("RO", "Bucharest"),
+)
+SECURE_CORE_ENTRIES = ("CH", "IS", "SE")
+
+
+def generate_logicals(
+    logicals=BASE_LOGICALS,
+    *,
+    seed=1,
+    physicals=(1, 2),
+    feature_mix=None,
+    free_ratio=0.05,
+    ipv6_ratio=0.3,
+    dup_ratio=0.1,
+    down_ratio=0.02,
+):
+    """Return a ``{"Code": 1000, "LogicalServers": [...]}`` payload.
+
+    ``physicals`` is the inclusive (min, max) count of physical servers per
+    logical.  ``dup_ratio`` of physicals reuse an EntryIP already handed out,
+    exercising the updater's entry-IP dedupe.
+    """
+    rng = random.Random(seed)
+    mix = DEFAULT_FEATURE_MIX if feature_mix is None else feature_mix
+    issued_ips = []
+    counters = {}
+    out = []
+
+    for i in range(logicals):
+        features = 0
+        for bit, ratio in mix.items():
+            if rng.random() < ratio:
+                features |= bit
+        tier = 0 if rng.random() < free_ratio else 2
+        exit_country, city = rng.choice(COUNTRIES)
+        entry_country = rng.choice(SECURE_CORE_ENTRIES) if features & SECURE_CORE else exit_country
+
+        counters[exit_country] = counters.get(exit_country, 0) + 1
+        number = counters[exit_country]
+        name = (f"{entry_country}-{exit_country}#{number}" if features & SECURE_CORE
+                else f"{exit_country}#{number}")
+        base_domain = f"node-{exit_country.lower()}-{i:07d}.protonvpn.net"
+
+        servers = []
+        for j in range(rng.randint(*physicals)):
+            if issued_ips and rng.random() < dup_ratio:
+                entry_ip = rng.choice(issued_ips)
+            else:
+                entry_ip = f"{10 + (len(issued_ips) >> 24) % 200}.{(len(issued_ips) >> 16) & 255}." \
+                           f"{(len(issued_ips) >> 8) & 255}.{len(issued_ips) & 255}"
+                issued_ips.append(entry_ip)
+            server = {
+                "ID": f"p{i}-{j}",
+                "EntryIP": entry_ip,
+                "ExitIP": entry_ip,
+                "Domain": base_domain,
+                "Label": str(j),
+                "X25519PublicKey": "".join(rng.choices(string.ascii_letters + string.digits, k=43)) + "=",
+                "Generation": 0,
+                "Status": 0 if rng.random() < down_ratio else 1,
+                "ServicesDown": 0,
+                "ServicesDownReason": None,
+            }
+            if rng.random() < ipv6_ratio:
+                server["EntryIPv6"] = f"2a07:b944::{i:x}:{j:x}"
+            servers.append(server)
+
+        out.append({
+            "ID": f"l{i}",
+            "Name": name,
+            "EntryCountry": entry_country,
+            "ExitCountry": exit_country,
+            "Domain": base_domain,
+            "Tier": tier,
+            "Features": features,
+            "Region": None,
+            "City": city,
+            "Score": round(rng.random() * 3, 6),
+            "HostCountry": None,
+            "Location": {"Lat": round(rng.uniform(-60, 70), 4), "Long": round(rng.uniform(-170, 170), 4)},
+            "Status": 0 if rng.random() < down_ratio else 1,
+            "Load": rng.randint(0, 100),
+            "Servers": servers,
+        })
+
+    return {"Code": 1000, "LogicalServers": out}
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(
+        description="Generate a synthetic Proton LogicalServers payload",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    ap.add_argument("--logicals",   type=int,   default=BASE_LOGICALS, help="Logical servers")
+    ap.add_argument("--seed",       type=int,   default=1,             help="RNG seed")
+    ap.add_argument("--ipv6-ratio", type=float, default=0.3,           help="Share of physicals with IPv6")
+    ap.add_argument("--dup-ratio",  type=float, default=0.1,           help="Share of duplicate EntryIPs")
+    args = ap.parse_args()
+    json.dump(
+        generate_logicals(args.logicals, seed=args.seed, ipv6_ratio=args.ipv6_ratio, dup_ratio=args.dup_ratio),
+        sys.stdout,
+    )
@@ -4,8 +4,44 @@ Runway diagnostic: connect directly to the proxy stream, poll Redis every 0.5 s,
 and print a live table showing ring-buffer head, source rate, client position,
 runway depth, proxy measured bitrate vs actual delivery rate, and pacing ratio.
 
+Fleet mode (--fleet) skips the stream connection and watches every active
+stream instead: streams are discovered by SCANning their metadata hashes, each
+tick reads all stream and client keys in one pipelined round-trip, and the run
+ends with the worst runway and pacing offenders across all clients.
+
+Load mode (--load N) reproduces production fan-out: N concurrent clients
+across the given content IDs join with a stagger and churn at the configured
+rates.  Each client sends its own X-Forwarded-For/User-Agent so the proxy
+registers it separately and its Redis hash can be read back.  The report
+covers aggregate throughput, the spread of per-client rates, join fairness
+and the proxy's chunks_sent/initial_index view of every client.
+
+Subscription mode (--subscribe) replaces the poll loop with pub/sub: it
+listens on ace_proxy:events:<content_id> and on keyspace notifications for
+the buffer index, metadata and client hashes, timestamping every head
+advance and chunks_sent update as it arrives.  Runway=0 episodes shorter
+than a poll tick become visible, and Redis is only read for keys that
+changed.  Keyspace notifications must be enabled (notify-keyspace-events
+including Kg$xh); resolution is bounded by how often the proxy writes them.
+
+--record FILE keeps the run: every sample row and every receiver read go to a
+columnar binary file (fixed-width columns, memory-mappable, header with chunk
+size and content id).  `analyze` maps one or more recordings, recomputes the
+summary and diagnosis offline with NumPy, and compares runs side by side —
+e.g. before and after a pacing change in the Go proxy.
+
+--ts parses what the receiver gets as 188-byte MPEG-TS packets (NumPy over
+each read): sync bytes, continuity counters and the PCR of the first PCR PID.
+It reports media seconds buffered by a virtual player, the client-side PCR
+bitrate next to the proxy's bitrate field, the proxy's PCR estimator
+(pcrWindowSize/pcrAlpha) replayed on the same bytes, and playback stalls.
+
 Usage:
     python runway_diag.py <content_id> [options]
+    python runway_diag.py --fleet [options]
+    python runway_diag.py <content_id> --load N [--ids ID,ID...] [options]
+    python runway_diag.py <content_id> --subscribe [options]
+    python runway_diag.py analyze <recording> [<recording> ...]
 
     content_id   AceStream content ID hash
 
@@ -15,9 +51,33 @@ Options:
     --chunk      Ring buffer chunk size in bytes (default: 1060672 = 188*5644)
     --duration   Seconds to collect  (default: 120)
     --key        API key if needed   (default: none)
+    --fleet      Watch all streams via Redis only
+    --top        Offenders listed per table in fleet mode (default: 15)
+    --rescan     Seconds between stream discovery SCANs (default: 5)
+    --load       Load mode: N concurrent asyncio clients (needs httpx)
+    --ids        More content IDs for load mode; clients are spread round-robin
+    --stagger    Seconds between the initial joins (default: 0.5)
+    --connect-rate     Churn: new clients per second, capped at N connected (default: 0)
+    --disconnect-rate  Churn: random disconnects per second (default: 0)
+    --seed       Churn random seed (default: 1)
+    --output     Write the load report as JSON
+    --subscribe  Event-driven sampling instead of the 0.5 s poll loop
+    --enable-notifications  Add Kg$xh to notify-keyspace-events (CONFIG SET)
+    --no-connect Subscription mode: watch the stream without connecting to it
+    --record     Write samples and per-read byte events to a binary file (single-stream mode)
+    --ts         Parse received TS packets: PCR, continuity, media buffered (needs numpy; single-stream mode)
+    --prebuffer  Media seconds the --ts virtual player buffers before playing (default: 2)
 """
 
 import argparse
+import array
+import asyncio
+import hashlib
+import json
+import mmap
+import os
+import random
+import struct
 import sys
 import time
 import threading
@@ -27,7 +87,7 @@ import textwrap
 try:
     import requests
 except ImportError:
-    sys.exit("pip install requests")
+    requests = None     # only the single-stream receiver needs it
 
 try:
     import redis as redislib
@@ -85,6 +145,36 @@ def redis_smembers(rdb, key):
     except Exception:
         return set()
 
+
+# Redis key helpers (mirrors rediskeys/keys.go)
+def rk_buf_index(content_id):      return f"ace_proxy:stream:{content_id}:buffer:index"
+def rk_metadata(content_id):       return f"ace_proxy:stream:{content_id}:metadata"
+def rk_clients(content_id):        return f"ace_proxy:stream:{content_id}:clients"
+def rk_client(content_id, cid):    return f"ace_proxy:stream:{content_id}:clients:{cid}"
+def rk_events(content_id):         return f"ace_proxy:events:{content_id}"
+
+
+def as_int(value, default=-1):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def as_float(value, default=0.0):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def advance_ema(ema, prev, prev_t, cur, now, alpha=0.4):
+    """Fold the prev→cur advance into an EMA of units/s; unchanged unless cur moved forward."""
+    if prev is None or prev_t is None or cur <= prev or now <= prev_t:
+        return ema
+    instant = (cur - prev) / (now - prev_t)
+    return alpha * instant + (1 - alpha) * ema if ema else instant
+
 # ──────────────────────────────────────────────────────────────────────────────
 # RateMeter: simple sliding-window bytes/s calculator
 # ──────────────────────────────────────────────────────────────────────────────
@@ -114,11 +204,13 @@ class RateMeter:
 # Stream receiver thread
 # ──────────────────────────────────────────────────────────────────────────────
 class StreamReceiver(threading.Thread):
-    def __init__(self, url, headers, meter):
+    def __init__(self, url, headers, meter, reads=None, ts=None):
         super().__init__(daemon=True)
         self.url     = url
         self.headers = headers
         self.meter   = meter
+        self.reads   = reads     # (monotonic, nbytes) per read, for --record
+        self.ts      = ts        # TSAnalyzer, for --ts
         self.stop    = threading.Event()
         self.error   = None
         self.connected_at = None
@@ -134,6 +226,10 @@ class StreamReceiver(threading.Thread):
                         break
                     if chunk:
                         self.meter.add(len(chunk))
+                        if self.reads is not None:
+                            self.reads.append((time.monotonic(), len(chunk)))
+                        if self.ts is not None:
+                            self.ts.feed(chunk, time.monotonic())
         except Exception as e:
             self.error = str(e)
 
@@ -150,10 +246,1430 @@ class Snap:
     )
 
 
+# ──────────────────────────────────────────────────────────────────────────────
+# Fleet mode: every active stream, one pipelined round-trip per tick
+# ──────────────────────────────────────────────────────────────────────────────
+def discover_streams(rdb):
+    """Content IDs that have a metadata hash, found with SCAN (never KEYS)."""
+    prefix, suffix = "ace_proxy:stream:", ":metadata"
+    found = set()
+    for key in rdb.scan_iter(match=rk_metadata("*"), count=1000):
+        content_id = key[len(prefix):-len(suffix)]
+        if content_id and ":" not in content_id:
+            found.add(content_id)
+    return found
+
+
+class StreamTrack:
+    __slots__ = ("content_id", "head", "head_time", "head_ema", "bitrate", "client_ids")
+
+    def __init__(self, content_id):
+        self.content_id = content_id
+        self.head       = None
+        self.head_time  = None
+        self.head_ema   = 0.0
+        self.bitrate    = 0
+        self.client_ids = set()
+
+
+class ClientTrack:
+    __slots__ = (
+        "content_id", "client_id",
+        "chunks", "chunks_time", "chunk_ema",
+        "pos", "runway_chunks", "runway_sec", "pace",
+        "ticks", "zero_ticks", "low_ticks", "min_runway_s",
+        "pace_sum", "pace_n", "max_pace",
+    )
+
+    def __init__(self, content_id, client_id):
+        self.content_id    = content_id
+        self.client_id     = client_id
+        self.chunks        = None
+        self.chunks_time   = None
+        self.chunk_ema     = 0.0
+        self.pos           = -1
+        self.runway_chunks = -1
+        self.runway_sec    = float("nan")
+        self.pace          = float("nan")
+        self.ticks         = 0
+        self.zero_ticks    = 0
+        self.low_ticks     = 0
+        self.min_runway_s  = float("nan")
+        self.pace_sum      = 0.0
+        self.pace_n        = 0
+        self.max_pace      = 0.0
+
+    def avg_pace(self):
+        return self.pace_sum / self.pace_n if self.pace_n else float("nan")
+
+
+class FleetSampler:
+    """Samples every tracked stream with a single non-transactional pipeline per tick.
+
+    Client hash names depend on the clients set, so each tick reads the
+    hashes of the members seen on the previous tick alongside the fresh
+    SMEMBERS; a client that just joined shows up one tick later.  Stream
+    discovery (SCAN) runs every ``rescan`` seconds, outside the tick.
+    """
+
+    def __init__(self, rdb, chunk_size, rescan):
+        self.rdb        = rdb
+        self.chunk_size = chunk_size
+        self.rescan     = rescan
+        self.streams    = {}    # content_id -> StreamTrack
+        self.clients    = {}    # (content_id, client_id) -> ClientTrack, kept after they leave
+        self.scanned_at = None
+        self.rtt        = 0.0   # seconds, last pipeline round-trip
+
+    def refresh_streams(self, now):
+        if self.scanned_at is not None and now - self.scanned_at < self.rescan:
+            return
+        self.scanned_at = now
+        live = discover_streams(self.rdb)
+        for content_id in live - self.streams.keys():
+            self.streams[content_id] = StreamTrack(content_id)
+        for content_id in self.streams.keys() - live:
+            del self.streams[content_id]
+
+    def tick(self):
+        """One pipelined read of every stream; returns the ClientTracks sampled this tick."""
+        self.refresh_streams(time.monotonic())
+        streams = list(self.streams.values())
+        pipe = self.rdb.pipeline(transaction=False)
+        wanted = []
+        for st in streams:
+            pipe.get(rk_buf_index(st.content_id))
+            pipe.hgetall(rk_metadata(st.content_id))
+            pipe.smembers(rk_clients(st.content_id))
+        for st in streams:
+            for client_id in sorted(st.client_ids):
+                pipe.hgetall(rk_client(st.content_id, client_id))
+                wanted.append((st, client_id))
+
+        sent = time.monotonic()
+        replies = pipe.execute(raise_on_error=False)
+        now = time.monotonic()
+        self.rtt = now - sent
+
+        for i, st in enumerate(streams):
+            head_r, meta, members = replies[3 * i: 3 * i + 3]
+            head = as_int(head_r) if not isinstance(head_r, Exception) else -1
+            st.head_ema = advance_ema(st.head_ema, st.head, st.head_time, head, now)
+            if head >= 0:
+                st.head, st.head_time = head, now
+            if isinstance(meta, dict):
+                st.bitrate = as_int(meta.get("bitrate"), 0)
+            st.client_ids = set(members) if isinstance(members, (set, list)) else set()
+
+        sampled = []
+        for (st, client_id), fields in zip(wanted, replies[3 * len(streams):]):
+            if not isinstance(fields, dict) or not fields or client_id not in st.client_ids:
+                continue
+            ct = self.clients.get((st.content_id, client_id))
+            if ct is None:
+                ct = self.clients[(st.content_id, client_id)] = ClientTrack(st.content_id, client_id)
+            self._update_client(ct, st, fields, now)
+            sampled.append(ct)
+        return sampled
+
+    def _update_client(self, ct, st, fields, now):
+        initial = as_int(fields.get("initial_index"))
+        chunks  = as_int(fields.get("chunks_sent"), 0)
+        ct.chunk_ema = advance_ema(ct.chunk_ema, ct.chunks, ct.chunks_time, chunks, now)
+        ct.chunks, ct.chunks_time = chunks, now
+        ct.ticks += 1
+
+        src_bps = st.head_ema * self.chunk_size
+        ref_bps = st.bitrate if st.bitrate > 0 else src_bps
+        ct.runway_chunks = -1
+        ct.runway_sec    = float("nan")
+        ct.pos           = initial + chunks if initial >= 0 else -1
+        if st.head is not None and ct.pos >= 0:
+            ct.runway_chunks = max(0, st.head - ct.pos)
+            if ref_bps > 0:
+                ct.runway_sec = ct.runway_chunks * self.chunk_size / ref_bps
+            if ct.runway_chunks == 0:
+                ct.zero_ticks += 1
+            elif ct.runway_sec < 2:
+                ct.low_ticks += 1
+            if ct.runway_sec == ct.runway_sec and not ct.min_runway_s <= ct.runway_sec:
+                ct.min_runway_s = ct.runway_sec
+
+        # Delivery rate as the proxy reports it, else from the chunks_sent advance.
+        rx_bps = as_float(fields.get("bps")) or ct.chunk_ema * self.chunk_size
+        ct.pace = rx_bps / st.bitrate if st.bitrate > 0 else float("nan")
+        if ct.pace == ct.pace:
+            ct.pace_sum += ct.pace
+            ct.pace_n   += 1
+            ct.max_pace  = max(ct.max_pace, ct.pace)
+
+
+def _fmt(value, spec, missing="?"):
+    return format(value, spec) if value == value else missing
+
+
+def print_offenders(tracks, top):
+    """Worst runway (time at zero, then minimum runway) and worst pacing (|avg pace − 1|)."""
+    hdr = (f"  {'STREAM':<14}  {'CLIENT':<14}  {'TICKS':>5}  {'RWY=0':>6}  {'LOW':>5}  "
+           f"{'MIN_RWY_S':>9}  {'AVG_PACE':>8}  {'MAX_PACE':>8}")
+    by_runway = sorted(
+        (t for t in tracks if t.runway_chunks >= 0 or t.zero_ticks),
+        key=lambda t: (-t.zero_ticks, -t.low_ticks, t.min_runway_s if t.min_runway_s == t.min_runway_s else 1e9),
+    )[:top]
+    by_pacing = sorted(
+        (t for t in tracks if t.pace_n),
+        key=lambda t: -abs(t.avg_pace() - 1),
+    )[:top]
+    for title, rows in (("WORST RUNWAY", by_runway), ("WORST PACING", by_pacing)):
+        print(f"\n  {title}")
+        print(hdr)
+        print("  " + "─" * (len(hdr) - 2))
+        if not rows:
+            print("  (no clients sampled)")
+        for t in rows:
+            print(
+                f"  {t.content_id[:14]:<14}  {t.client_id[:14]:<14}  {t.ticks:>5}  "
+                f"{t.zero_ticks * POLL_INTERVAL:>5.1f}s  {t.low_ticks * POLL_INTERVAL:>4.1f}s  "
+                f"{_fmt(t.min_runway_s, '>9.1f'):>9}  {_fmt(t.avg_pace(), '>7.2f') + 'x':>8}  "
+                f"{t.max_pace:>7.2f}x"
+            )
+
+
+def run_fleet(args):
+    redis_host, _, redis_port_s = args.redis.partition(":")
+    redis_port = int(redis_port_s) if redis_port_s else 6379
+    rdb = redis_connect(redis_host, redis_port)
+    if rdb is None:
+        sys.exit("Fleet mode needs Redis")
+
+    sampler = FleetSampler(rdb, args.chunk, args.rescan)
+    print(f"\n  Redis   : {redis_host}:{redis_port}")
+    print(f"  Chunk   : {args.chunk:,} bytes ({args.chunk/1e6:.2f} MB)")
+    print(f"  Duration: {args.duration} s, rescan every {args.rescan:.0f} s")
+    print()
+
+    HDR = (
+        f"{'t':>6}  {'STREAMS':>7}  {'CLIENTS':>7}  {'RTT_MS':>7}  "
+        f"{'RWY=0':>6}  {'LOW_RWY':>7}  {'OVERPACE':>8}  {'P50_RWY_S':>9}"
+    )
+    SEP = "─" * len(HDR)
+    print(HDR)
+    print(SEP)
+
+    start = time.monotonic()
+    try:
+        while time.monotonic() - start < args.duration:
+            t = time.monotonic() - start
+            try:
+                sampled = sampler.tick()
+            except Exception as e:
+                print(f"{t:6.1f}  Redis error: {e}")
+                time.sleep(POLL_INTERVAL)
+                continue
+
+            runways = sorted(c.runway_sec for c in sampled if c.runway_sec == c.runway_sec)
+            zero    = sum(1 for c in sampled if c.runway_chunks == 0)
+            low     = sum(1 for c in sampled if c.runway_chunks > 0 and c.runway_sec < 2)
+            over    = sum(1 for c in sampled if c.pace == c.pace and c.pace > 1.5)
+            p50     = runways[len(runways) // 2] if runways else float("nan")
+            print(
+                f"{t:6.1f}  {len(sampler.streams):>7}  {len(sampled):>7}  {sampler.rtt * 1000:>7.1f}  "
+                f"{zero:>6}  {low:>7}  {over:>8}  {_fmt(p50, '>9.1f'):>9}"
+            )
+            time.sleep(max(0.0, POLL_INTERVAL - sampler.rtt))
+    except KeyboardInterrupt:
+        print("\n  (interrupted)")
+
+    print()
+    print(SEP)
+    print(f"  FLEET SUMMARY — {len(sampler.clients)} clients seen across the run")
+    print(SEP)
+    print_offenders(list(sampler.clients.values()), args.top)
+
+    print()
+    print("  LEGEND")
+    print("  RTT_MS    round-trip of the tick's single Redis pipeline")
+    print("  RWY=0     clients at runway 0 this tick (time at runway 0 in the tables)")
+    print("  LOW_RWY   clients with runway under 2 s")
+    print("  OVERPACE  clients delivered faster than 1.5× their stream's PROXY_BR")
+    print("  MIN_RWY_S lowest runway seen for the client, in seconds")
+    print("  AVG_PACE  client bps (proxy-reported) / stream PROXY_BR, averaged over the run")
+    print()
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Load mode: N concurrent asyncio clients across M streams, with churn
+# ──────────────────────────────────────────────────────────────────────────────
+def proxy_client_id(ip, user_agent):
+    """Client ID the Go proxy derives for a request (buildClientID in api/proxy.go)."""
+    return hashlib.sha1(f"{ip}|{user_agent}".encode()).hexdigest()[:16]
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    if not ordered:
+        return float("nan")
+    return ordered[int(round(q * (len(ordered) - 1)))]
+
+
+class LoadClient:
+    __slots__ = (
+        "n", "content_id", "ip", "user_agent", "client_id",
+        "started", "first_byte", "ended", "nbytes",
+        "status", "error", "churned", "join_head", "proxy_view", "task",
+    )
+
+    def __init__(self, n, content_id):
+        self.n          = n
+        self.content_id = content_id
+        # A distinct forwarded IP and User-Agent per client, so the proxy
+        # registers each one separately and its Redis hash can be found.
+        self.ip         = f"10.77.{n // 256 % 256}.{n % 256}"
+        self.user_agent = f"runway-diagnostic/1.0 load-{n}"
+        self.client_id  = proxy_client_id(self.ip, self.user_agent)
+        self.started    = None
+        self.first_byte = None
+        self.ended      = None
+        self.nbytes     = 0
+        self.status     = None
+        self.error      = None
+        self.churned    = False
+        self.join_head  = -1
+        self.proxy_view = {}
+        self.task       = None
+
+    def ttfb(self):
+        if self.started is None or self.first_byte is None:
+            return float("nan")
+        return self.first_byte - self.started
+
+    def rate(self, now):
+        """Delivered bytes/s from first byte to disconnect (or now)."""
+        if self.first_byte is None:
+            return float("nan")
+        dt = (self.ended or now) - self.first_byte
+        return self.nbytes / dt if dt >= 1.0 else float("nan")
+
+    def state(self):
+        if self.error:
+            return "error"
+        if self.churned:
+            return "churned"
+        return "active" if self.ended is None else "ended"
+
+
+async def load_client(http, lc, url, headers, meter):
+    lc.started = time.monotonic()
+    try:
+        async with http.stream("GET", url, headers=headers) as resp:
+            lc.status = resp.status_code
+            resp.raise_for_status()
+            async for chunk in resp.aiter_raw(32768):
+                if lc.first_byte is None:
+                    lc.first_byte = time.monotonic()
+                lc.nbytes += len(chunk)
+                meter.add(len(chunk))
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        lc.error = str(e) or type(e).__name__
+    finally:
+        lc.ended = time.monotonic()
+
+
+def poll_proxy_view(rdb, content_ids, clients):
+    """One pipeline: buffer head per stream and the hash of every connected load client."""
+    pipe = rdb.pipeline(transaction=False)
+    for content_id in content_ids:
+        pipe.get(rk_buf_index(content_id))
+    for lc in clients:
+        pipe.hgetall(rk_client(lc.content_id, lc.client_id))
+    replies = pipe.execute(raise_on_error=False)
+    heads = {
+        content_id: as_int(reply) if not isinstance(reply, Exception) else -1
+        for content_id, reply in zip(content_ids, replies)
+    }
+    for lc, fields in zip(clients, replies[len(content_ids):]):
+        if isinstance(fields, dict) and fields:
+            lc.proxy_view = fields
+    return heads
+
+
+async def load_main(args, content_ids, httpx):
+    proxy_url = args.proxy.rstrip("/")
+    redis_host, _, redis_port_s = args.redis.partition(":")
+    redis_port = int(redis_port_s) if redis_port_s else 6379
+    rdb   = redis_connect(redis_host, redis_port)
+    rng   = random.Random(args.seed)
+    meter = RateMeter()
+
+    clients = []    # every client started, in join order
+    active  = {}    # n -> LoadClient still connected
+    heads   = {}    # content_id -> last buffer head seen in Redis
+
+    print(f"\n  Proxy   : {proxy_url}  ({len(content_ids)} streams)")
+    print(f"  Redis   : {redis_host}:{redis_port}" + ("" if rdb else "  (unavailable — no proxy view)"))
+    print(f"  Clients : {args.load}, joining every {args.stagger:g} s")
+    print(f"  Churn   : {args.connect_rate:g} connects/s, {args.disconnect_rate:g} disconnects/s")
+    print(f"  Duration: {args.duration} s")
+    print()
+
+    limits  = httpx.Limits(max_connections=None, max_keepalive_connections=0)
+    timeout = httpx.Timeout(30.0, connect=10.0)
+    async with httpx.AsyncClient(limits=limits, timeout=timeout) as http:
+
+        def join():
+            lc = LoadClient(len(clients), content_ids[len(clients) % len(content_ids)])
+            lc.join_head = heads.get(lc.content_id, -1)
+            headers = {"User-Agent": lc.user_agent, "X-Forwarded-For": lc.ip}
+            if args.key:
+                headers["X-API-Key"] = args.key
+            url = f"{proxy_url}/ace/getstream?id={lc.content_id}"
+            lc.task = asyncio.create_task(load_client(http, lc, url, headers, meter))
+            lc.task.add_done_callback(lambda _, n=lc.n: active.pop(n, None))
+            clients.append(lc)
+            active[lc.n] = lc
+
+        async def ramp_and_churn():
+            for _ in range(args.load):
+                join()
+                await asyncio.sleep(args.stagger)
+            if not (args.connect_rate > 0 or args.disconnect_rate > 0):
+                return
+            now = time.monotonic()
+            next_connect    = now + rng.expovariate(args.connect_rate)    if args.connect_rate > 0    else float("inf")
+            next_disconnect = now + rng.expovariate(args.disconnect_rate) if args.disconnect_rate > 0 else float("inf")
+            while True:
+                await asyncio.sleep(max(0.0, min(next_connect, next_disconnect) - time.monotonic()))
+                now = time.monotonic()
+                if now >= next_disconnect:
+                    if active:
+                        victim = active[rng.choice(list(active))]
+                        victim.churned = True
+                        victim.task.cancel()
+                    next_disconnect = now + rng.expovariate(args.disconnect_rate)
+                if now >= next_connect:
+                    if len(active) < args.load:
+                        join()
+                    next_connect = now + rng.expovariate(args.connect_rate)
+
+        async def poll():
+            while rdb is not None:
+                try:
+                    heads.update(await asyncio.to_thread(poll_proxy_view, rdb, content_ids, list(active.values())))
+                except Exception as e:
+                    print(f"  Redis error: {e}")
+                await asyncio.sleep(POLL_INTERVAL)
+
+        HDR = (
+            f"{'t':>6}  {'ACTIVE':>6}  {'JOINED':>6}  {'CHURNED':>7}  {'FAILED':>6}  "
+            f"{'AGG_MB/s':>9}  {'AGG_Mbps':>9}  {'PER_CLI_MB/s':>12}"
+        )
+        SEP = "─" * len(HDR)
+        print(HDR)
+        print(SEP)
+
+        workers = [asyncio.create_task(ramp_and_churn()), asyncio.create_task(poll())]
+        agg_samples = []
+        start = time.monotonic()
+        try:
+            while time.monotonic() - start < args.duration:
+                await asyncio.sleep(1.0)
+                agg = meter.bps()
+                agg_samples.append(agg)
+                print(
+                    f"{time.monotonic() - start:6.1f}  {len(active):>6}  {len(clients):>6}  "
+                    f"{sum(1 for c in clients if c.churned):>7}  {sum(1 for c in clients if c.error):>6}  "
+                    f"{agg / 1e6:>9.2f}  {agg * 8 / 1e6:>9.2f}  {agg / max(len(active), 1) / 1e6:>12.3f}"
+                )
+        except asyncio.CancelledError:
+            print("\n  (interrupted)")
+        finally:
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            # Last proxy view while the clients are still registered.
+            if rdb is not None:
+                try:
+                    poll_proxy_view(rdb, content_ids, list(active.values()))
+                except Exception:
+                    pass
+            finished = time.monotonic()
+            for lc in list(active.values()):
+                lc.task.cancel()
+            await asyncio.gather(*(lc.task for lc in clients), return_exceptions=True)
+
+    return clients, agg_samples, finished - start, finished
+
+
+def load_report(args, clients, agg_samples, elapsed, finished):
+    total_bytes = sum(lc.nbytes for lc in clients)
+    rates   = [r for r in (lc.rate(finished) for lc in clients) if r == r]
+    ttfbs   = [t for t in (lc.ttfb() for lc in clients) if t == t]
+    offsets = [
+        lc.join_head - as_int(lc.proxy_view.get("initial_index"))
+        for lc in clients
+        if lc.join_head >= 0 and as_int(lc.proxy_view.get("initial_index")) >= 0
+    ]
+    mean_rate = sum(rates) / len(rates) if rates else 0.0
+    cov  = (sum((r - mean_rate) ** 2 for r in rates) / len(rates)) ** 0.5 / mean_rate if mean_rate else float("nan")
+    jain = sum(rates) ** 2 / (len(rates) * sum(r * r for r in rates)) if rates and any(rates) else float("nan")
+    failures = collections.Counter(lc.error for lc in clients if lc.error)
+
+    SEP = "─" * 90
+    print()
+    print(SEP)
+    print("  LOAD SUMMARY")
+    print(SEP)
+    print(f"  Duration              : {elapsed:.1f} s")
+    print(f"  Clients started       : {len(clients)}  ({sum(1 for c in clients if c.churned)} churned, "
+          f"{sum(failures.values())} failed)")
+    print(f"  Delivered             : {total_bytes / 1e6:,.1f} MB")
+    print(f"  Aggregate throughput  : {total_bytes / elapsed / 1e6:.2f} MB/s  ({total_bytes * 8 / elapsed / 1e6:.2f} Mbps)")
+    print(f"  Peak aggregate (1 s)  : {max(agg_samples, default=0) / 1e6:.2f} MB/s")
+    print(f"  Per-client MB/s       : min {min(rates, default=0) / 1e6:.3f}  p10 {percentile(rates, .1) / 1e6:.3f}  "
+          f"p50 {percentile(rates, .5) / 1e6:.3f}  p90 {percentile(rates, .9) / 1e6:.3f}  max {max(rates, default=0) / 1e6:.3f}")
+    print(f"  Rate spread (CoV)     : {cov:.2f}")
+    print(f"  Jain fairness index   : {jain:.3f}  (1.0 = every client got the same rate)")
+    print(f"  Time to first byte    : p50 {percentile(ttfbs, .5) * 1000:.0f} ms  p90 {percentile(ttfbs, .9) * 1000:.0f} ms  "
+          f"max {max(ttfbs, default=float('nan')) * 1000:.0f} ms")
+    if offsets:
+        print(f"  Join offset (chunks)  : min {min(offsets)}  p50 {percentile(offsets, .5)}  max {max(offsets)}  "
+              f"(head at join − initial_index)")
+    for error, count in failures.most_common(5):
+        print(f"  Failure ×{count:<4}        : {error[:70]}")
+    print()
+
+    print("  PER CLIENT (proxy view from Redis)")
+    hdr = (f"  {'#':>4}  {'STREAM':<12}  {'CLIENT_ID':<16}  {'STATE':<7}  {'TTFB_MS':>7}  {'RX_MB/s':>8}  "
+           f"{'INIT_IDX':>8}  {'JOIN_OFF':>8}  {'CHUNKS':>7}  {'RX_CHUNKS':>9}  {'PROXY_MB/s':>10}")
+    print(hdr)
+    print("  " + "─" * (len(hdr) - 2))
+    for lc in clients:
+        view    = lc.proxy_view
+        initial = as_int(view.get("initial_index"))
+        ttfb    = lc.ttfb()
+        rate    = lc.rate(finished)
+        print(
+            f"  {lc.n:>4}  {lc.content_id[:12]:<12}  {lc.client_id:<16}  {lc.state():<7}  "
+            f"{_fmt(ttfb * 1000, '>7.0f'):>7}  {_fmt(rate / 1e6, '>8.3f'):>8}  "
+            f"{initial if view else '?':>8}  "
+            f"{lc.join_head - initial if initial >= 0 and lc.join_head >= 0 else '?':>8}  "
+            f"{view.get('chunks_sent', '?'):>7}  {lc.nbytes / args.chunk:>9.1f}  "
+            f"{_fmt(as_float(view.get('bps'), float('nan')) / 1e6, '>10.3f'):>10}"
+        )
+    print()
+    print("  LEGEND")
+    print("  JOIN_OFF   chunks between the ring head when the client joined and its initial_index")
+    print("  CHUNKS     chunks_sent as recorded by the proxy; RX_CHUNKS is bytes received / chunk size")
+    print("  PROXY_MB/s the client's bps field in Redis")
+    print()
+
+    return {
+        "duration_s": round(elapsed, 3),
+        "clients": len(clients),
+        "failed": sum(failures.values()),
+        "aggregate_bps": total_bytes / elapsed if elapsed else 0.0,
+        "peak_aggregate_bps": max(agg_samples, default=0),
+        "client_bps": {"min": min(rates, default=0), "p50": percentile(rates, .5), "max": max(rates, default=0)},
+        "rate_cov": cov,
+        "jain_index": jain,
+        "ttfb_p90_s": percentile(ttfbs, .9),
+        "per_client": [
+            {
+                "n": lc.n, "content_id": lc.content_id, "client_id": lc.client_id, "state": lc.state(),
+                "bytes": lc.nbytes, "ttfb_s": lc.ttfb(), "bps": lc.rate(finished),
+                "initial_index": as_int(lc.proxy_view.get("initial_index")),
+                "chunks_sent": as_int(lc.proxy_view.get("chunks_sent")), "join_head": lc.join_head,
+                "error": lc.error,
+            }
+            for lc in clients
+        ],
+    }
+
+
+def run_load(args, content_ids):
+    try:
+        import httpx
+    except ImportError:
+        sys.exit("Load mode needs httpx: pip install httpx")
+    clients, agg_samples, elapsed, finished = asyncio.run(load_main(args, content_ids, httpx))
+    report = load_report(args, clients, agg_samples, elapsed, finished)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as fh:
+            json.dump(report, fh, indent=2, default=lambda v: None)
+        print(f"  Results written to {args.output}\n")
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Subscription mode: event-driven samples from pub/sub and keyspace notifications
+# ──────────────────────────────────────────────────────────────────────────────
+KEYSPACE_FLAGS = "Kg$xh"    # keyspace channel; DEL/EXPIRE, string, expiry and hash events
+
+
+def ensure_keyspace_events(rdb, enable):
+    """Warn (or with ``enable``, fix) when notify-keyspace-events misses the flags we need."""
+    try:
+        flags = rdb.config_get("notify-keyspace-events").get("notify-keyspace-events", "")
+    except Exception as e:
+        print(f"  Cannot read notify-keyspace-events ({e}) — assuming it includes {KEYSPACE_FLAGS}")
+        return
+    if "K" in flags and ("A" in flags or all(f in flags for f in "g$xh")):
+        return
+    if enable:
+        flags = "".join(sorted(set(flags + KEYSPACE_FLAGS)))
+        rdb.config_set("notify-keyspace-events", flags)
+        print(f"  notify-keyspace-events set to {flags!r}")
+        return
+    print(
+        f"  WARNING: notify-keyspace-events is {flags!r}; some head, client or leave events will not arrive.\n"
+        f"           Re-run with --enable-notifications or add {KEYSPACE_FLAGS!r} to the Redis config\n"
+        f"           (g and x are needed to see clients leave through DEL or TTL expiry)."
+    )
+
+
+class ClientRunway:
+    """Runway of one client between events, with its runway=0 episodes."""
+    __slots__ = ("pos", "runway", "zero_since", "episodes")
+
+    def __init__(self):
+        self.pos        = -1
+        self.runway     = -1
+        self.zero_since = None
+        self.episodes   = []    # (start_t, duration_s)
+
+    def update(self, head, t):
+        if head < 0 or self.pos < 0:
+            return
+        self.runway = max(0, head - self.pos)
+        if self.runway == 0 and self.zero_since is None:
+            self.zero_since = t
+        elif self.runway > 0 and self.zero_since is not None:
+            self.episodes.append((self.zero_since, t - self.zero_since))
+            self.zero_since = None
+
+    def close(self, t):
+        if self.zero_since is not None:
+            self.episodes.append((self.zero_since, t - self.zero_since))
+            self.zero_since = None
+
+
+def run_subscribe(args):
+    content_id = args.content_id
+    chunk_size = args.chunk
+    redis_host, _, redis_port_s = args.redis.partition(":")
+    redis_port = int(redis_port_s) if redis_port_s else 6379
+    rdb = redis_connect(redis_host, redis_port)
+    if rdb is None:
+        sys.exit("Subscription mode needs Redis")
+    ensure_keyspace_events(rdb, args.enable_notifications)
+
+    db        = rdb.connection_pool.connection_kwargs.get("db", 0)
+    ks        = f"__keyspace@{db}__:"
+    ch_events = rk_events(content_id)
+    ch_head   = ks + rk_buf_index(content_id)
+    ch_meta   = ks + rk_metadata(content_id)
+    pubsub = rdb.pubsub(ignore_subscribe_messages=True)
+    pubsub.subscribe(ch_events, ch_head, ch_meta)
+    pubsub.psubscribe(ks + rk_client(content_id, "*"))
+
+    meter, receiver = RateMeter(), None
+    if not args.no_connect:
+        if requests is None:
+            sys.exit("pip install requests (or pass --no-connect)")
+        headers = {"User-Agent": "runway-diagnostic/1.0"}
+        if args.key:
+            headers["X-API-Key"] = args.key
+        receiver = StreamReceiver(f"{args.proxy.rstrip('/')}/ace/getstream?id={content_id}", headers, meter)
+        receiver.start()
+
+    # Seed the state once; from here on only notified keys are read.
+    head    = as_int(redis_get(rdb, rk_buf_index(content_id)))
+    bitrate = as_int(redis_hgetall(rdb, rk_metadata(content_id)).get("bitrate"), 0)
+    clients = {}
+    for client_id in redis_smembers(rdb, rk_clients(content_id)):
+        c = redis_hgetall(rdb, rk_client(content_id, client_id))
+        if as_int(c.get("initial_index")) >= 0:
+            clients[client_id] = ClientRunway()
+            clients[client_id].pos = as_int(c.get("initial_index")) + as_int(c.get("chunks_sent"), 0)
+    reads = 3 + len(clients)
+
+    print(f"\n  Stream  : {content_id}" + ("  (watching only)" if receiver is None else ""))
+    print(f"  Redis   : {redis_host}:{redis_port} db {db}")
+    print(f"  Channels: {ch_events}, keyspace {rk_buf_index(content_id)}, {rk_metadata(content_id)}, "
+          f"{rk_client(content_id, '*')}")
+    print(f"  Duration: {args.duration} s")
+    print()
+
+    HDR = (
+        f"{'t':>9}  {'EVENT':<8}  {'HEAD':>8}  {'CLIENT':<16}  {'CLI_POS':>8}  "
+        f"{'RUNWAY_C':>9}  {'RUNWAY_S':>9}  {'RX_MB/s':>8}"
+    )
+    SEP = "─" * len(HDR)
+    print(HDR)
+    print(SEP)
+
+    head_times = []     # monotonic offsets of head advances
+    departed   = []     # (client_id, left_at, ClientRunway) of clients that left mid-run
+    counts     = collections.Counter()
+    start      = time.monotonic()
+
+    def emit(t, kind, client_id="", pos=-1, runway=-1):
+        runway_s = runway * chunk_size / bitrate if runway >= 0 and bitrate > 0 else float("nan")
+        flag = " ● runway=0" if runway == 0 else (" ▲ low runway" if runway_s < 2 else "")
+        print(
+            f"{t:9.3f}  {kind:<8}  {head:>8}  {client_id[:16]:<16}  {pos:>8}  "
+            f"{runway:>9}  {_fmt(runway_s, '>9.2f'):>9}  {meter.bps() / 1e6:>8.2f}{flag}"
+        )
+
+    try:
+        while time.monotonic() - start < args.duration:
+            msg = pubsub.get_message(timeout=0.25)
+            if msg is None:
+                if receiver is not None and receiver.error and not receiver.is_alive():
+                    print(f"\n  [receiver died] {receiver.error}")
+                    break
+                continue
+            t = time.monotonic() - start
+            channel, data = msg["channel"], msg["data"]
+
+            if channel == ch_events:
+                counts["event"] += 1
+                emit(t, "event", str(data)[:16])
+            elif channel == ch_head:
+                if data != "set":
+                    continue
+                value = as_int(redis_get(rdb, rk_buf_index(content_id)))
+                reads += 1
+                if value <= head:
+                    continue
+                head = value
+                head_times.append(t)
+                counts["head"] += 1
+                for cr in clients.values():
+                    cr.update(head, t)
+                worst = min((cr.runway for cr in clients.values() if cr.runway >= 0), default=-1)
+                emit(t, "head", "(worst)" if clients else "", -1, worst)
+            elif channel == ch_meta:
+                if data == "hset":
+                    bitrate = as_int(rdb.hget(rk_metadata(content_id), "bitrate"), bitrate)
+                    reads += 1
+            else:
+                client_id = channel.rsplit(":", 1)[-1]
+                if data in ("del", "expired"):
+                    cr = clients.pop(client_id, None)
+                    if cr is not None:
+                        cr.close(t)
+                        departed.append((client_id, t, cr))
+                        counts["leave"] += 1
+                        emit(t, "leave", client_id)
+                    continue
+                if data != "hset":
+                    continue
+                initial, chunks = rdb.hmget(rk_client(content_id, client_id), "initial_index", "chunks_sent")
+                reads += 1
+                if as_int(initial) < 0:
+                    continue
+                pos = as_int(initial) + as_int(chunks, 0)
+                cr = clients.get(client_id)
+                if cr is None:
+                    cr = clients[client_id] = ClientRunway()
+                    counts["join"] += 1
+                elif cr.pos == pos:
+                    continue
+                cr.pos = pos
+                cr.update(head, t)
+                counts["client"] += 1
+                emit(t, "client", client_id, pos, cr.runway)
+
+    except KeyboardInterrupt:
+        print("\n  (interrupted)")
+    finally:
+        pubsub.close()
+        if receiver is not None:
+            receiver.stop.set()
+
+    total_t = time.monotonic() - start
+    for cr in clients.values():
+        cr.close(total_t)
+    runways  = [(client_id, None, cr) for client_id, cr in clients.items()] + departed
+    episodes = [ep for _, _, cr in runways for ep in cr.episodes]
+    gaps     = [b - a for a, b in zip(head_times, head_times[1:])]
+    short    = [d for _, d in episodes if d < POLL_INTERVAL]
+
+    print()
+    print(SEP)
+    print("  SUMMARY")
+    print(SEP)
+    print(f"  Duration              : {total_t:.1f} s")
+    print(f"  Events                : {counts['head']} head advances, {counts['client']} client updates, "
+          f"{counts['join']} joins, {counts['leave']} leaves, {counts['event']} stream events")
+    print(f"  Redis reads           : {reads}  (polling every {POLL_INTERVAL} s would be "
+          f"~{int(total_t / POLL_INTERVAL) * (3 + len(clients))})")
+    if gaps:
+        print(f"  Head advance gap      : p50 {percentile(gaps, .5) * 1000:.0f} ms  "
+              f"p99 {percentile(gaps, .99) * 1000:.0f} ms  max {max(gaps) * 1000:.0f} ms")
+    print(f"  Runway=0 episodes     : {len(episodes)}  ({len(short)} shorter than {POLL_INTERVAL} s)")
+    if episodes:
+        print(f"  Time at runway=0      : {sum(d for _, d in episodes):.2f} s  "
+              f"(longest {max(d for _, d in episodes):.2f} s, first at t={min(s for s, _ in episodes):.3f} s)")
+    print()
+
+    if runways:
+        print("  PER CLIENT")
+        hdr = f"  {'CLIENT':<16}  {'STATE':<14}  {'EPISODES':>8}  {'AT_ZERO_S':>9}  {'LONGEST_S':>9}"
+        print(hdr)
+        print("  " + "─" * (len(hdr) - 2))
+        for client_id, left_at, cr in runways:
+            state     = "connected" if left_at is None else f"left t={left_at:.1f}"
+            durations = [d for _, d in cr.episodes]
+            print(f"  {client_id[:16]:<16}  {state:<14}  {len(durations):>8}  "
+                  f"{sum(durations):>9.2f}  {max(durations, default=0):>9.2f}")
+        print()
+
+    print("  DIAGNOSIS")
+    print(SEP)
+    issues = []
+    if short:
+        issues.append(
+            f"• SUB-SECOND COLLAPSES: {len(short)} runway=0 episodes were shorter than the "
+            f"{POLL_INTERVAL} s poll interval and would mostly be invisible to polling."
+        )
+    if gaps and max(gaps) > 3 * percentile(gaps, .5) and max(gaps) > 1.0:
+        issues.append(
+            f"• HEAD STALL: the ring head did not advance for {max(gaps):.2f} s "
+            f"(typical gap {percentile(gaps, .5) * 1000:.0f} ms) — upstream stalled or the proxy stopped writing."
+        )
+    if not counts["head"] and not counts["client"]:
+        issues.append("• NO NOTIFICATIONS: nothing arrived — check notify-keyspace-events and the content ID.")
+    if not issues:
+        issues.append("• No obvious anomalies detected. Check the event trace above.")
+    for line in issues:
+        print()
+        for wrapped in textwrap.wrap(line, width=90, subsequent_indent="  "):
+            print(f"  {wrapped}")
+
+    print()
+    print("  LEGEND")
+    print("  t         seconds since start (monotonic, taken when the notification arrived)")
+    print("  EVENT     head = buffer index advanced, client = chunks_sent moved, join/leave, event = ace_proxy:events")
+    print("  RUNWAY_C  HEAD - CLI_POS in chunks; on head rows, the worst client's runway")
+    print("  RUNWAY_S  RUNWAY_C × chunk_size / PROXY_BR in seconds")
+    print()
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# TS-aware receiving: sync, continuity and PCR checks with NumPy
+# ──────────────────────────────────────────────────────────────────────────────
+TS_PACKET   = 188
+TS_SYNC     = 0x47
+TS_NULL_PID = 0x1FFF
+PCR_CLOCK   = 27_000_000
+PCR_WRAP    = (1 << 33) * 300       # 33-bit base × 300 + 9-bit extension
+PCR_JUMP_S  = 10.0                  # larger PCR steps count as discontinuities
+# Mirrors of the Go estimator in buffer/ring.go
+PCR_WINDOW  = 8                     # pcrWindowSize
+PCR_ALPHA   = 0.25                  # pcrAlpha
+PCR_MIN_BPS = 10_000
+PCR_MAX_BPS = 500_000_000
+
+
+class PCRBitrateEstimator:
+    """Replica of RingBuffer.updatePCRBitrate: one (bytes, PCR) sample per ring chunk, EMA of the window slope."""
+
+    def __init__(self, window=PCR_WINDOW, alpha=PCR_ALPHA):
+        self.alpha   = alpha
+        self.samples = collections.deque(maxlen=window)
+        self.bps     = 0.0
+
+    def add(self, nbytes, ticks):
+        self.samples.append((nbytes, ticks))
+        if len(self.samples) < 2:
+            return
+        old_bytes, old_ticks = self.samples[0]
+        d_bytes = nbytes - old_bytes
+        d_ticks = (ticks - old_ticks) % PCR_WRAP
+        if d_bytes <= 0 or d_ticks <= 0 or d_ticks > PCR_WRAP // 2:
+            # Discontinuity: restart the window from this sample.
+            self.samples.clear()
+            self.samples.append((nbytes, ticks))
+            return
+        raw = d_bytes / (d_ticks / PCR_CLOCK)
+        if not PCR_MIN_BPS <= raw <= PCR_MAX_BPS:
+            return
+        self.bps = raw if not self.bps else self.alpha * raw + (1 - self.alpha) * self.bps
+
+
+class PlayoutModel:
+    """Virtual player: starts once ``prebuffer`` media seconds arrived, plays in real time, stalls when dry."""
+
+    def __init__(self, prebuffer):
+        self.prebuffer   = prebuffer
+        self.playhead    = 0.0      # media seconds played
+        self.playing     = False
+        self.last        = None
+        self.started_at  = None
+        self.stall_since = None
+        self.stalls      = []       # (monotonic start, duration)
+
+    def advance(self, now, media):
+        """Move the playhead to ``now`` given ``media`` seconds received; returns media seconds buffered."""
+        if self.playing:
+            self.playhead += now - self.last
+            if self.playhead >= media:
+                self.stall_since = now - (self.playhead - media)
+                self.playhead    = media
+                self.playing     = False
+        elif media - self.playhead >= self.prebuffer:
+            self.playing = True
+            if self.started_at is None:
+                self.started_at = now
+            elif self.stall_since is not None:
+                self.stalls.append((self.stall_since, now - self.stall_since))
+                self.stall_since = None
+        self.last = now
+        return media - self.playhead
+
+    def close(self, now):
+        if self.stall_since is not None:
+            self.stalls.append((self.stall_since, now - self.stall_since))
+            self.stall_since = None
+
+
+class TSAnalyzer:
+    """Parses received bytes as 188-byte TS packets, whole reads at a time.
+
+    Each read is viewed as an (n, 188) uint8 array over a memoryview, and
+    sync, PID, continuity counter and adaptation-field PCR are taken with
+    array operations.  Only the first PCR PID is followed, as the proxy does.
+    Called from the receiver thread; ``snapshot`` is safe from the main one.
+    """
+
+    def __init__(self, np, chunk_size, prebuffer, window=PCR_WINDOW, alpha=PCR_ALPHA):
+        self.np          = np
+        self.chunk_size  = chunk_size
+        self.lock        = threading.Lock()
+        self.pending     = b""
+        self.consumed    = 0        # stream bytes before self.pending
+        self.packets     = 0
+        self.sync_losses = 0
+        self.skipped     = 0
+        self.cc_errors   = 0
+        self.last_cc     = {}       # pid -> continuity counter of its last payload packet
+        self.pcr_pid     = None
+        self.last_pcr    = None
+        self.pcr_jumps   = 0
+        self.media_s     = 0.0      # media seconds between the first and the latest PCR
+        self.pcr_points  = []       # (stream bytes, media_s) at every PCR
+        self.first_data  = None
+        self.estimator   = PCRBitrateEstimator(window, alpha)
+        self.chunk_end   = chunk_size
+        self.chunk_pcr   = None
+        self.player      = PlayoutModel(prebuffer)
+
+    # ── parsing ───────────────────────────────────────────────────────────────
+    def feed(self, chunk, now):
+        with self.lock:
+            if self.first_data is None:
+                self.first_data = now
+            data = self.pending + bytes(chunk) if self.pending else bytes(chunk)
+            view = memoryview(data)
+            pos  = 0
+            while len(data) - pos >= TS_PACKET:
+                if data[pos] != TS_SYNC:
+                    nxt = self._resync(data, pos)
+                    self.sync_losses += 1
+                    self.skipped     += nxt - pos
+                    self.consumed    += nxt - pos
+                    pos = nxt
+                    continue
+                n = (len(data) - pos) // TS_PACKET
+                packets = self.np.frombuffer(view[pos:pos + n * TS_PACKET], dtype=self.np.uint8).reshape(n, TS_PACKET)
+                bad = self.np.flatnonzero(packets[:, 0] != TS_SYNC)
+                if bad.size:
+                    n = int(bad[0])
+                    packets = packets[:n]
+                self._packets(packets)
+                pos           += n * TS_PACKET
+                self.consumed += n * TS_PACKET
+            del view
+            self.pending = data[pos:]
+            self.player.advance(now, self.media_s)
+
+    @staticmethod
+    def _resync(data, pos):
+        """Next offset that looks like a packet start (0x47 here and one packet later)."""
+        i = data.find(b"\x47", pos + 1)
+        while i != -1:
+            if i + TS_PACKET >= len(data) or data[i + TS_PACKET] == TS_SYNC:
+                return i
+            i = data.find(b"\x47", i + 1)
+        return len(data)
+
+    def _packets(self, pk):
+        np = self.np
+        self.packets += len(pk)
+        pid    = ((pk[:, 1].astype(np.int32) & 0x1F) << 8) | pk[:, 2]
+        afc    = (pk[:, 3] >> 4) & 0x3
+        cc     = (pk[:, 3] & 0x0F).astype(np.int16)
+        af_len = np.where((afc & 0x2) != 0, pk[:, 4], 0)
+        flags  = np.where(af_len > 0, pk[:, 5], 0)
+
+        # Continuity: payload packets of each PID count up by one mod 16;
+        # a repeat (duplicate packet) or a flagged discontinuity is allowed.
+        sel = np.flatnonzero(((afc & 0x1) != 0) & (pid != TS_NULL_PID))
+        if sel.size:
+            order = np.argsort(pid[sel], kind="stable")
+            p, c  = pid[sel][order], cc[sel][order]
+            disc  = (flags[sel][order] & 0x80) != 0
+            first = np.ones(p.size, dtype=bool)
+            first[1:] = p[1:] != p[:-1]
+            prev = np.empty_like(c)
+            prev[1:] = c[:-1]
+            for i in np.flatnonzero(first):
+                prev[i] = self.last_cc.get(int(p[i]), -1)
+            step = (c - prev) % 16
+            self.cc_errors += int(np.count_nonzero((prev >= 0) & ~disc & (step != 0) & (step != 1)))
+            last = np.flatnonzero(np.append(first[1:], True))
+            self.last_cc.update(zip(p[last].tolist(), c[last].tolist()))
+
+        # PCR: adaptation field of at least 7 bytes with the PCR flag set.
+        idx = np.flatnonzero((af_len >= 7) & ((flags & 0x10) != 0))
+        if not idx.size:
+            return
+        if self.pcr_pid is None:
+            self.pcr_pid = int(pid[idx[0]])
+        idx = idx[pid[idx] == self.pcr_pid]
+        b = pk[idx, 6:12].astype(np.int64)
+        base  = (b[:, 0] << 25) | (b[:, 1] << 17) | (b[:, 2] << 9) | (b[:, 3] << 1) | (b[:, 4] >> 7)
+        ticks = base * 300 + (((b[:, 4] & 1) << 8) | b[:, 5])
+        ends  = self.consumed + (idx + 1) * TS_PACKET
+        for tick, end in zip(ticks.tolist(), ends.tolist()):
+            self._pcr(tick, end)
+
+    def _pcr(self, ticks, end):
+        if self.last_pcr is not None:
+            step = (ticks - self.last_pcr) % PCR_WRAP
+            if step > PCR_JUMP_S * PCR_CLOCK:
+                self.pcr_jumps += 1
+            else:
+                self.media_s += step / PCR_CLOCK
+        self.last_pcr = ticks
+        self.pcr_points.append((end, self.media_s))
+
+        # The proxy samples the last PCR of every ring chunk at the chunk's end;
+        # the client's stream starts on a chunk boundary, so replay that here.
+        while end > self.chunk_end:
+            if self.chunk_pcr is not None:
+                self.estimator.add(self.chunk_end, self.chunk_pcr)
+            self.chunk_pcr  = None
+            self.chunk_end += self.chunk_size
+        self.chunk_pcr = ticks
+
+    # ── reporting ─────────────────────────────────────────────────────────────
+    def pcr_bps(self, media_window=None):
+        """Bytes per media second between PCRs, over the last ``media_window`` s (whole run if None)."""
+        points = self.pcr_points
+        if len(points) < 2:
+            return 0.0
+        end_bytes, end_media = points[-1]
+        start = 0
+        if media_window is not None:
+            start = next((i for i in range(len(points) - 1, -1, -1) if end_media - points[i][1] >= media_window), 0)
+        d_media = end_media - points[start][1]
+        return (end_bytes - points[start][0]) / d_media if d_media > 0 else 0.0
+
+    def snapshot(self, now):
+        with self.lock:
+            buffered = self.player.advance(now, self.media_s) if self.first_data is not None else 0.0
+            return {
+                "media_buffered_s": buffered,
+                "pcr_bps":          self.pcr_bps(media_window=5.0),
+                "est_bps":          self.estimator.bps,
+                "cc_errors":        self.cc_errors,
+                "stalled":          self.player.started_at is not None and not self.player.playing,
+                "stalls":           len(self.player.stalls) + (self.player.stall_since is not None),
+            }
+
+    def summary(self, now):
+        with self.lock:
+            self.player.close(now)
+            stalls = self.player.stalls
+            start  = self.player.started_at
+            return {
+                "ts_packets":       self.packets,
+                "ts_sync_losses":   self.sync_losses,
+                "ts_skipped_bytes": self.skipped,
+                "ts_cc_errors":     self.cc_errors,
+                "ts_pcr_pid":       self.pcr_pid,
+                "ts_pcr_jumps":     self.pcr_jumps,
+                "media_s":          self.media_s,
+                "wall_s":           now - self.first_data if self.first_data is not None else 0.0,
+                "pcr_bps":          self.pcr_bps(),
+                "est_bps":          self.estimator.bps,
+                "startup_s":        start - self.first_data if start is not None else None,
+                "stall_count":      len(stalls),
+                "stall_secs":       sum(d for _, d in stalls),
+                "stall_longest":    max((d for _, d in stalls), default=0.0),
+                "prebuffer_s":      self.player.prebuffer,
+            }
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Summary and diagnosis, shared by the live run and `analyze`
+# ──────────────────────────────────────────────────────────────────────────────
+def summarize_snaps(snaps, chunk_size):
+    total_t  = snaps[-1].t
+    valid_rw = [s for s in snaps if s.runway_chunks >= 0]
+    valid_bps = [s for s in snaps if s.proxy_br_bps > 0]
+    valid_src = [s for s in snaps if s.source_rate_cps > 0]
+    zero_rw  = [s for s in valid_rw if s.runway_chunks == 0]
+    return {
+        "duration":     total_t,
+        "avg_proxy_br": sum(s.proxy_br_bps   for s in valid_bps) / len(valid_bps) if valid_bps else 0,
+        "avg_src_bps":  sum(s.source_rate_cps * chunk_size for s in valid_src) / len(valid_src) if valid_src else 0,
+        "avg_rx_bps":   sum(s.rx_bps          for s in snaps) / len(snaps),
+        "peak_rx_bps":  max((s.rx_bps         for s in snaps), default=0),
+        "min_runway_s": min((s.runway_sec      for s in valid_rw if s.runway_sec == s.runway_sec), default=float("nan")),
+        "max_runway_s": max((s.runway_sec      for s in valid_rw if s.runway_sec == s.runway_sec), default=float("nan")),
+        # When did runway first hit 0?
+        "first_zero":   next((s.t for s in valid_rw if s.runway_chunks == 0), None),
+        "init_runway":  next((s.runway_sec for s in valid_rw if s.runway_sec == s.runway_sec), float("nan")),
+        # How many seconds spent at runway=0?
+        "zero_secs":    len(zero_rw) * POLL_INTERVAL,
+    }
+
+
+def print_summary(stats):
+    total_t   = stats["duration"]
+    zero_secs = stats["zero_secs"]
+    print(f"  Duration              : {total_t:.1f} s")
+    print(f"  Avg proxy bitrate     : {stats['avg_proxy_br']/1e6:.2f} MB/s  ({stats['avg_proxy_br']*8/1e6:.2f} Mbps)")
+    print(f"  Avg source rate       : {stats['avg_src_bps']/1e6:.2f} MB/s  ({stats['avg_src_bps']*8/1e6:.2f} Mbps)")
+    print(f"  Avg delivery to client: {stats['avg_rx_bps']/1e6:.2f} MB/s  ({stats['avg_rx_bps']*8/1e6:.2f} Mbps)")
+    print(f"  Peak delivery rate    : {stats['peak_rx_bps']/1e6:.2f} MB/s  ({stats['peak_rx_bps']*8/1e6:.2f} Mbps)")
+    print(f"  Initial runway        : {stats['init_runway']:.1f} s")
+    print(f"  Min runway            : {stats['min_runway_s']:.1f} s")
+    print(f"  Max runway            : {stats['max_runway_s']:.1f} s")
+    print(f"  Time at runway=0      : {zero_secs:.1f} s  ({100*zero_secs/max(total_t, 1e-9):.0f}% of run)")
+    if stats["first_zero"] is not None:
+        print(f"  Runway first hit 0 at : t={stats['first_zero']:.1f} s")
+    if "delivered_bytes" in stats:
+        print(f"  Delivered (reads)     : {stats['delivered_bytes']/1e6:,.1f} MB in {stats['reads']:,} reads")
+        print(f"  Delivery per second   : p10 {stats['rx_p10_bps']/1e6:.2f}  p50 {stats['rx_p50_bps']/1e6:.2f}  "
+              f"p90 {stats['rx_p90_bps']/1e6:.2f} MB/s")
+        print(f"  Longest read gap      : {stats['max_read_gap']:.2f} s")
+    if "ts_packets" in stats:
+        print()
+        print(f"  TS packets            : {stats['ts_packets']:,}  ({stats['ts_sync_losses']} sync losses, "
+              f"{stats['ts_skipped_bytes']:,} bytes skipped, {stats['ts_cc_errors']} CC errors)")
+        print(f"  PCR PID               : {stats['ts_pcr_pid'] if stats['ts_pcr_pid'] is not None else 'none found'}"
+              f"  ({stats['ts_pcr_jumps']} discontinuities)")
+        print(f"  Media received        : {stats['media_s']:.1f} s of media in {stats['wall_s']:.1f} s wall")
+        print(f"  Client PCR bitrate    : {stats['pcr_bps']/1e6:.2f} MB/s  ({stats['pcr_bps']*8/1e6:.2f} Mbps)")
+        print(f"  Proxy-style estimate  : {stats['est_bps']/1e6:.2f} MB/s  (pcrWindowSize/pcrAlpha replica, last value)")
+        startup = stats["startup_s"]
+        print(f"  Playback start        : " + (f"{startup:.1f} s after first byte" if startup is not None else "never")
+              + f"  (prebuffer {stats['prebuffer_s']:g} s)")
+        print(f"  Playback stalls       : {stats['stall_count']}  ({stats['stall_secs']:.1f} s total, "
+              f"longest {stats['stall_longest']:.1f} s)")
+    print()
+
+
+def diagnose(stats):
+    avg_proxy_br = stats["avg_proxy_br"]
+    avg_src_bps  = stats["avg_src_bps"]
+    avg_rx_bps   = stats["avg_rx_bps"]
+    first_zero   = stats["first_zero"]
+    zero_secs    = stats["zero_secs"]
+    total_t      = stats["duration"]
+    issues = []
+
+    if avg_proxy_br > 0 and avg_src_bps > avg_proxy_br * 1.8:
+        issues.append(
+            f"• SOURCE RATE INFLATION: proxy measured bitrate ({avg_proxy_br*8/1e6:.1f} Mbps) << "
+            f"actual source rate ({avg_src_bps*8/1e6:.1f} Mbps) — "
+            f"AceStream burst likely inflating sourceRateEMA; effectiveBPS() cap may not be working."
+        )
+
+    if avg_proxy_br > 0 and avg_rx_bps > avg_proxy_br * 1.3:
+        issues.append(
+            f"• PACING NOT THROTTLING: avg delivery ({avg_rx_bps*8/1e6:.1f} Mbps) is "
+            f"{avg_rx_bps/avg_proxy_br:.1f}× proxy bitrate ({avg_proxy_br*8/1e6:.1f} Mbps). "
+            f"Pacing burst budget is too large or effectiveBR is inflated."
+        )
+
+    if avg_proxy_br > 0 and avg_rx_bps < avg_proxy_br * 0.8:
+        issues.append(
+            f"• UNDER-DELIVERY: avg delivery ({avg_rx_bps*8/1e6:.1f} Mbps) is only "
+            f"{avg_rx_bps/avg_proxy_br:.0%} of proxy bitrate — pacing too aggressive or upstream stalling."
+        )
+
+    if first_zero is not None and first_zero < 5.0:
+        issues.append(
+            f"• FAST RUNWAY COLLAPSE: runway hit 0 at t={first_zero:.1f} s — "
+            f"burst consumed entire prebuffer before steady pacing engaged."
+        )
+
+    if zero_secs > total_t * 0.5:
+        issues.append(
+            f"• RUNWAY MOSTLY ZERO: {zero_secs:.0f} s out of {total_t:.0f} s at runway=0 — "
+            f"delivery consistently outpacing ingress; mult=1.0 low-runway tier may not be firing."
+        )
+
+    if avg_src_bps > 0 and avg_rx_bps > avg_src_bps * 1.05:
+        issues.append(
+            f"• CLIENT FASTER THAN UPSTREAM: delivery ({avg_rx_bps/1e6:.2f} MB/s) > "
+            f"source ({avg_src_bps/1e6:.2f} MB/s). Ring buffer draining by design; "
+            f"check if initPacingBurst() is capping burst to runway correctly."
+        )
+
+    pcr_bps = stats.get("pcr_bps", 0)
+    if avg_proxy_br > 0 and pcr_bps > 0 and abs(avg_proxy_br / pcr_bps - 1) > 0.15:
+        issues.append(
+            f"• BITRATE MISESTIMATE: proxy bitrate ({avg_proxy_br*8/1e6:.2f} Mbps) is "
+            f"{avg_proxy_br/pcr_bps:.0%} of the PCR bitrate the client measured ({pcr_bps*8/1e6:.2f} Mbps) — "
+            f"pacing and runway seconds are scaled by it; check pcrAlpha/pcrWindowSize in buffer/ring.go."
+        )
+
+    if stats.get("stall_count"):
+        issues.append(
+            f"• PLAYBACK STALLS: a player with a {stats['prebuffer_s']:g} s prebuffer would have stalled "
+            f"{stats['stall_count']}× for {stats['stall_secs']:.1f} s in total — media arrived slower than real time."
+        )
+
+    if stats.get("ts_cc_errors") or stats.get("ts_sync_losses"):
+        issues.append(
+            f"• TS DAMAGE: {stats['ts_cc_errors']} continuity errors and {stats['ts_sync_losses']} sync losses — "
+            f"packets were dropped or chunks spliced at non-packet boundaries."
+        )
+
+    if stats.get("ts_packets") and stats.get("ts_pcr_pid") is None:
+        issues.append("• NO PCR: no PCR found in the received stream; the proxy cannot derive a PCR bitrate either.")
+
+    if stats.get("max_read_gap", 0) > 2.0:
+        issues.append(
+            f"• DELIVERY STALL: no bytes arrived for {stats['max_read_gap']:.1f} s at once — "
+            f"a player would have stalled unless its own buffer covered the gap."
+        )
+
+    if not issues:
+        issues.append("• No obvious anomalies detected. Check raw table above for transient spikes.")
+    return issues
+
+
+def print_issues(issues):
+    for line in issues:
+        print()
+        for wrapped in textwrap.wrap(line, width=90, subsequent_indent="  "):
+            print(f"  {wrapped}")
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Recordings: columnar binary files written by --record, read by `analyze`
+# ──────────────────────────────────────────────────────────────────────────────
+# Layout, little-endian:
+#   header     RECORD_HEADER: magic, version, column count, chunk size,
+#              poll interval, created_at (unix), content id (NUL-padded)
+#   directory  one RECORD_COLUMN per column: name, NumPy dtype, offset, count
+#   columns    each column one contiguous fixed-width array, 8-byte aligned
+# The sample columns mirror Snap; read_t/read_bytes hold every read the
+# receiver made (seconds since the first sample, bytes).
+RECORD_MAGIC   = b"RWYDIAG1"
+RECORD_VERSION = 1
+RECORD_HEADER  = struct.Struct("<8sHHIdd64s")
+RECORD_COLUMN  = struct.Struct("<16s4sQQ")
+SNAP_COLUMNS   = (
+    ("t", "<f8"), ("head", "<i8"), ("source_rate_cps", "<f8"), ("proxy_br_bps", "<i8"),
+    ("rx_bps", "<f8"), ("client_initial", "<i8"), ("client_chunks", "<i8"),
+    ("runway_chunks", "<i8"), ("runway_sec", "<f8"), ("burst_ratio", "<f8"),
+)
+_ARRAY_CODES   = {"<f8": "d", "<i8": "q", "<i4": "i"}
+
+
+def _column_bytes(dtype, values):
+    arr = array.array(_ARRAY_CODES[dtype], values)
+    if sys.byteorder == "big":
+        arr.byteswap()
+    return arr.tobytes()
+
+
+def write_recording(path, content_id, chunk_size, snaps, reads):
+    columns = [(name, dtype, [getattr(s, name) for s in snaps]) for name, dtype in SNAP_COLUMNS]
+    columns.append(("read_t",     "<f8", [t for t, _ in reads]))
+    columns.append(("read_bytes", "<i4", [n for _, n in reads]))
+
+    offset = RECORD_HEADER.size + RECORD_COLUMN.size * len(columns)
+    directory, blobs = [], []
+    for name, dtype, values in columns:
+        offset += -offset % 8
+        blob = _column_bytes(dtype, values)
+        directory.append(RECORD_COLUMN.pack(name.encode(), dtype.encode(), offset, len(values)))
+        blobs.append((offset, blob))
+        offset += len(blob)
+
+    with open(path, "wb") as fh:
+        fh.write(RECORD_HEADER.pack(
+            RECORD_MAGIC, RECORD_VERSION, len(columns), chunk_size,
+            POLL_INTERVAL, time.time(), content_id.encode(),
+        ))
+        fh.write(b"".join(directory))
+        for offset, blob in blobs:
+            fh.write(b"\0" * (offset - fh.tell()))
+            fh.write(blob)
+
+
+def load_recording(path, np):
+    """Memory-map a --record file; columns are zero-copy NumPy views of the mapping."""
+    with open(path, "rb") as fh:
+        mm = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+    if len(mm) < RECORD_HEADER.size:
+        raise ValueError("too short to be a recording")
+    magic, version, ncols, chunk_size, poll_interval, created_at, content_id = RECORD_HEADER.unpack_from(mm, 0)
+    if magic != RECORD_MAGIC:
+        raise ValueError("not a runway_diag recording")
+    if version != RECORD_VERSION:
+        raise ValueError(f"unsupported recording version {version}")
+    columns = {}
+    for i in range(ncols):
+        name, dtype, offset, count = RECORD_COLUMN.unpack_from(mm, RECORD_HEADER.size + i * RECORD_COLUMN.size)
+        columns[name.rstrip(b"\0").decode()] = np.frombuffer(
+            mm, dtype=dtype.rstrip(b"\0").decode(), count=count, offset=offset,
+        )
+    return {
+        "path":          path,
+        "content_id":    content_id.rstrip(b"\0").decode(errors="replace"),
+        "chunk_size":    chunk_size,
+        "poll_interval": poll_interval,
+        "created_at":    created_at,
+        "columns":       columns,
+    }
+
+
+def summarize_recording(rec, np):
+    """summarize_snaps() over the mapped columns, plus read-level delivery stats."""
+    c     = rec["columns"]
+    t     = c["t"]
+    if not t.size:
+        return None
+    valid_rw = c["runway_chunks"] >= 0
+    rw_sec   = c["runway_sec"][valid_rw]
+    rw_sec   = rw_sec[np.isfinite(rw_sec)]
+    br       = c["proxy_br_bps"][c["proxy_br_bps"] > 0]
+    src      = c["source_rate_cps"][c["source_rate_cps"] > 0] * rec["chunk_size"]
+    zero     = valid_rw & (c["runway_chunks"] == 0)
+    stats = {
+        "duration":     float(t[-1]),
+        "avg_proxy_br": float(br.mean()) if br.size else 0,
+        "avg_src_bps":  float(src.mean()) if src.size else 0,
+        "avg_rx_bps":   float(c["rx_bps"].mean()),
+        "peak_rx_bps":  float(c["rx_bps"].max()),
+        "min_runway_s": float(rw_sec.min()) if rw_sec.size else float("nan"),
+        "max_runway_s": float(rw_sec.max()) if rw_sec.size else float("nan"),
+        "first_zero":   float(t[zero][0]) if zero.any() else None,
+        "init_runway":  float(rw_sec[0]) if rw_sec.size else float("nan"),
+        "zero_secs":    float(zero.sum() * rec["poll_interval"]),
+    }
+
+    read_t, read_n = c.get("read_t"), c.get("read_bytes")
+    if read_t is not None and read_t.size:
+        per_sec = np.bincount((read_t - read_t[0]).astype(np.int64), weights=read_n)
+        if per_sec.size > 1:
+            per_sec = per_sec[:-1]      # the last second is partial
+        p10, p50, p90 = np.percentile(per_sec, [10, 50, 90])
+        stats.update({
+            "reads":           int(read_t.size),
+            "delivered_bytes": int(read_n.sum(dtype=np.int64)),
+            "rx_p10_bps":      float(p10),
+            "rx_p50_bps":      float(p50),
+            "rx_p90_bps":      float(p90),
+            "max_read_gap":    float(np.diff(read_t).max()) if read_t.size > 1 else 0.0,
+        })
+    return stats
+
+
+COMPARE_ROWS = (
+    ("Duration (s)",            "duration",     1),
+    ("Avg proxy bitrate (Mbps)", "avg_proxy_br", 8 / 1e6),
+    ("Avg source rate (Mbps)",  "avg_src_bps",  8 / 1e6),
+    ("Avg delivery (Mbps)",     "avg_rx_bps",   8 / 1e6),
+    ("Peak delivery (Mbps)",    "peak_rx_bps",  8 / 1e6),
+    ("Initial runway (s)",      "init_runway",  1),
+    ("Min runway (s)",          "min_runway_s", 1),
+    ("Max runway (s)",          "max_runway_s", 1),
+    ("Time at runway=0 (s)",    "zero_secs",    1),
+    ("Runway first hit 0 (s)",  "first_zero",   1),
+    ("Longest read gap (s)",    "max_read_gap", 1),
+)
+
+
+def print_comparison(runs):
+    """Side-by-side summary of several recordings; Δ is last minus first."""
+    names = [name[:14] for name, _ in runs]
+    hdr = f"  {'METRIC':<26}" + "".join(f"  {n:>14}" for n in names) + f"  {'Δ':>9}  {'Δ%':>7}"
+    print("  COMPARISON")
+    print(hdr)
+    print("  " + "─" * (len(hdr) - 2))
+    for label, key, scale in COMPARE_ROWS:
+        values = [stats.get(key) for _, stats in runs]
+        values = [v * scale if v is not None and v == v else None for v in values]
+        cells  = "".join(f"  {v:>14.2f}" if v is not None else f"  {'?':>14}" for v in values)
+        first, last = values[0], values[-1]
+        if first is not None and last is not None:
+            pct = f"{(last - first) / abs(first):>+7.0%}" if first else f"{'':>7}"
+            cells += f"  {last - first:>+9.2f}  {pct}"
+        print(f"  {label:<26}{cells}")
+    print()
+
+
+def run_analyze(argv):
+    ap = argparse.ArgumentParser(
+        prog="runway_diag.py analyze",
+        description="Recompute summary and diagnosis from --record files; several files are compared",
+    )
+    ap.add_argument("recordings", nargs="+", help="Files written with --record")
+    args = ap.parse_args(argv)
+    try:
+        import numpy as np
+    except ImportError:
+        sys.exit("analyze needs numpy: pip install numpy")
+
+    SEP  = "─" * 90
+    runs = []
+    for path in args.recordings:
+        try:
+            rec = load_recording(path, np)
+        except (OSError, ValueError) as e:
+            sys.exit(f"{path}: {e}")
+        c = rec["columns"]
+        print(f"\n  Recording: {path}")
+        print(f"  Content  : {rec['content_id']}")
+        print(f"  Chunk    : {rec['chunk_size']:,} bytes, poll {rec['poll_interval']:g} s")
+        print(f"  Recorded : {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(rec['created_at']))}, "
+              f"{c['t'].size} samples, {c['read_t'].size if 'read_t' in c else 0} reads")
+        print(SEP)
+        print("  SUMMARY")
+        print(SEP)
+        stats = summarize_recording(rec, np)
+        if stats is None:
+            print("  No data collected.\n")
+            continue
+        print_summary(stats)
+        print("  DIAGNOSIS")
+        print(SEP)
+        print_issues(diagnose(stats))
+        print()
+        runs.append((os.path.basename(path), stats))
+
+    if len(runs) >= 2:
+        print_comparison(runs)
+
+
 # ──────────────────────────────────────────────────────────────────────────────
 # Main diagnostic loop
 # ──────────────────────────────────────────────────────────────────────────────
 def run(args):
+    if requests is None:
+        sys.exit("pip install requests")
     content_id = args.content_id
     proxy_url  = args.proxy.rstrip("/")
     chunk_size = args.chunk
@@ -162,12 +1678,6 @@ def run(args):
     redis_port = int(redis_port_s) if redis_port_s else 6379
     rdb = redis_connect(redis_host, redis_port)
 
-    # Redis key helpers (mirrors rediskeys/keys.go)
-    def rk_buf_index():  return f"ace_proxy:stream:{content_id}:buffer:index"
-    def rk_metadata():   return f"ace_proxy:stream:{content_id}:metadata"
-    def rk_clients():    return f"ace_proxy:stream:{content_id}:clients"
-    def rk_client(cid):  return f"ace_proxy:stream:{content_id}:clients:{cid}"
-
     # Start receiver
     stream_url = f"{proxy_url}/ace/getstream?id={content_id}"
     headers    = {"User-Agent": "runway-diagnostic/1.0"}
@@ -175,7 +1685,15 @@ def run(args):
         headers["X-API-Key"] = args.key
 
     meter    = RateMeter()
-    receiver = StreamReceiver(stream_url, headers, meter)
+    reads    = [] if args.record else None
+    ts       = None
+    if args.ts:
+        try:
+            import numpy as np
+        except ImportError:
+            sys.exit("--ts needs numpy: pip install numpy")
+        ts = TSAnalyzer(np, chunk_size, args.prebuffer)
+    receiver = StreamReceiver(stream_url, headers, meter, reads, ts)
     receiver.start()
 
     print(f"\n  Stream  : {stream_url}")
@@ -198,6 +1716,8 @@ def run(args):
         f"{'RUNWAY_C':>9}  "
         f"{'RUNWAY_S':>9}"
     )
+    if ts is not None:
+        HDR += f"  {'MEDIA_BUF':>9}  {'PCR_BR':>7}  {'EST_BR':>7}  {'CC_ERR':>6}"
     SEP = "─" * len(HDR)
     print(HDR)
     print(SEP)
@@ -213,18 +1733,18 @@ def run(args):
             t = time.monotonic() - start
 
             # ── Redis reads ───────────────────────────────────────────────────
-            head_s = redis_get(rdb, rk_buf_index(), "-1")
+            head_s = redis_get(rdb, rk_buf_index(content_id), "-1")
             head   = int(head_s) if head_s and head_s.lstrip("-").isdigit() else -1
 
-            meta       = redis_hgetall(rdb, rk_metadata())
+            meta       = redis_hgetall(rdb, rk_metadata(content_id))
             proxy_br   = int(meta.get("bitrate", 0) or 0)   # bytes/s
 
-            client_ids = redis_smembers(rdb, rk_clients())
+            client_ids = redis_smembers(rdb, rk_clients(content_id))
             # pick the first client (likely ours)
             cli_initial = -1
             cli_chunks  = -1
             for cid in client_ids:
-                c = redis_hgetall(rdb, rk_client(cid))
+                c = redis_hgetall(rdb, rk_client(content_id, cid))
                 if c:
                     cli_initial = int(c.get("initial_index", -1) or -1)
                     cli_chunks  = int(c.get("chunks_sent",   0)  or 0)
@@ -232,12 +1752,7 @@ def run(args):
 
             # ── source rate (ring head advancement EMA) ───────────────────────
             now = time.monotonic()
-            if prev_head is not None and head > prev_head and prev_head_time is not None:
-                dt      = now - prev_head_time
-                delta_c = head - prev_head
-                instant = delta_c / dt          # chunks/s
-                alpha   = 0.4
-                head_ema = alpha * instant + (1 - alpha) * head_ema if head_ema else instant
+            head_ema = advance_ema(head_ema, prev_head, prev_head_time, head, now)   # chunks/s
             if head >= 0:
                 prev_head      = head
                 prev_head_time = now
@@ -289,6 +1804,16 @@ def run(args):
             elif rwy_c >= 0 and proxy_br > 0 and runway_sec < 2:
                 flag = " ▲ low runway"
 
+            ts_cols = ""
+            if ts is not None:
+                m = ts.snapshot(time.monotonic())
+                ts_cols = (
+                    f"  {m['media_buffered_s']:>9.2f}  {m['pcr_bps'] / 1e6:>7.2f}  "
+                    f"{m['est_bps'] / 1e6:>7.2f}  {m['cc_errors']:>6}"
+                )
+                if m["stalled"]:
+                    flag = " ■ playback stalled"
+
             print(
                 f"{t:6.1f}  "
                 f"{head:>8}  "
@@ -300,6 +1825,7 @@ def run(args):
                 f"{(cli_initial + cli_chunks) if cli_chunks >= 0 else -1:>8}  "
                 f"{rwy_c:>9}  "
                 f"{rwy_s:>9}"
+                f"{ts_cols}"
                 f"{flag}"
             )
 
@@ -312,7 +1838,12 @@ def run(args):
     except KeyboardInterrupt:
         print("\n  (interrupted)")
 
+    finished = time.monotonic()
     receiver.stop.set()
+    if args.record:
+        write_recording(args.record, content_id, chunk_size, snaps,
+                        [(at - start, n) for at, n in list(reads)])
+        print(f"\n  Recorded {len(snaps)} samples and {len(reads)} reads to {args.record}")
 
     # ── Summary ───────────────────────────────────────────────────────────────
     print()
@@ -324,91 +1855,15 @@ def run(args):
         print("  No data collected.")
         return
 
-    total_t  = snaps[-1].t
-    valid_rw = [s for s in snaps if s.runway_chunks >= 0]
-    valid_bps = [s for s in snaps if s.proxy_br_bps > 0]
-    valid_src = [s for s in snaps if s.source_rate_cps > 0]
-    zero_rw  = [s for s in valid_rw if s.runway_chunks == 0]
-
-    avg_proxy_br  = sum(s.proxy_br_bps   for s in valid_bps) / len(valid_bps) if valid_bps else 0
-    avg_src_bps   = sum(s.source_rate_cps * chunk_size for s in valid_src) / len(valid_src) if valid_src else 0
-    avg_rx_bps    = sum(s.rx_bps          for s in snaps) / len(snaps)
-    peak_rx_bps   = max((s.rx_bps         for s in snaps), default=0)
-    min_runway_s  = min((s.runway_sec      for s in valid_rw if s.runway_sec == s.runway_sec), default=float("nan"))
-    max_runway_s  = max((s.runway_sec      for s in valid_rw if s.runway_sec == s.runway_sec), default=float("nan"))
-
-    # When did runway first hit 0?
-    first_zero = next((s.t for s in valid_rw if s.runway_chunks == 0), None)
-    # Initial runway
-    init_runway = next((s.runway_sec for s in valid_rw if s.runway_sec == s.runway_sec), float("nan"))
-
-    # How many seconds spent at runway=0?
-    zero_secs = len(zero_rw) * POLL_INTERVAL
-
-    print(f"  Duration              : {total_t:.1f} s")
-    print(f"  Avg proxy bitrate     : {avg_proxy_br/1e6:.2f} MB/s  ({avg_proxy_br*8/1e6:.2f} Mbps)")
-    print(f"  Avg source rate       : {avg_src_bps/1e6:.2f} MB/s  ({avg_src_bps*8/1e6:.2f} Mbps)")
-    print(f"  Avg delivery to client: {avg_rx_bps/1e6:.2f} MB/s  ({avg_rx_bps*8/1e6:.2f} Mbps)")
-    print(f"  Peak delivery rate    : {peak_rx_bps/1e6:.2f} MB/s  ({peak_rx_bps*8/1e6:.2f} Mbps)")
-    print(f"  Initial runway        : {init_runway:.1f} s")
-    print(f"  Min runway            : {min_runway_s:.1f} s")
-    print(f"  Max runway            : {max_runway_s:.1f} s")
-    print(f"  Time at runway=0      : {zero_secs:.1f} s  ({100*zero_secs/total_t:.0f}% of run)")
-    if first_zero is not None:
-        print(f"  Runway first hit 0 at : t={first_zero:.1f} s")
-    print()
+    stats = summarize_snaps(snaps, chunk_size)
+    if ts is not None:
+        stats.update(ts.summary(finished))
+    print_summary(stats)
 
     # Diagnosis
     print("  DIAGNOSIS")
     print(SEP)
-    issues = []
-
-    if avg_proxy_br > 0 and avg_src_bps > avg_proxy_br * 1.8:
-        issues.append(
-            f"• SOURCE RATE INFLATION: proxy measured bitrate ({avg_proxy_br*8/1e6:.1f} Mbps) << "
-            f"actual source rate ({avg_src_bps*8/1e6:.1f} Mbps) — "
-            f"AceStream burst likely inflating sourceRateEMA; effectiveBPS() cap may not be working."
-        )
-
-    if avg_proxy_br > 0 and avg_rx_bps > avg_proxy_br * 1.3:
-        issues.append(
-            f"• PACING NOT THROTTLING: avg delivery ({avg_rx_bps*8/1e6:.1f} Mbps) is "
-            f"{avg_rx_bps/avg_proxy_br:.1f}× proxy bitrate ({avg_proxy_br*8/1e6:.1f} Mbps). "
-            f"Pacing burst budget is too large or effectiveBR is inflated."
-        )
-
-    if avg_proxy_br > 0 and avg_rx_bps < avg_proxy_br * 0.8:
-        issues.append(
-            f"• UNDER-DELIVERY: avg delivery ({avg_rx_bps*8/1e6:.1f} Mbps) is only "
-            f"{avg_rx_bps/avg_proxy_br:.0%} of proxy bitrate — pacing too aggressive or upstream stalling."
-        )
-
-    if first_zero is not None and first_zero < 5.0:
-        issues.append(
-            f"• FAST RUNWAY COLLAPSE: runway hit 0 at t={first_zero:.1f} s — "
-            f"burst consumed entire prebuffer before steady pacing engaged."
-        )
-
-    if zero_secs > total_t * 0.5:
-        issues.append(
-            f"• RUNWAY MOSTLY ZERO: {zero_secs:.0f} s out of {total_t:.0f} s at runway=0 — "
-            f"delivery consistently outpacing ingress; mult=1.0 low-runway tier may not be firing."
-        )
-
-    if avg_src_bps > 0 and avg_rx_bps > avg_src_bps * 1.05:
-        issues.append(
-            f"• CLIENT FASTER THAN UPSTREAM: delivery ({avg_rx_bps/1e6:.2f} MB/s) > "
-            f"source ({avg_src_bps/1e6:.2f} MB/s). Ring buffer draining by design; "
-            f"check if initPacingBurst() is capping burst to runway correctly."
-        )
-
-    if not issues:
-        issues.append("• No obvious anomalies detected. Check raw table above for transient spikes.")
-
-    for line in issues:
-        print()
-        for wrapped in textwrap.wrap(line, width=90, subsequent_indent="  "):
-            print(f"  {wrapped}")
+    print_issues(diagnose(stats))
 
     print()
     print("  LEGEND")
@@ -421,20 +1876,60 @@ def run(args):
     print("  CLI_POS   estimated client localIndex (initial_index + chunks_sent from Redis)")
     print("  RUNWAY_C  HEAD - CLI_POS in chunks")
     print("  RUNWAY_S  RUNWAY_C × chunk_size / PROXY_BR in seconds")
+    if ts is not None:
+        print("  MEDIA_BUF media seconds (by PCR) received but not yet played by a virtual player")
+        print("  PCR_BR    bitrate from received bytes per PCR second, last 5 media seconds (MB/s)")
+        print("  EST_BR    the proxy's PCR estimator replayed on the received stream (MB/s)")
+        print("  CC_ERR    continuity-counter errors so far")
     print()
 
 
 # ──────────────────────────────────────────────────────────────────────────────
 if __name__ == "__main__":
+    if sys.argv[1:2] == ["analyze"]:
+        run_analyze(sys.argv[2:])
+        sys.exit()
     ap = argparse.ArgumentParser(
         description="AceStream proxy runway diagnostic — connects directly and polls Redis",
         formatter_class=argparse.RawDescriptionHelpFormatter,
     )
-    ap.add_argument("content_id", help="AceStream content ID hash")
+    ap.add_argument("content_id", nargs="?", help="AceStream content ID hash")
+    ap.add_argument("--fleet",    action="store_true",             help="Watch every active stream via Redis")
     ap.add_argument("--proxy",    default="http://localhost:8000", help="Proxy base URL")
     ap.add_argument("--redis",    default="localhost:6379",        help="Redis host:port")
     ap.add_argument("--chunk",    type=int, default=DEFAULT_CHUNK, help="Ring chunk size (bytes)")
     ap.add_argument("--duration", type=int, default=120,           help="Collection time (s)")
     ap.add_argument("--key",      default="",                      help="API key if required")
+    ap.add_argument("--top",      type=int, default=15,            help="Offenders listed in fleet mode")
+    ap.add_argument("--rescan",   type=float, default=5.0,         help="Seconds between stream SCANs in fleet mode")
+    ap.add_argument("--load",     type=int, default=0,             help="Concurrent load clients (load mode)")
+    ap.add_argument("--ids",      default="",                      help="Extra content IDs for load mode, comma list")
+    ap.add_argument("--stagger",  type=float, default=0.5,         help="Seconds between initial joins")
+    ap.add_argument("--connect-rate",    type=float, default=0.0,  help="Churn: new clients per second")
+    ap.add_argument("--disconnect-rate", type=float, default=0.0,  help="Churn: disconnects per second")
+    ap.add_argument("--seed",     type=int, default=1,             help="Churn random seed")
+    ap.add_argument("--output",   default=None,                    help="Write the load report JSON here")
+    ap.add_argument("--subscribe", action="store_true",            help="Event-driven sampling via pub/sub")
+    ap.add_argument("--enable-notifications", action="store_true", help="Turn on keyspace notifications")
+    ap.add_argument("--no-connect", action="store_true",           help="Watch without opening a stream")
+    ap.add_argument("--record",   default=None,                    help="Write samples and reads to this file")
+    ap.add_argument("--ts",       action="store_true",             help="Parse the received MPEG-TS (needs numpy)")
+    ap.add_argument("--prebuffer", type=float, default=2.0,        help="Virtual player prebuffer for --ts (media s)")
     args = ap.parse_args()
-    run(args)
+    if (args.record or args.ts) and (args.fleet or args.subscribe or args.load > 0):
+        ap.error("--record and --ts only apply to single-stream mode, not --fleet, --subscribe or --load")
+    if args.fleet:
+        run_fleet(args)
+    elif args.subscribe:
+        if not args.content_id:
+            ap.error("--subscribe needs a content_id")
+        run_subscribe(args)
+    elif args.load > 0:
+        content_ids = [c for c in [args.content_id] + args.ids.split(",") if c]
+        if not content_ids:
+            ap.error("load mode needs a content_id or --ids")
+        run_load(args, content_ids)
+    elif args.content_id:
+        run(args)
+    else:
+        ap.error("content_id is required unless --fleet is given")
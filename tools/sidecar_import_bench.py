@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Proton sidecar import-time benchmark.
+
+Imports each module in a fresh interpreter under ``python -X importtime`` and
+reports the wall time of the import (best and median of --repeat runs) plus
+the heaviest dependencies of the best run by cumulative import time.
+
+The default modules are the sidecar itself, which uvicorn imports before the
+port opens and so should stay cheap, and ``proton.session``, the cost the
+startup warm-up moves off the first refresh.  A module that cannot be
+imported (e.g. proton-core not installed) is reported and skipped.
+
+Usage:
+    python tools/sidecar_import_bench.py [options]
+
+Options:
+    --modules        Comma list of modules     (default: app.proton_service,proton.session)
+    --repeat         Fresh interpreters per module (default: 5)
+    --top            Heaviest imports listed per module (default: 12)
+    --output FILE    Write results as JSON
+    --compare FILE   Compare against an earlier --output file; exit 1 on regression
+    --threshold      Allowed slowdown before a module counts as a regression (default: 0.15)
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_CHILD = (
+    "import sys, time\n"
+    "sys.path.insert(0, {root!r})\n"
+    "started = time.perf_counter()\n"
+    "import {module}\n"
+    "print(time.perf_counter() - started)\n"
+)
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Measurement
+# ──────────────────────────────────────────────────────────────────────────────
+def _parse_importtime(stderr):
+    """``-X importtime`` lines as (module, self_us, cumulative_us, depth)."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        try:
+            self_us, cumulative_us, name = line[len("import time:"):].split("|")
+            depth = (len(name) - len(name.lstrip())) // 2
+            rows.append((name.strip(), int(self_us), int(cumulative_us), depth))
+        except ValueError:
+            continue
+    return rows
+
+
+def _subtree(rows, module):
+    """Rows imported on behalf of ``module``, leaving out interpreter start-up (site etc.).
+
+    importtime prints a module after everything it pulled in, so its
+    dependencies are the deeper rows just before it.
+    """
+    end = next((i for i, row in enumerate(rows) if row[0] == module and row[3] == 0), None)
+    if end is None:
+        return []
+    start = end
+    while start > 0 and rows[start - 1][3] > 0:
+        start -= 1
+    return rows[start:end]
+
+
+def import_once(module):
+    """Import ``module`` in a fresh interpreter; returns (seconds, importtime rows) or raises RuntimeError."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _CHILD.format(root=ROOT, module=module)],
+        cwd=ROOT, capture_output=True, text=True, timeout=120,
+    )
+    if proc.returncode != 0:
+        last = (proc.stderr.strip().splitlines() or ["import failed"])[-1]
+        raise RuntimeError(last)
+    return float(proc.stdout.strip().splitlines()[-1]), _parse_importtime(proc.stderr)
+
+
+def bench_module(module, repeat, top):
+    samples, best_rows = [], []
+    for _ in range(repeat):
+        seconds, rows = import_once(module)
+        if not samples or seconds < min(samples):
+            best_rows = rows
+        samples.append(seconds)
+    heaviest = sorted(
+        (row for row in _subtree(best_rows, module) if row[3] <= 2),
+        key=lambda row: row[2],
+        reverse=True,
+    )[:top]
+    return {
+        "module": module,
+        "best_ms": round(min(samples) * 1000, 2),
+        "median_ms": round(statistics.median(samples) * 1000, 2),
+        "runs_ms": [round(s * 1000, 2) for s in samples],
+        "modules_imported": len(_subtree(best_rows, module)) + 1,
+        "heaviest": [
+            {"module": name, "self_ms": round(self_us / 1000, 2), "cumulative_ms": round(cum_us / 1000, 2)}
+            for name, self_us, cum_us, _ in heaviest
+        ],
+    }
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Reporting
+# ──────────────────────────────────────────────────────────────────────────────
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=ROOT, capture_output=True, text=True, timeout=5,
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def compare(results, baseline, threshold):
+    """Print per-module ratios against ``baseline``; return the number of regressions."""
+    previous = {r["module"]: r for r in baseline.get("results", [])}
+    print(f"\n  Compared with {baseline.get('commit') or 'baseline'} (threshold {threshold:.0%})\n")
+    print(f"  {'MODULE':<28}  {'BEST':>7}  {'MEDIAN':>7}")
+    print("  " + "─" * 46)
+    regressions = 0
+    for row in results:
+        old = previous.get(row["module"])
+        if old is None:
+            continue
+        best = row["best_ms"] / max(old["best_ms"], 1e-9)
+        median = row["median_ms"] / max(old["median_ms"], 1e-9)
+        flag = "  REGRESSION" if best > 1 + threshold else ""
+        regressions += bool(flag)
+        print(f"  {row['module']:<28}  {best:>6.2f}x  {median:>6.2f}x{flag}")
+    print()
+    return regressions
+
+
+def run(args):
+    modules = [m.strip() for m in args.modules.split(",") if m.strip()]
+    print(f"\n  Python  : {platform.python_version()}, best of {args.repeat} fresh interpreters\n")
+
+    results = []
+    for module in modules:
+        try:
+            row = bench_module(module, args.repeat, args.top)
+        except (RuntimeError, subprocess.SubprocessError) as exc:
+            print(f"  {module}: skipped ({exc})\n")
+            continue
+        results.append(row)
+        print(f"  {module}: best {row['best_ms']:.1f} ms, median {row['median_ms']:.1f} ms, "
+              f"{row['modules_imported']} modules")
+        print(f"    {'IMPORT':<40}  {'SELF_MS':>8}  {'CUMUL_MS':>9}")
+        print("    " + "─" * 61)
+        for dep in row["heaviest"]:
+            print(f"    {dep['module']:<40}  {dep['self_ms']:>8.1f}  {dep['cumulative_ms']:>9.1f}")
+        print()
+
+    report = {
+        "commit": _git_commit(),
+        "created_at": int(time.time()),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "args": vars(args),
+        "results": results,
+    }
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2), encoding="utf-8")
+        print(f"  Results written to {args.output}\n")
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text(encoding="utf-8"))
+        if compare(results, baseline, args.threshold):
+            sys.exit(1)
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(
+        description="Benchmark Proton sidecar module import time",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    ap.add_argument("--modules",   default="app.proton_service,proton.session", help="Comma list of modules")
+    ap.add_argument("--repeat",    type=int, default=5,     help="Fresh interpreters per module")
+    ap.add_argument("--top",       type=int, default=12,    help="Heaviest imports listed per module")
+    ap.add_argument("--output",    default=None,            help="Write results JSON here")
+    ap.add_argument("--compare",   default=None,            help="Baseline results JSON")
+    ap.add_argument("--threshold", type=float, default=0.15, help="Allowed import-time slowdown")
+    run(ap.parse_args())